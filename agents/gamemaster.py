@@ -3,42 +3,71 @@ LangChain 기반 GameMaster 에이전트
 기존 복잡한 메모리 관리를 LangChain으로 단순화
 """
 
+import atexit
 import json
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import threading
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable, Tuple
 from datetime import datetime
+import orjson
 import requests
-import copy
+from requests.adapters import HTTPAdapter
 
 from langchain.chains import LLMChain
 from langchain_ollama import OllamaLLM
 from langchain.schema import BaseMessage
+from langchain.prompts import ChatPromptTemplate
+from ollama import Client
 
 from config.settings import get_config
 from memory.game_memory import memory_manager, context_manager
 from memory.vector_memory import vector_memory_manager
+from agents.response_parser import StreamingFieldScanner, is_complete_json_object, extract_message
 from prompts.gamemaster_templates import (
     GAMEMASTER_CHAT_PROMPT,
-    IMAGE_GENERATION_TEMPLATE,
+    IMAGE_DECISION_TEMPLATE,
     CHARACTER_INTERACTION_TEMPLATE,
     get_prompt_template
 )
 
 
-def _deep_merge(source, destination):
-    """재귀적으로 딕셔너리를 병합합니다."""
-    for key, value in source.items():
-        if isinstance(value, dict):
-            # 딕셔너리인 경우 재귀적으로 병합
-            node = destination.setdefault(key, {})
-            _deep_merge(value, node)
-        elif isinstance(value, list):
-            # 리스트인 경우 전체 교체 (병합하지 않음)
-            destination[key] = value
-        else:
-            # 기본값은 그냥 덮어쓰기
-            destination[key] = value
-    return destination
+# 스트리밍 중 완성 시점을 감지할 GM 응답 문자열 필드
+STREAMED_FIELDS = ("message", "image_prompt")
+
+# 게임 API 병렬 조회와 백그라운드 대화 저장에 함께 쓰는 공용 스레드 풀 (요청마다 생성하지 않음)
+_EXEC = ThreadPoolExecutor(max_workers=max(8, (os.cpu_count() or 1) * 2), thread_name_prefix="gm")
+atexit.register(_EXEC.shutdown, wait=False)
+
+# 캐릭터 PATCH 실패 시 재시도 횟수
+CHARACTER_PATCH_RETRIES = 3
+
+# 프롬프트에 원문 그대로 넣는 최근 대화 수
+RECENT_LIMIT = 10
+# 사망 요약에 사용하는 최근 대화 수
+DEATH_HISTORY_LIMIT = 20
+# 게임별로 메모리에 유지하는 최근 대화 수 (위 두 값 중 큰 값 이상)
+RECENT_BUFFER_SIZE = 50
+
+
+def _merge_stats(original: Any, update: Any) -> Any:
+    """능력치 병합 - stats는 평탄한 딕셔너리이므로 바뀐 키만 덮어씀"""
+    if isinstance(original, dict) and isinstance(update, dict):
+        return {**original, **update}
+    return update
+
+def _merge_chunks(chunks: List[str]) -> str:
+    """분할 저장된 청크를 원문에 가깝게 이어 붙임 (청크 사이 겹치는 부분은 한 번만)"""
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        overlap = min(len(merged), len(chunk))
+        while overlap and not merged.endswith(chunk[:overlap]):
+            overlap -= 1
+        merged += chunk[overlap:] if overlap else " " + chunk
+    return merged
 
 class LangChainGameMaster:
     """LangChain 기반 게임마스터 에이전트"""
@@ -50,39 +79,59 @@ class LangChainGameMaster:
         self.game_config = get_config("game")
         self.api_config = get_config("external_api")
 
-        # LLM 초기화
+        # LLM 초기화 (헬스 체크, 캐릭터 상호작용, 사망 요약용 동기 호출)
         self.llm = OllamaLLM(
             base_url=self.ollama_config["base_url"],
             model=self.ollama_config["model"],
             temperature=self.ollama_config["temperature"]
         )
 
-        # 메인 게임마스터 체인
-        self.gm_chain = LLMChain(
-            llm=self.llm,
-            prompt=GAMEMASTER_CHAT_PROMPT,
-            verbose=True
-        )
+        # 게임마스터 / 이미지 판단 호출용 Ollama 클라이언트 (커넥션 풀 공유, 스레드 간 사용 가능)
+        # 두 호출은 공용 스레드 풀(_EXEC)에서 병렬로 실행
+        self.client = Client(host=self.ollama_config["base_url"])
 
-        # 이미지 생성 판단 체인
-        self.image_chain = LLMChain(
-            llm=self.llm,
-            prompt=IMAGE_GENERATION_TEMPLATE,
-            verbose=False
-        )
+        # 동시에 진행하는 Ollama 생성 요청 수 제한 (서버의 OLLAMA_NUM_PARALLEL과 맞춤)
+        self._generate_slots = threading.BoundedSemaphore(self.ollama_config["max_in_flight"])
+
+        # 게임 API 호출용 세션 (keep-alive 커넥션 재사용)
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+        # 게임별 제목/장르/시나리오 캐시 (게임 중 변하지 않음)
+        self._game_info_cache: Dict[str, Dict[str, Any]] = {}
+
+        # 게임별 게임 컨텍스트가 채워진 프롬프트 캐시 (game_context, 프롬프트)
+        self._prompt_by_game: Dict[str, Tuple[str, ChatPromptTemplate]] = {}
+
+        # 게임별 최근 대화 링 버퍼와 전체 대화 수 (매 턴 ChromaDB 전체 조회 방지)
+        self._recent_conv: Dict[str, deque] = {}
+        self._conv_count: Dict[str, int] = {}
+        self._recent_text: Dict[str, Tuple[str, int]] = {}
+        self._recent_lock = threading.Lock()
+
+        # 게임별 진행 중인 대화 저장 작업과 저장 직렬화용 락
+        self._pending_persist: Dict[str, Future] = {}
+        self._persist_locks: Dict[str, threading.Lock] = {}
+
+        # 게임별 캐릭터 로컬 업데이트 버전, PATCH 직렬화용 락, 마지막으로 등록한 PATCH 작업
+        self._character_versions: Dict[str, int] = {}
+        self._patch_locks: Dict[str, threading.Lock] = {}
+        self._pending_patch: Dict[str, Future] = {}
+
+        # 로깅
+        self.logger = logging.getLogger(__name__)
 
-        # 캐릭터 상호작용 체인
+        # 캐릭터 상호작용 체인 (프롬프트/응답 출력은 DEBUG 로그 레벨에서만)
         self.character_chain = LLMChain(
             llm=self.llm,
             prompt=CHARACTER_INTERACTION_TEMPLATE,
-            verbose=False
+            verbose=self.logger.isEnabledFor(logging.DEBUG)
         )
 
-        # 로깅
-        self.logger = logging.getLogger(__name__)
-
     def process_game_request(self, game_id: str, user_input: str) -> Dict[str, Any]:
-        """게임 요청 처리 - Vector Memory + LangChain 통합"""
+        """게임 요청 처리 - Vector Memory + Ollama 병렬 호출"""
         import time
         start_time = time.time()
 
@@ -94,76 +143,70 @@ class LangChainGameMaster:
 
             # 2. 벡터 메모리에서 관련 컨텍스트 검색
             step_start = time.time()
-            vector_memory = vector_memory_manager.get_vector_memory(game_id)
-            relevant_context = vector_memory_manager.search_relevant_context(
-                game_id, user_input, k=10
-            )
+            relevant_docs, relevant_metadatas = vector_memory_manager.query_with_metadata(game_id, user_input, 10)
             self.logger.info(f"[TIMING] 벡터 컨텍스트 검색: {time.time() - step_start:.2f}초")
 
             # 3. 관련 컨텍스트를 문자열로 변환
             step_start = time.time()
-            context_info = "\n".join([doc.page_content for doc in relevant_context]) if relevant_context else ""
+            context_info = "\n".join(relevant_docs)
             self.logger.info(f"[TIMING] 컨텍스트 변환: {time.time() - step_start:.2f}초")
 
-            # 4. 하이브리드 대화 히스토리 구성 (ChromaDB 원문 + 벡터 검색)
+            # 4. 하이브리드 대화 히스토리 구성 (최근 대화 원문 + 벡터 검색)
             step_start = time.time()
+            # 이전 턴의 저장이 끝나야 링 버퍼가 최신 상태
+            pending = self._pending_persist.get(game_id)
+            if pending is not None:
+                pending.result()
+            recent_text, recent_count, total_count = self._get_recent_text(game_id)
             chat_summary_parts = []
 
-            # ChromaDB에서 전체 대화 조회
-            vector_store = vector_memory_manager.vector_stores.get(game_id)
-            all_conversations = []
-
-            if vector_store:
-                try:
-                    results = vector_store.get(where={"type": "conversation"})
-                    if results and 'documents' in results:
-                        for doc, metadata in zip(results['documents'], results['metadatas']):
-                            all_conversations.append({
-                                'content': doc,
-                                'timestamp': metadata.get('timestamp', ''),
-                                'sequence': metadata.get('sequence_number', 0)
-                            })
-                        # 시간순 정렬
-                        all_conversations.sort(key=lambda x: (x['timestamp'], x['sequence']))
-                except Exception as e:
-                    self.logger.warning(f"ChromaDB 대화 조회 실패: {e}")
-
-            # 최근 N개는 원문 그대로 사용 (기본값: 10개)
-            RECENT_LIMIT = 10
-            total_count = len(all_conversations)
-
             if total_count > RECENT_LIMIT:
-                # 오래된 대화는 벡터 검색으로 관련성 높은 것만
-                old_conversations = all_conversations[:-RECENT_LIMIT]
-                recent_conversations = all_conversations[-RECENT_LIMIT:]
-
-                # 벡터 검색으로 관련 있는 오래된 대화 찾기
-                if relevant_context:
+                # 오래된 대화는 벡터 검색으로 관련 있는 것만
+                if relevant_docs:
                     chat_summary_parts.append(f"[과거 관련 대화 (벡터 검색)]\n{context_info}\n")
 
-                # 최근 대화는 원문 그대로
-                if recent_conversations:
-                    recent_texts = [conv['content'] for conv in recent_conversations]
-                    chat_summary_parts.append(f"[최근 대화 ({len(recent_conversations)}턴)]\n" + "\n".join(recent_texts))
+                # 최근 N개는 원문 그대로
+                if recent_count:
+                    chat_summary_parts.append(f"[최근 대화 ({recent_count}턴)]\n" + recent_text)
 
             else:
                 # 전체가 RECENT_LIMIT 이하면 모두 원문 사용
-                if all_conversations:
-                    all_texts = [conv['content'] for conv in all_conversations]
-                    chat_summary_parts.append(f"[대화 내역 ({len(all_conversations)}턴)]\n" + "\n".join(all_texts))
+                if recent_count:
+                    chat_summary_parts.append(f"[대화 내역 ({recent_count}턴)]\n" + recent_text)
 
             chat_summary = "\n".join(chat_summary_parts) if chat_summary_parts else "새로운 게임 세션입니다."
-            self.logger.info(f"[TIMING] 하이브리드 메모리 구성 (전체: {total_count}, 최근: {min(total_count, RECENT_LIMIT)}): {time.time() - step_start:.2f}초")
+            self.logger.info(f"[TIMING] 하이브리드 메모리 구성 (전체: {total_count}, 최근: {recent_count}): {time.time() - step_start:.2f}초")
 
-            # 5. GameMaster 체인 실행 (벡터 컨텍스트 포함) - 여기서 /api/generate 호출
+            # 턴 저장용 메타데이터 - 응답의 message 필드가 완성되는 즉시 백그라운드 저장을 시작
+            # (memory_manager.add_message는 메타데이터를 저장하지 않으므로 개수만 기록)
+            metadata = {
+                "ctx_n": len(relevant_docs),
+                "has_relevant_context": bool(relevant_docs)
+            }
+            if self.logger.isEnabledFor(logging.DEBUG):
+                context_sources = Counter(meta.get("type", "unknown") for meta in relevant_metadatas)
+                self.logger.debug(f"관련 컨텍스트 출처: {context_sources.most_common(3)}")
+            persist_scheduled = False
+
+            def on_field_closed(field: str, value: Any):
+                nonlocal persist_scheduled
+                if field == "message" and not persist_scheduled and isinstance(value, str):
+                    persist_scheduled = True
+                    self._schedule_persist(game_id, user_input, value, metadata)
+
+            # 5. 게임마스터 응답(스트리밍)과 이미지 생성 판단을 병렬로 요청 - 여기서 /api/generate 호출
             step_start = time.time()
             self.logger.info("[TIMING] AI 모델 호출 시작 - 여기서 /api/generate 요청 발생")
-            gm_response = self.gm_chain.run(
-                game_context=game_context,
+            gm_prompt = self._get_gm_prompt(game_id, game_context).format_prompt(
                 chat_summary=chat_summary,
                 relevant_context=context_info,
                 user_input=user_input
-            )
+            ).to_string()
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"GM 프롬프트:\n{gm_prompt}")
+            image_future = _EXEC.submit(self._decide_image, user_input, game_context)
+            gm_response = self._generate_stream(gm_prompt, on_field_closed)
+            image_decision = image_future.result()
             self.logger.info(f"[TIMING] AI 모델 응답: {time.time() - step_start:.2f}초")
 
             # JSON 응답 파싱
@@ -176,8 +219,16 @@ class LangChainGameMaster:
                         "options": ["다시 시도", "상황 확인"],
                         "need_image": False
                     }
+                elif is_complete_json_object(gm_response.strip()):
+                    response_data = orjson.loads(gm_response)
                 else:
-                    response_data = json.loads(gm_response)
+                    # JSON 객체 형태가 아니면 파싱을 시도하지 않고 message만 추출
+                    self.logger.error(f"JSON 형식이 아닌 응답: {gm_response[:200]}")
+                    response_data = {
+                        "message": extract_message(gm_response) or gm_response,
+                        "options": ["계속 진행", "상황 확인", "다른 행동"],
+                        "need_image": False
+                    }
             except json.JSONDecodeError as e:
                 # JSON 파싱 실패 시 기본 응답
                 self.logger.error(f"JSON 파싱 실패: {e}, 원본 응답: {gm_response[:200] if gm_response else 'None'}")
@@ -199,38 +250,25 @@ class LangChainGameMaster:
                 update_info = response_data["update_character"]
                 # update_info가 None이 아니고 딕셔너리인지 확인
                 if update_info and isinstance(update_info, dict):
+                    # 로컬 병합 결과를 바로 반환하고 PATCH는 백그라운드에서 전송
                     updated_char = self._update_character_info(game_id, update_info)
 
                     # 체력이 0 이하인 경우 죽음 처리
                     if updated_char and updated_char.get('health', 1) <= 0:
-                        death_response = self._handle_character_death(game_id, updated_char, user_input, response_data["message"])
+                        death_response = self._handle_character_death(
+                            game_id, updated_char, user_input, response_data["message"]
+                        )
                         return death_response
                 else:
                     self.logger.warning(f"update_character 값이 유효하지 않습니다: {update_info}")
 
-            # 7. 메모리에 대화 저장 (LangChain)
-            step_start = time.time()
-            metadata = {
-                "has_relevant_context": bool(relevant_context),
-                "context_sources": [doc.metadata.get("type", "unknown") for doc in relevant_context] if relevant_context else []
-            }
-            memory_manager.add_message(game_id, user_input, response_data["message"], metadata)
-            self.logger.info(f"[TIMING] 메모리 저장: {time.time() - step_start:.2f}초")
+            # 7-9. 대화 저장 - 응답 반환을 막지 않도록 백그라운드에서 처리 (스트리밍 중 시작되지 않았으면 지금 시작)
+            if not persist_scheduled:
+                self._schedule_persist(game_id, user_input, response_data["message"], metadata)
 
-            # 8. 사용자 입력을 먼저 벡터 저장소에 저장
-            step_start = time.time()
-            self._add_user_input_to_vector_storage(game_id, user_input)
-
-            # 9. AI 응답도 벡터 저장소에 저장
-            if response_data and "message" in response_data:
-                self._add_ai_response_to_vector_storage(game_id, response_data["message"], response_data.get("image_url"))
-            else:
-                self.logger.warning(f"response_data가 비어있거나 message 키가 없습니다: {response_data}")
-            self.logger.info(f"[TIMING] 벡터DB 저장: {time.time() - step_start:.2f}초")
-
-            # 이미지 생성 정보 (첫 번째 응답에서 이미 포함됨)
-            image_info = None
-            if response_data.get("need_image", False) and response_data.get("image_prompt"):
+            # 이미지 생성 정보 (별도 판단 결과 우선, 실패 시 GM 응답의 필드 사용)
+            image_info = image_decision
+            if image_info is None and response_data.get("need_image", False) and response_data.get("image_prompt"):
                 image_info = {
                     "should_generate": True,
                     "prompt": response_data["image_prompt"],
@@ -242,9 +280,9 @@ class LangChainGameMaster:
                 "success": True,
                 "message": response_data["message"],
                 "options": response_data.get("options", []),
-                "need_image": response_data.get("need_image", False),
+                "need_image": image_info is not None,
                 "image_info": image_info,
-                "relevant_context_found": bool(relevant_context),
+                "relevant_context_found": bool(relevant_docs),
                 "timestamp": datetime.now().isoformat()
             }
 
@@ -259,18 +297,171 @@ class LangChainGameMaster:
             self.logger.error(f"상세 에러:\n{traceback.format_exc()}")
             return self._handle_error(e)
 
+    def _get_gm_prompt(self, game_id: str, game_context: str) -> ChatPromptTemplate:
+        """게임 컨텍스트가 채워진 게임마스터 프롬프트 (게임 컨텍스트가 바뀔 때만 새로 생성)
+
+        시스템 지시문과 게임 컨텍스트가 매 턴 같은 접두부로 유지되어 Ollama가 KV 캐시를 재사용할 수 있습니다.
+        """
+        cached = self._prompt_by_game.get(game_id)
+        if cached is not None and cached[0] == game_context:
+            return cached[1]
+
+        prompt = GAMEMASTER_CHAT_PROMPT.partial(game_context=game_context)
+        self._prompt_by_game[game_id] = (game_context, prompt)
+        return prompt
+
+    def _generate(self, prompt: str) -> str:
+        """Ollama /api/generate 호출 (동시 요청 수 제한)"""
+        with self._generate_slots:
+            response = self.client.generate(
+                model=self.ollama_config["model"],
+                prompt=prompt,
+                stream=False,
+                options={"temperature": self.ollama_config["temperature"]},
+                keep_alive=self.ollama_config["keep_alive"]
+            )
+        return response["response"]
+
+    def _generate_stream(self, prompt: str, on_field_closed: Callable[[str, Any], None]) -> str:
+        """Ollama /api/generate 스트리밍 호출 - 최상위 필드가 완성될 때마다 콜백 호출 (동시 요청 수 제한)"""
+        scanner = StreamingFieldScanner(STREAMED_FIELDS)
+        parts = []
+
+        with self._generate_slots:
+            stream = self.client.generate(
+                model=self.ollama_config["model"],
+                prompt=prompt,
+                stream=True,
+                options={"temperature": self.ollama_config["temperature"]},
+                keep_alive=self.ollama_config["keep_alive"]
+            )
+            for chunk in stream:
+                text = chunk["response"]
+                parts.append(text)
+                for field, value in scanner.feed(text):
+                    on_field_closed(field, value)
+
+        return "".join(parts)
+
+    def _schedule_persist(self, game_id: str, user_input: str, message: str, metadata: Dict[str, Any]) -> Future:
+        """대화 한 턴 저장을 백그라운드 스레드 풀에 등록"""
+        future = _EXEC.submit(self._persist_turn, game_id, user_input, message, metadata)
+        self._pending_persist[game_id] = future
+        return future
+
+    def _persist_turn(self, game_id: str, user_input: str, message: str, metadata: Dict[str, Any]):
+        """대화 한 턴 저장 (LangChain 메모리 + 벡터 저장소) - 게임별로 직렬화"""
+        import time
+
+        with self._persist_locks.setdefault(game_id, threading.Lock()):
+            try:
+                step_start = time.time()
+                memory_manager.add_message(game_id, user_input, message, metadata)
+                self.logger.info(f"[TIMING] 메모리 저장: {time.time() - step_start:.2f}초")
+
+                step_start = time.time()
+                self._add_turn_to_vector_storage(game_id, user_input, message)
+                self.logger.info(f"[TIMING] 벡터DB 저장: {time.time() - step_start:.2f}초")
+            except Exception as e:
+                self.logger.error(f"대화 저장 실패 (game {game_id}): {e}")
+
+    def _load_conversations(self, game_id: str) -> List[Dict[str, Any]]:
+        """ChromaDB에서 전체 대화를 원본 메시지 단위로 묶어 시간순으로 조회
+
+        긴 메시지는 여러 청크 문서로 저장되므로 (timestamp, sequence_number)가 같은 청크를
+        chunk_id 순서로 다시 이어 붙여, remember_conversation이 추가하는 단위(메시지 하나)와 맞춥니다.
+        """
+        vector_store = vector_memory_manager.vector_stores.get(game_id)
+        all_conversations = []
+
+        if vector_store:
+            try:
+                results = vector_store.get(where={"type": "conversation"})
+                if results and 'documents' in results:
+                    messages: Dict[Tuple[str, int], List[Tuple[int, str]]] = {}
+                    for doc, metadata in zip(results['documents'], results['metadatas']):
+                        key = (metadata.get('timestamp', ''), metadata.get('sequence_number', 0))
+                        messages.setdefault(key, []).append((metadata.get('chunk_id', 0), doc))
+                    for (timestamp, sequence), chunks in messages.items():
+                        chunks.sort(key=lambda chunk: chunk[0])
+                        all_conversations.append({
+                            'content': _merge_chunks([chunk for _, chunk in chunks]),
+                            'timestamp': timestamp,
+                            'sequence': sequence
+                        })
+                    # 시간순 정렬
+                    all_conversations.sort(key=lambda x: (x['timestamp'], x['sequence']))
+            except Exception as e:
+                self.logger.warning(f"ChromaDB 대화 조회 실패: {e}")
+
+        return all_conversations
+
+    def _ensure_recent_buffer(self, game_id: str) -> deque:
+        """게임의 최근 대화 링 버퍼 반환 (_recent_lock 안에서 호출)
+
+        프로세스 시작 후 게임별 첫 호출에서만 ChromaDB를 조회해 링 버퍼를 채웁니다.
+        """
+        buffer = self._recent_conv.get(game_id)
+        if buffer is None:
+            vector_memory_manager.get_vector_store(game_id)
+            all_conversations = self._load_conversations(game_id)
+            buffer = deque(
+                (conv['content'] for conv in all_conversations[-RECENT_BUFFER_SIZE:]),
+                maxlen=RECENT_BUFFER_SIZE
+            )
+            self._recent_conv[game_id] = buffer
+            self._conv_count[game_id] = len(all_conversations)
+        return buffer
+
+    def _get_recent_conversations(self, game_id: str, limit: int) -> Tuple[List[str], int]:
+        """최근 대화 원문(오래된 순)과 전체 대화 수 반환"""
+        with self._recent_lock:
+            buffer = self._ensure_recent_buffer(game_id)
+            recent = list(islice(buffer, max(len(buffer) - limit, 0), None))
+            return recent, self._conv_count[game_id]
+
+    def _get_recent_text(self, game_id: str) -> Tuple[str, int, int]:
+        """프롬프트용 최근 RECENT_LIMIT개 대화 원문(줄바꿈으로 연결), 포함된 대화 수, 전체 대화 수 반환
+
+        연결된 문자열은 새 대화가 추가될 때까지 캐시되어 턴마다 다시 만들지 않습니다.
+        """
+        with self._recent_lock:
+            buffer = self._ensure_recent_buffer(game_id)
+            cached = self._recent_text.get(game_id)
+            if cached is None:
+                recent = list(islice(buffer, max(len(buffer) - RECENT_LIMIT, 0), None))
+                cached = ("\n".join(recent), len(recent))
+                self._recent_text[game_id] = cached
+            return cached[0], cached[1], self._conv_count[game_id]
+
+    def remember_conversation(self, game_id: str, content: str):
+        """ChromaDB에 저장된 대화를 최근 대화 링 버퍼에도 반영"""
+        with self._recent_lock:
+            buffer = self._recent_conv.get(game_id)
+            # 아직 채워지지 않은 게임은 첫 조회 시 ChromaDB에서 함께 불러옴
+            if buffer is None:
+                return
+            buffer.append(content)
+            self._conv_count[game_id] += 1
+            self._recent_text.pop(game_id, None)
+
     def _prepare_game_context(self, game_id: str) -> str:
         """API를 통해 게임 및 캐릭터 컨텍스트 준비"""
-        base_url = self.api_config["base_url"]
         context_parts = []
 
-        # 게임 정보 가져오기
+        # 캐릭터 블록은 캐릭터 정보가 바뀔 때까지 렌더링 결과를 재사용
+        characters_rendered = context_manager.get_context(game_id, "characters_rendered")
+
+        # 게임 정보와 캐릭터 정보는 서로 독립적이므로 동시에 조회
+        game_info_future = _EXEC.submit(self._get_game_info, game_id)
+        characters_future = None
+        if characters_rendered is None:
+            characters_future = _EXEC.submit(self._get_characters, game_id)
+
+        # 게임 정보 가져오기 (게임별 캐시)
         try:
-            game_api_url = f"{base_url}/api/games/{game_id}/title"
-            response = requests.get(game_api_url)
-            response.raise_for_status()
-            data = response.json()
-            
+            data = game_info_future.result()
+
             title = data.get("title", "알 수 없는 제목")
             genre = data.get("genre", "알 수 없는 장르")
             scenario = data.get("scenario", {})
@@ -292,34 +483,67 @@ class LangChainGameMaster:
             self.logger.error("게임 정보 API 응답 파싱 실패")
             context_parts.append("게임 정보 형식이 올바르지 않습니다.")
 
-        # 캐릭터 정보 가져오기
-        try:
-            char_api_url = f"{base_url}/api/games/{game_id}/characters"
-            response = requests.get(char_api_url)
-            response.raise_for_status()
-            characters = response.json()
-            
-            if characters:
-                context_parts.append("\n=== 캐릭터 정보 ===")
-                for char in characters:
-                    context_parts.append(f"- 이름: {char.get('name', '알 수 없음')} (ID: {char.get('id')})")
-                    context_parts.append(f"  - 직업: {char.get('class', '알 수 없음')}, 레벨: {char.get('level', 0)}")
-                    context_parts.append(f"  - 체력: {char.get('health', 0)}/{char.get('maxHealth', 0)}")
-                    context_parts.append(f"  - 능력치: {json.dumps(char.get('stats', {}), ensure_ascii=False)}")
-                    context_parts.append(f"  - 인벤토리: {json.dumps(char.get('inventory', []), ensure_ascii=False)}")
-                
-                # 나중에 업데이트를 위해 캐릭터 정보 저장
-                context_manager.set_context(game_id, "characters", characters)
+        # 캐릭터 정보 가져오기 (세션 컨텍스트에 있으면 재사용)
+        if characters_future is not None:
+            try:
+                characters = characters_future.result()
+                if characters:
+                    characters_rendered = self._render_characters(characters)
+                    context_manager.set_context(game_id, "characters_rendered", characters_rendered)
 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"캐릭터 정보 API 호출 실패: {e}")
-        except json.JSONDecodeError:
-            self.logger.error("캐릭터 정보 API 응답 파싱 실패")
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"캐릭터 정보 API 호출 실패: {e}")
+            except json.JSONDecodeError:
+                self.logger.error("캐릭터 정보 API 응답 파싱 실패")
+
+        if characters_rendered:
+            context_parts.append(characters_rendered)
 
         return "\n".join(context_parts)
 
+    def _render_characters(self, characters: List[Dict[str, Any]]) -> str:
+        """프롬프트용 캐릭터 정보 블록 생성"""
+        lines = ["\n=== 캐릭터 정보 ==="]
+        for char in characters:
+            lines.append(f"- 이름: {char.get('name', '알 수 없음')} (ID: {char.get('id')})")
+            lines.append(f"  - 직업: {char.get('class', '알 수 없음')}, 레벨: {char.get('level', 0)}")
+            lines.append(f"  - 체력: {char.get('health', 0)}/{char.get('maxHealth', 0)}")
+            lines.append(f"  - 능력치: {orjson.dumps(char.get('stats', {})).decode()}")
+            lines.append(f"  - 인벤토리: {orjson.dumps(char.get('inventory', [])).decode()}")
+        return "\n".join(lines)
+
+    def _get_game_info(self, game_id: str) -> Dict[str, Any]:
+        """게임 제목/장르/시나리오 조회 (성공한 응답은 게임별로 캐시)"""
+        cached = self._game_info_cache.get(game_id)
+        if cached is not None:
+            return cached
+
+        game_api_url = f"{self.api_config['base_url']}/api/games/{game_id}/title"
+        response = self.http.get(game_api_url)
+        response.raise_for_status()
+        data = response.json()
+
+        self._game_info_cache[game_id] = data
+        return data
+
+    def _get_characters(self, game_id: str) -> List[Dict[str, Any]]:
+        """캐릭터 목록 조회 (세션 컨텍스트에 없을 때만 API 호출)"""
+        characters = context_manager.get_context(game_id, "characters")
+        if characters:
+            return characters
+
+        char_api_url = f"{self.api_config['base_url']}/api/games/{game_id}/characters"
+        response = self.http.get(char_api_url)
+        response.raise_for_status()
+        characters = response.json()
+
+        if characters:
+            # 나중에 업데이트를 위해 캐릭터 정보 저장
+            context_manager.set_context(game_id, "characters", characters)
+        return characters
+
     def _update_character_info(self, game_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """API를 통해 캐릭터 정보 업데이트 (게임 ID 기반)"""
+        """캐릭터 정보 업데이트 (게임 ID 기반) - 로컬 병합 결과를 반환하고 API 반영은 백그라운드 처리"""
         base_url = self.api_config["base_url"]
         api_url = f"{base_url}/api/characters/game/{game_id}"
 
@@ -332,93 +556,85 @@ class LangChainGameMaster:
         # 게임에 첫 번째 캐릭터를 업데이트 대상으로 사용
         original_char_data = all_characters[0]
 
-        # 2. 변경분 병합 (Deep Merge)
-        merged_data = copy.deepcopy(original_char_data)
-        update_payload = {k: v for k, v in update_data.items()}
-        merged_data = _deep_merge(update_payload, merged_data)
-
-        # API 페이로드 생성 (변경된 필드만 포함)
+        # 2. API 페이로드 생성 (변경된 필드만 병합해서 포함)
         payload_to_send = {}
         allowed_fields = ["name", "class", "level", "stats", "inventory", "avatar", "health"]
 
         for field in allowed_fields:
-            if field in update_payload:
-                payload_to_send[field] = merged_data.get(field)
+            if field not in update_data:
+                continue
+            value = update_data[field]
+            original_value = original_char_data.get(field)
+            if field == "stats":
+                value = _merge_stats(original_value, value)
+            elif isinstance(value, dict) and isinstance(original_value, dict):
+                value = {**original_value, **value}
+            # 리스트(inventory 등)와 기본값은 그대로 교체
+            payload_to_send[field] = value
 
         if not payload_to_send:
             self.logger.warning(f"업데이트할 필드가 없습니다: {update_data}")
             return None
 
-        try:
-            self.logger.info(f"캐릭터 정보 업데이트 요청: game_id={game_id}, payload={payload_to_send}")
-            response = requests.patch(api_url, json=payload_to_send)
-            response.raise_for_status()
-            updated_char = response.json()
-            self.logger.info(f"캐릭터 정보 업데이트 성공: {updated_char}")
+        # 3. 병합 결과를 먼저 로컬에 반영 (사망 판정 등은 이 값을 사용)
+        merged_char = {**original_char_data, **payload_to_send}
+        all_characters[0] = merged_char
+        context_manager.set_context(game_id, "characters", all_characters)
+        context_manager.set_context(game_id, "characters_rendered", None)
 
-            # 메모리에 저장된 캐릭터 정보도 업데이트
-            all_characters[0] = updated_char
-            context_manager.set_context(game_id, "characters", all_characters)
+        # 4. PATCH는 응답을 막지 않도록 백그라운드에서 전송
+        version = self._character_versions.get(game_id, 0) + 1
+        self._character_versions[game_id] = version
+        self._pending_patch[game_id] = _EXEC.submit(self._patch_character, game_id, api_url, payload_to_send, version)
 
-            return updated_char
+        return merged_char
 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"캐릭터 정보 업데이트 API 호출 실패: {e}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                self.logger.error(f"응답 내용: {e.response.text}")
-            return None
+    def _patch_character(self, game_id: str, api_url: str, payload: Dict[str, Any], version: int):
+        """캐릭터 PATCH 전송 및 서버 결과로 로컬 캐시 보정 (실패 시 재시도)"""
+        import time
+
+        # 같은 게임의 PATCH는 보낸 순서대로 적용되도록 직렬화
+        with self._patch_locks.setdefault(game_id, threading.Lock()):
+            for attempt in range(1, CHARACTER_PATCH_RETRIES + 1):
+                try:
+                    self.logger.info(f"캐릭터 정보 업데이트 요청: game_id={game_id}, payload={payload}")
+                    response = self.http.patch(api_url, json=payload)
+                    response.raise_for_status()
+                    updated_char = response.json()
+                    self.logger.info(f"캐릭터 정보 업데이트 성공: {updated_char}")
+
+                    # 이후에 다른 업데이트가 없었을 때만 서버 결과로 로컬 캐시 교체
+                    if self._character_versions.get(game_id) == version:
+                        all_characters = context_manager.get_context(game_id, "characters")
+                        if all_characters:
+                            all_characters[0] = updated_char
+                            context_manager.set_context(game_id, "characters", all_characters)
+                            context_manager.set_context(game_id, "characters_rendered", None)
+                    return
+
+                except requests.exceptions.RequestException as e:
+                    self.logger.error(f"캐릭터 정보 업데이트 API 호출 실패 ({attempt}/{CHARACTER_PATCH_RETRIES}): {e}")
+                    if hasattr(e, 'response') and hasattr(e.response, 'text'):
+                        self.logger.error(f"응답 내용: {e.response.text}")
+                    if attempt < CHARACTER_PATCH_RETRIES:
+                        time.sleep(2 ** (attempt - 1))
+
+            # 재시도 모두 실패 - 다음 턴에 서버 상태를 다시 읽도록 캐시 무효화
+            if self._character_versions.get(game_id) == version:
+                context_manager.set_context(game_id, "characters", None)
+                context_manager.set_context(game_id, "characters_rendered", None)
 
     def _handle_character_death(self, game_id: str, character: Dict[str, Any], final_action: str, death_context: str) -> Dict[str, Any]:
         """캐릭터 죽음 처리 - 죽음 원인과 서사 요약 생성"""
         try:
-            # ChromaDB에서 전체 대화 히스토리 가져오기
-            vector_store = vector_memory_manager.vector_stores.get(game_id)
-            if not vector_store:
-                vector_memory_manager._initialize_game_vector_store(game_id)
-                vector_store = vector_memory_manager.vector_stores.get(game_id)
-
-            # 전체 대화 내역 조회
-            results = vector_store.get(where={"type": "conversation"})
-
-            conversation_history = []
-            if results and 'documents' in results:
-                for doc, metadata in zip(results['documents'], results['metadatas']):
-                    conversation_history.append({
-                        'content': doc,
-                        'timestamp': metadata.get('timestamp', ''),
-                        'role': metadata.get('role', 'unknown')
-                    })
-                # 시간순 정렬
-                conversation_history.sort(key=lambda x: x['timestamp'])
-
-            # 대화 내역을 텍스트로 변환
-            history_text = "\n".join([conv['content'] for conv in conversation_history[-20:]])  # 최근 20개
-
-            # LLM에게 죽음 원인 및 서사 요약 요청
-            death_prompt = f"""캐릭터가 사망했습니다. 다음 정보를 바탕으로 죽음의 원인과 캐릭터의 여정을 요약해주세요.
-
-=== 캐릭터 정보 ===
-이름: {character.get('name', '알 수 없음')}
-직업: {character.get('class', '알 수 없음')}
-레벨: {character.get('level', 1)}
-
-=== 최근 게임 진행 ===
-{history_text}
-
-=== 마지막 행동 ===
-{final_action}
-
-=== 죽음의 순간 ===
-{death_context}
-
-다음 형식으로 응답해주세요:
-1. 죽음의 원인을 2-3문장으로 설명
-2. 캐릭터의 여정을 3-4문장으로 요약 (시작부터 끝까지)
-3. 감동적이고 극적인 마무리 문장
-
-전체를 하나의 자연스러운 이야기로 작성하세요."""
+            if self.game_config["death_summary_llm"]:
+                death_summary = self._summarize_death_with_llm(game_id, character, final_action, death_context)
+            else:
+                # 기본: GM이 방금 생성한 죽음 묘사와 캐릭터 정보로 서사를 구성 (추가 LLM 호출 없음)
+                death_summary = f"""{death_context}
 
-            death_summary = self.llm.invoke(death_prompt)
+{character.get('name', '모험가')}({character.get('class', '알 수 없음')}, 레벨 {character.get('level', 1)})의 모험은 여기서 끝났습니다.
+마지막 행동: {final_action}"""
 
             # 죽음 메시지 구성
             final_message = f"""
@@ -459,16 +675,48 @@ class LangChainGameMaster:
                 "timestamp": datetime.now().isoformat()
             }
 
-    def _check_image_generation(self, user_input: str, gm_response: str, game_context: str) -> Optional[Dict[str, Any]]:
-        """이미지 생성 필요성 확인"""
+    def _summarize_death_with_llm(self, game_id: str, character: Dict[str, Any], final_action: str, death_context: str) -> str:
+        """최근 대화를 바탕으로 LLM에게 죽음 원인 및 서사 요약 요청"""
+        # 최근 대화 내역 (링 버퍼, 콜드 스타트 시에만 ChromaDB 조회)
+        recent_conversations, _ = self._get_recent_conversations(game_id, DEATH_HISTORY_LIMIT)
+        history_text = "\n".join(recent_conversations)
+
+        # LLM에게 죽음 원인 및 서사 요약 요청
+        death_prompt = f"""캐릭터가 사망했습니다. 다음 정보를 바탕으로 죽음의 원인과 캐릭터의 여정을 요약해주세요.
+
+=== 캐릭터 정보 ===
+이름: {character.get('name', '알 수 없음')}
+직업: {character.get('class', '알 수 없음')}
+레벨: {character.get('level', 1)}
+
+=== 최근 게임 진행 ===
+{history_text}
+
+=== 마지막 행동 ===
+{final_action}
+
+=== 죽음의 순간 ===
+{death_context}
+
+다음 형식으로 응답해주세요:
+1. 죽음의 원인을 2-3문장으로 설명
+2. 캐릭터의 여정을 3-4문장으로 요약 (시작부터 끝까지)
+3. 감동적이고 극적인 마무리 문장
+
+전체를 하나의 자연스러운 이야기로 작성하세요."""
+
+        return self.llm.invoke(death_prompt)
+
+    def _decide_image(self, user_input: str, current_situation: str) -> Optional[Dict[str, Any]]:
+        """이미지 생성 필요성 확인 (게임마스터 호출과 병렬 실행)"""
         try:
-            image_decision = self.image_chain.run(
+            image_prompt = IMAGE_DECISION_TEMPLATE.format(
                 user_input=user_input,
-                gm_response=gm_response,
-                current_situation=game_context
+                current_situation=current_situation
             )
+            image_decision = self._generate(image_prompt)
 
-            image_data = json.loads(image_decision)
+            image_data = orjson.loads(image_decision)
 
             if image_data.get("need_image", False):
                 return {
@@ -488,7 +736,7 @@ class LangChainGameMaster:
             current_scene = context_manager.get_context(game_id, "current_scene") or "일반적인 상황"
 
             response = self.character_chain.run(
-                character_data=json.dumps(character_data, ensure_ascii=False),
+                character_data=orjson.dumps(character_data).decode(),
                 user_action=user_action,
                 current_scene=current_scene
             )
@@ -523,19 +771,57 @@ class LangChainGameMaster:
             ])
         }
 
+    def _drain_background(self, game_id: str):
+        """게임의 진행 중인 대화 저장/캐릭터 PATCH가 끝날 때까지 기다린 뒤 게임별 락과 버전 정리
+
+        저장이 끝나기 전에 메모리를 지우면 이전 대화가 지운 뒤에 다시 기록되므로 리셋/해제 전에 호출합니다.
+        """
+        for pending in (self._pending_persist.pop(game_id, None), self._pending_patch.pop(game_id, None)):
+            if pending is not None:
+                try:
+                    pending.result()
+                except Exception as e:
+                    self.logger.warning(f"백그라운드 작업 실패 (game {game_id}): {e}")
+        self._persist_locks.pop(game_id, None)
+        self._patch_locks.pop(game_id, None)
+        self._character_versions.pop(game_id, None)
+
     def reset_game(self, game_id: str):
         """게임 리셋 (모든 메모리 시스템)"""
+        self._drain_background(game_id)
+
         # LangChain 메모리 리셋
         memory_manager.reset_game_memory(game_id)
 
-        # 세션 컨텍스트 리셋
-        context_manager.session_contexts.pop(game_id, None)
+        # 세션 컨텍스트 / 게임 정보 캐시 리셋
+        context_manager.clear_context(game_id)
+        self._game_info_cache.pop(game_id, None)
+        self._prompt_by_game.pop(game_id, None)
 
         # 벡터 메모리 리셋
         vector_memory_manager.reset_vector_memory(game_id)
 
+        # 최근 대화 링 버퍼 리셋
+        with self._recent_lock:
+            self._recent_conv.pop(game_id, None)
+            self._conv_count.pop(game_id, None)
+            self._recent_text.pop(game_id, None)
+
         self.logger.info(f"Game {game_id} has been completely reset")
 
+    def release_game(self, game_id: str):
+        """게임의 메모리 캐시만 해제 (저장된 데이터는 유지, 다음 요청 시 다시 로드)"""
+        self._drain_background(game_id)
+        context_manager.clear_context(game_id)
+        self._game_info_cache.pop(game_id, None)
+        self._prompt_by_game.pop(game_id, None)
+        with self._recent_lock:
+            self._recent_conv.pop(game_id, None)
+            self._conv_count.pop(game_id, None)
+            self._recent_text.pop(game_id, None)
+
+        vector_memory_manager.release(game_id)
+
     def clear_memory(self, game_id: str):
         """메모리만 클리어 (컨텍스트는 유지)"""
         memory_manager.clear_memory(game_id)
@@ -550,28 +836,22 @@ class LangChainGameMaster:
         """채팅 히스토리 반환"""
         return memory_manager.get_recent_messages(game_id, limit)
 
-    def _add_user_input_to_vector_storage(self, game_id: str, user_input: str):
-        """사용자 입력을 벡터 저장소에 추가"""
+    def _add_turn_to_vector_storage(self, game_id: str, user_input: str, ai_response: str, image_url: Optional[str] = None):
+        """사용자 입력과 AI 응답을 한 번의 배치로 벡터 저장소에 추가 (이미지 URL 포함)"""
         try:
-            metadata = {
+            user_content = f"사용자: {user_input}"
+            user_metadata = {
                 "type": "conversation",
                 "source": "user_input",
                 "game_id": game_id,
                 "role": "user"
             }
-            vector_memory_manager.add_scenario_data(game_id, f"사용자: {user_input}", metadata)
-            self.logger.info(f"사용자 입력 저장 완료: {user_input[:50]}...")
-        except Exception as e:
-            self.logger.warning(f"Failed to add user input to vector storage: {e}")
 
-    def _add_ai_response_to_vector_storage(self, game_id: str, ai_response: str, image_url: Optional[str] = None):
-        """AI 응답을 벡터 저장소에 추가 (이미지 URL 포함)"""
-        try:
-            content = f"GM: {ai_response}"
+            ai_content = f"GM: {ai_response}"
             if image_url:
-                content += f"\n[이미지: {image_url}]"
+                ai_content += f"\n[이미지: {image_url}]"
 
-            metadata = {
+            ai_metadata = {
                 "type": "conversation",
                 "source": "ai_response",
                 "game_id": game_id,
@@ -579,12 +859,16 @@ class LangChainGameMaster:
             }
 
             if image_url:
-                metadata["image_url"] = image_url
+                ai_metadata["image_url"] = image_url
 
-            vector_memory_manager.add_scenario_data(game_id, content, metadata)
-            self.logger.info(f"AI 응답 저장 완료 (이미지 URL: {image_url})")
+            vector_memory_manager.add_scenario_batch(
+                game_id, [(user_content, user_metadata), (ai_content, ai_metadata)]
+            )
+            self.remember_conversation(game_id, user_content)
+            self.remember_conversation(game_id, ai_content)
+            self.logger.info(f"대화 턴 저장 완료: {user_input[:50]}... (이미지 URL: {image_url})")
         except Exception as e:
-            self.logger.warning(f"Failed to add AI response to vector storage: {e}")
+            self.logger.warning(f"Failed to add conversation turn to vector storage: {e}")
 
     def _handle_error(self, error: Exception) -> Dict[str, Any]:
         """에러 처리"""
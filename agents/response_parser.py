@@ -0,0 +1,124 @@
+"""
+LLM 응답 JSON 파싱 유틸리티
+스트리밍 중인 응답에서 필드가 완성되는 시점을 감지
+"""
+
+import json
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+# 깨진 JSON 응답에서 message 문자열 값만 뽑아내는 정규식
+_JSON_MSG_RE = re.compile(r'"message"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+
+def is_complete_json_object(text: str) -> bool:
+    """'{'로 시작해 중괄호가 정확히 닫히는 텍스트인지 한 번의 순회로 확인 (전체 파싱 전 사전 검사)"""
+    if not text.startswith("{"):
+        return False
+
+    depth = 0
+    in_string = False
+    escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                # 최상위 객체가 닫힌 뒤에는 공백만 허용
+                return not text[i + 1:].strip()
+            if depth < 0:
+                return False
+
+    return False
+
+
+def extract_message(text: str) -> Optional[str]:
+    """JSON으로 파싱할 수 없는 응답에서 message 필드 값 추출"""
+    match = _JSON_MSG_RE.search(text)
+    if not match:
+        return None
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except json.JSONDecodeError:
+        return match.group(1)
+
+
+class StreamingFieldScanner:
+    """스트리밍 JSON 응답에서 최상위 문자열 필드가 닫히는 시점을 감지하는 스캐너
+
+    중괄호 깊이와 문자열 상태만 추적하는 상태 머신으로, 토큰이 들어올 때마다
+    새로 들어온 부분만 검사합니다. 코드 블록(```json) 등 JSON 바깥의 텍스트는 무시합니다.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_value = False
+        self._last_key = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """청크를 추가하고 이번에 완성된 (필드, 값) 목록을 반환"""
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        completed.extend(self._on_top_level_string(text[self._string_start:i + 1]))
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_value = True
+                elif ch == ",":
+                    self._expect_value = False
+
+        self._pos = len(text)
+        return completed
+
+    def _on_top_level_string(self, literal: str) -> List[Tuple[str, Any]]:
+        """최상위 객체의 문자열(키 또는 값) 처리"""
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError:
+            return []
+
+        if not self._expect_value:
+            self._last_key = value
+            return []
+
+        self._expect_value = False
+        if self._last_key in self.fields:
+            return [(self._last_key, value)]
+        return []
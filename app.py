@@ -6,42 +6,67 @@ Flask + LangChain + Ollama를 사용한 간소화된 구조
 import os
 import eventlet
 eventlet.monkey_patch()
-
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from flask_socketio import SocketIO, Namespace, emit
+import eventlet.queue
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
+
+from flask import Flask, Response, abort, render_template, request, session, jsonify, send_from_directory
+from werkzeug.security import safe_join
+from flask_cors import CORS
+from flask_socketio import SocketIO, Namespace, emit, join_room
 import logging
 from datetime import datetime
 import uuid
 import time
+import atexit
+import traceback
+from collections import OrderedDict
+from itertools import chain
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 # 프로젝트 모듈 임포트
 from config.settings import get_config
 from agents.gamemaster import gamemaster
 from memory.game_memory import memory_manager, context_manager
+from memory.vector_memory import vector_memory_manager
 from comfy_manager import ComfyUIManager
-import copy
+import json_utils
 
 # Flask 앱 초기화
 app = Flask(__name__)
+app.json = json_utils.OrjsonProvider(app)
 app.secret_key = os.getenv('SECRET_KEY', 'langchain-trpg-secret-key')
 socketio = SocketIO(
     app,
-        cors_allowed_origins="*",
+    cors_allowed_origins="*",
     async_mode='eventlet',
     ping_timeout=60,
-    ping_interval=25
+    ping_interval=25,
+    async_handlers=True,
+    json=json_utils
 )
 
-# CORS 설정 (모든 HTTP 요청에 대해)
-@app.after_request
-def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    return response
+# CORS 설정 (모든 HTTP 요청에 대해 - 프런트엔드가 /images/*도 교차 출처로 불러옴)
+CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"],
+     methods=["GET", "PUT", "POST", "DELETE", "OPTIONS"])
+
+# 게임 세션 정보
+@dataclass(slots=True)
+class GameSession:
+    session_id: Optional[str]
+    active: bool = True
+    connection_count: int = 0
+    last_active: float = field(default_factory=time.monotonic)
 
-# 게임 세션 저장소
-game_sessions = {}
+# 게임 세션 저장소 - 최근 사용 순서(LRU)로 유지
+# (여러 그린 스레드에서 접근하므로 변경 시 _sessions_lock 사용)
+game_sessions: OrderedDict[str, GameSession] = OrderedDict()
+_sessions_lock = Semaphore()
+
+# 모든 게임이 공유하는 WebSocket 네임스페이스 (게임별 전송은 game_id 룸으로 구분)
+GAME_NAMESPACE = '/game'
+_session_reaper_task = None
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -49,21 +74,27 @@ logger = logging.getLogger(__name__)
 
 # 설정 로드
 config = get_config()
+game_config = get_config("game")
 image_config = get_config("image_storage")
 comfyui_config = get_config("comfyui")
 
 # 이미지 저장 디렉토리 생성
 IMAGE_STORAGE_DIR = image_config["storage_directory"]
 os.makedirs(IMAGE_STORAGE_DIR, exist_ok=True)
+app.use_x_sendfile = image_config["use_x_sendfile"]
 logger.info(f"📁 이미지 저장 디렉토리: {IMAGE_STORAGE_DIR}")
 
+# 임베딩 모델 추론은 네이티브 스레드에서 실행 (추론 중에도 eventlet 허브가 다른 소켓을 처리하도록)
+vector_memory_manager.set_compute_executor(tpool.execute)
+
 # ComfyUI 매니저 초기화
 try:
     comfyui_url = comfyui_config["server_url"]
     logger.info(f"🔌 ComfyUI 연결 시도: {comfyui_url}")
     comfy_manager = ComfyUIManager(
         server_url=comfyui_url,
-        timeout=comfyui_config["timeout"]
+        timeout=comfyui_config["timeout"],
+        max_image_bytes=image_config["max_file_size_mb"] * 1024 * 1024
     )
 
     # 서버 연결 상태 확인
@@ -77,11 +108,122 @@ try:
         comfy_manager = None
 except Exception as e:
     logger.error(f"❌ ComfyUI 초기화 실패: {e}")
-    import traceback
     logger.error(traceback.format_exc())
     comfy_manager = None
 
 
+# ChromaDB 이미지 정보 기록 큐 - (game_id, content, metadata)를 모아 게임별로 한 번에 기록
+image_write_queue = eventlet.queue.Queue()
+IMAGE_WRITE_BATCH_SIZE = 100
+IMAGE_WRITE_FLUSH_INTERVAL = 0.5  # 초
+_image_flush_task = None
+
+
+def _flush_image_writes(items):
+    """큐에서 꺼낸 이미지 정보를 게임별 배치로 ChromaDB에 기록"""
+    by_game = {}
+    for game_id, content, metadata in items:
+        by_game.setdefault(game_id, []).append((content, metadata))
+
+    for game_id, docs in by_game.items():
+        try:
+            vector_memory_manager.add_scenario_batch(game_id, docs)
+            for content, _ in docs:
+                gamemaster.remember_conversation(game_id, content)
+            logger.info(f"✅ [{game_id}] 이미지 정보 {len(docs)}건 ChromaDB에 저장 완료")
+        except Exception as e:
+            logger.error(f"❌ [{game_id}] ChromaDB 저장 실패: {e}")
+
+
+def _chroma_flush_loop():
+    """이미지 기록 큐 소비자 - 최대 IMAGE_WRITE_BATCH_SIZE개 또는 IMAGE_WRITE_FLUSH_INTERVAL초 단위로 기록"""
+    while True:
+        items = [image_write_queue.get()]
+        deadline = time.time() + IMAGE_WRITE_FLUSH_INTERVAL
+
+        while len(items) < IMAGE_WRITE_BATCH_SIZE:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(image_write_queue.get(timeout=remaining))
+            except eventlet.queue.Empty:
+                break
+
+        _flush_image_writes(items)
+
+
+def _flush_pending_image_writes():
+    """종료 시 큐에 남은 이미지 정보 기록"""
+    items = []
+    while True:
+        try:
+            items.append(image_write_queue.get_nowait())
+        except eventlet.queue.Empty:
+            break
+    if items:
+        _flush_image_writes(items)
+
+
+atexit.register(_flush_pending_image_writes)
+
+
+def enqueue_image_write(game_id: str, content: str, metadata: dict):
+    """이미지 정보를 ChromaDB 기록 큐에 추가 (소비자는 첫 호출 시 시작)"""
+    global _image_flush_task
+    if _image_flush_task is None:
+        _image_flush_task = socketio.start_background_task(_chroma_flush_loop)
+    image_write_queue.put((game_id, content, metadata))
+
+
+def _touch_session(game_id: str, delta: int = 0):
+    """세션을 최근 사용으로 표시하고 연결 수를 delta만큼 변경"""
+    with _sessions_lock:
+        session = game_sessions.get(game_id)
+        if session is not None:
+            session.connection_count += delta
+            session.last_active = time.monotonic()
+            game_sessions.move_to_end(game_id)
+
+
+def _release_session(game_id: str):
+    """세션 해제 - 게임 룸 정리 및 게임별 메모리 캐시(ChromaDB 컬렉션 등) 반환"""
+    socketio.close_room(game_id, namespace=GAME_NAMESPACE)
+    gamemaster.release_game(game_id)
+    logger.info(f"🧹 [{game_id}] 유휴 세션 해제")
+
+
+def _evict_sessions():
+    """최대 세션 수 초과분과 유휴 시간이 지난 세션 해제 (연결 중인 세션은 유지)"""
+    idle_before = time.monotonic() - game_config["session_idle_ttl"]
+    evicted = []
+
+    with _sessions_lock:
+        overflow = len(game_sessions) - game_config["max_sessions"]
+        # OrderedDict 앞쪽이 가장 오래 사용되지 않은 세션
+        for game_id, session in list(game_sessions.items()):
+            if session.connection_count > 0:
+                continue
+            if overflow > 0 or session.last_active < idle_before:
+                del game_sessions[game_id]
+                evicted.append(game_id)
+                overflow -= 1
+
+    for game_id in evicted:
+        _release_session(game_id)
+
+
+def _session_reaper_loop():
+    """유휴 세션 정리 루프"""
+    interval = min(60, game_config["session_idle_ttl"])
+    while True:
+        socketio.sleep(interval)
+        try:
+            _evict_sessions()
+        except Exception as e:
+            logger.error(f"❌ 유휴 세션 정리 실패: {e}")
+
+
 def generate_image_async(game_id: str, prompt: str):
     """비동기로 이미지 생성 및 클라이언트에게 전송"""
     if not comfy_manager:
@@ -96,12 +238,8 @@ def generate_image_async(game_id: str, prompt: str):
     try:
         logger.info(f"🎨 [{game_id}] 이미지 생성 시작: {prompt}")
 
-        # lora.json 워크플로우 복사 및 프롬프트 수정
-        workflow = copy.deepcopy(comfy_manager.default_workflow)
-
-        # 노드 6번: 프롬프트 설정
-        if "6" in workflow:
-            workflow["6"]["inputs"]["text"] = prompt
+        # lora.json 워크플로우 템플릿에 프롬프트(노드 6번) 설정
+        workflow = comfy_manager.build_workflow(prompt)
 
         # 워크플로우 큐에 추가
         prompt_id = comfy_manager.queue_prompt(workflow)
@@ -112,123 +250,88 @@ def generate_image_async(game_id: str, prompt: str):
 
         logger.info(f"🎨 [{game_id}] 이미지 생성 큐 추가 완료: {prompt_id}")
 
-        # 완료 대기 (폴링 방식으로 직접 확인)
+        # 완료 대기 (ComfyUI WebSocket 완료 이벤트)
         def wait_and_send():
-            import time
-            max_wait = 300  # 5분
-            start_time = time.time()
+            max_wait = comfyui_config["timeout"]
 
             logger.info(f"⏳ [{game_id}] 이미지 생성 대기 중... (prompt_id: {prompt_id})")
 
-            while time.time() - start_time < max_wait:
-                # 히스토리에서 결과 확인
-                history = comfy_manager.get_history(prompt_id)
-
-                if history and prompt_id in history:
-                    outputs = history[prompt_id].get('outputs', {})
-
-                    # 이미지 찾기
-                    image_urls = []
-                    for node_id, output in outputs.items():
-                        if 'images' in output:
-                            logger.info(f"🖼️  [{game_id}] 이미지 발견: 노드 {node_id}, {len(output['images'])}개")
-
-                            for img_info in output['images']:
-                                # 이미지 다운로드
-                                img_data = comfy_manager.get_image(
-                                    img_info['filename'],
-                                    img_info.get('subfolder', ''),
-                                    img_info.get('type', 'output')
-                                )
-
-                                if img_data:
-                                    # 고유한 파일명 생성
-                                    timestamp = int(time.time() * 1000)
-                                    unique_id = str(uuid.uuid4())[:8]
-                                    file_ext = img_info['filename'].split('.')[-1] if '.' in img_info['filename'] else 'png'
-                                    new_filename = f"game_{game_id}_{timestamp}_{unique_id}.{file_ext}"
-
-                                    # 서버에 이미지 저장
-                                    save_path = os.path.join(IMAGE_STORAGE_DIR, new_filename)
-                                    with open(save_path, 'wb') as f:
-                                        f.write(img_data)
-
-                                    # URL 생성
-                                    image_url = f"{image_config['base_url']}/{new_filename}"
-                                    image_urls.append(image_url)
-
-                                    logger.info(f"✅ [{game_id}] 이미지 저장 완료: {save_path}")
-                                    logger.info(f"🔗 [{game_id}] 이미지 URL: {image_url}")
-
-                    if image_urls:
-                        # 전송할 데이터 구조 로깅
-                        logger.info(f"\n{'='*60}")
-                        logger.info(f"📤 [{game_id}] 이미지 URL 전송 준비")
-                        logger.info(f"{'='*60}")
-                        logger.info(f"   네임스페이스: /game/{game_id}")
-                        logger.info(f"   이미지 개수: {len(image_urls)}")
-
-                        for idx, url in enumerate(image_urls):
-                            logger.info(f"   이미지 {idx+1}: {url}")
-
-                        # WebSocket으로 이미지 URL 전송
-                        namespace = f"/game/{game_id}"
-                        payload = {
-                            'success': True,
-                            'game_id': game_id,
-                            'prompt': prompt,
-                            'image_urls': image_urls,
-                            'timestamp': datetime.now().isoformat()
-                        }
-
-                        logger.info(f"\n🚀 [{game_id}] socketio.emit() 호출:")
-                        logger.info(f"   이벤트: 'game_image'")
-                        logger.info(f"   네임스페이스: {namespace}")
-
-                        import json
-                        logger.info(f"   페이로드 구조:\n{json.dumps(payload, indent=2, ensure_ascii=False)}")
-
-                        socketio.emit('game_image', payload, namespace=namespace)
-
-                        # ChromaDB에 이미지 URL 저장
-                        try:
-                            from memory.vector_memory import vector_memory_manager
-
-                            # 이미지 정보를 별도 문서로 저장
-                            first_image_url = image_urls[0] if image_urls else None
-                            if first_image_url:
-                                logger.info(f"📝 [{game_id}] ChromaDB에 이미지 URL 추가: {first_image_url}")
-                                # 새로운 문서로 이미지 정보 추가
-                                image_content = f"[생성된 이미지]\n프롬프트: {prompt}\nURL: {first_image_url}"
-                                image_metadata = {
-                                    "type": "conversation",
-                                    "role": "assistant",
-                                    "source": "generated_image",
-                                    "game_id": game_id,
-                                    "image_url": first_image_url,
-                                    "prompt": prompt
-                                }
-                                vector_memory_manager.add_scenario_data(game_id, image_content, image_metadata)
-                                logger.info(f"✅ [{game_id}] 이미지 정보 ChromaDB에 저장 완료")
-                        except Exception as e:
-                            logger.error(f"❌ [{game_id}] ChromaDB 저장 실패: {e}")
-
-                        logger.info(f"✅ [{game_id}] 이미지 URL 전송 완료!")
-                        logger.info(f"{'='*60}\n")
-                        return
-                    else:
-                        logger.warning(f"⚠️  [{game_id}] 히스토리에 이미지 없음")
-                        return
-
-                # 2초 대기 후 재시도
-                time.sleep(2)
-
-            logger.error(f"❌ [{game_id}] 이미지 생성 시간 초과 ({max_wait}초)")
-
-        # 별도 스레드에서 실행
-        import threading
-        thread = threading.Thread(target=wait_and_send, daemon=True)
-        thread.start()
+            outputs = comfy_manager.wait_for_outputs(prompt_id, timeout=max_wait)
+            if outputs is None:
+                logger.error(f"❌ [{game_id}] 이미지 생성 시간 초과 ({max_wait}초)")
+                return
+
+            # 모든 출력 노드의 이미지 정보를 한 번에 펼침
+            image_infos = list(chain.from_iterable(
+                output['images'] for output in outputs.values() if 'images' in output
+            ))
+            logger.info(f"🖼️  [{game_id}] 이미지 발견: {len(image_infos)}개")
+
+            # 같은 작업의 이미지는 타임스탬프/고유 ID를 공유하고 인덱스로 구분
+            now_ms = int(time.time() * 1000)
+            unique_id = uuid.uuid4().hex[:8]
+
+            # 고유한 파일명 생성 (다운로드 스트림을 열기 전에 계산)
+            new_filenames = [
+                f"game_{game_id}_{now_ms}_{i}_{unique_id}{os.path.splitext(img_info['filename'])[1] or '.png'}"
+                for i, img_info in enumerate(image_infos)
+            ]
+            save_paths = [os.path.join(IMAGE_STORAGE_DIR, name) for name in new_filenames]
+
+            # 여러 이미지를 동시에 다운로드해 저장 (입력 순서 유지, 크기 제한 초과 시 해당 이미지만 실패)
+            saved = comfy_manager.save_images(image_infos, save_paths)
+
+            image_urls = []
+            for ok, new_filename, save_path in zip(saved, new_filenames, save_paths):
+                if not ok:
+                    continue
+                # URL 생성
+                image_url = f"{image_config['base_url']}/{new_filename}"
+                image_urls.append(image_url)
+                logger.info(f"✅ [{game_id}] 이미지 저장 완료: {save_path}")
+                logger.info(f"🔗 [{game_id}] 이미지 URL: {image_url}")
+
+            if image_urls:
+                # WebSocket으로 이미지 URL 전송
+                payload = {
+                    'success': True,
+                    'game_id': game_id,
+                    'prompt': prompt,
+                    'image_urls': image_urls,
+                    'timestamp': datetime.now().isoformat()
+                }
+
+                # 전송할 데이터 구조 로깅 (DEBUG 레벨에서만 직렬화)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"🚀 [{game_id}] socketio.emit('game_image') 룸: {game_id}")
+                    logger.debug(f"   페이로드 구조:\n{json_utils.dumps_pretty(payload)}")
+
+                socketio.emit('game_image', payload, namespace=GAME_NAMESPACE, to=game_id)
+
+                # ChromaDB에 이미지 URL 저장 (배치 큐로 전달, 백그라운드에서 일괄 기록)
+                first_image_url = image_urls[0] if image_urls else None
+                if first_image_url:
+                    logger.info(f"📝 [{game_id}] ChromaDB에 이미지 URL 추가 예약: {first_image_url}")
+                    # 새로운 문서로 이미지 정보 추가
+                    image_content = f"[생성된 이미지]\n프롬프트: {prompt}\nURL: {first_image_url}"
+                    image_metadata = {
+                        "type": "conversation",
+                        "role": "assistant",
+                        "source": "generated_image",
+                        "game_id": game_id,
+                        "image_url": first_image_url,
+                        "prompt": prompt
+                    }
+                    enqueue_image_write(game_id, image_content, image_metadata)
+
+                logger.info(f"✅ [{game_id}] 이미지 URL {len(image_urls)}개 전송 완료")
+                return
+            else:
+                logger.warning(f"⚠️  [{game_id}] 생성 결과에 이미지 없음")
+                return
+
+        # eventlet 그린 스레드에서 실행 (완료 이벤트를 기다리는 동안 다른 요청 처리)
+        socketio.start_background_task(wait_and_send)
 
     except Exception as e:
         logger.error(f"[{game_id}] 이미지 생성 실패: {e}")
@@ -241,7 +344,22 @@ def index():
 @app.route('/images/<path:filename>')
 def serve_image(filename):
     """생성된 이미지 파일 서빙"""
-    return send_from_directory(IMAGE_STORAGE_DIR, filename)
+    accel_prefix = image_config["accel_redirect_prefix"]
+    if accel_prefix:
+        # nginx internal location으로 위임 (이미지 바이트가 Python/eventlet 허브를 거치지 않음)
+        if safe_join(IMAGE_STORAGE_DIR, filename) is None:
+            abort(404)
+        return Response(headers={
+            "X-Accel-Redirect": f"{accel_prefix.rstrip('/')}/{filename}",
+            "Cache-Control": f"public, max-age={image_config['cache_max_age']}"
+        })
+
+    return send_from_directory(
+        IMAGE_STORAGE_DIR,
+        filename,
+        conditional=True,
+        max_age=image_config["cache_max_age"]
+    )
 
 @app.route('/health')
 def health_check():
@@ -270,7 +388,7 @@ def health_check():
 @app.route('/api/session/create', methods=['POST'])
 def create_session():
     """
-    Node.js에서 게임 세션 정보 받아서 WebSocket 네임스페이스 등록
+    Node.js에서 게임 세션 정보 받아서 등록 (WebSocket은 공용 '/game' 네임스페이스의 game_id 룸 사용)
 
     Request:
     {
@@ -278,6 +396,7 @@ def create_session():
         "session_id": "uuid-xxx"
     }
     """
+    global _session_reaper_task
     try:
         data = request.get_json()
         game_id = data.get('game_id')
@@ -288,6 +407,7 @@ def create_session():
                 "success": False,
                 "error": "game_id가 필요합니다"
             }), 400
+        game_id = str(game_id)
 
         logger.info(f"\n{'='*50}")
         logger.info(f"📡 게임 세션 등록 요청")
@@ -295,35 +415,39 @@ def create_session():
         logger.info(f"   세션 ID: {session_id}")
         logger.info(f"{'='*50}")
 
-        # 이미 존재하는 세션인지 확인
-        if game_id in game_sessions:
+        # 존재 확인과 등록을 한 번에 처리 (네임스페이스는 공용이므로 세션 정보만 등록)
+        with _sessions_lock:
+            already_exists = game_id in game_sessions
+            if already_exists:
+                game_sessions[game_id].last_active = time.monotonic()
+                game_sessions.move_to_end(game_id)
+            else:
+                game_sessions[game_id] = GameSession(session_id=session_id)
+
+        # 유휴 세션 정리 (정리 루프는 첫 세션 등록 시 시작)
+        if _session_reaper_task is None:
+            _session_reaper_task = socketio.start_background_task(_session_reaper_loop)
+        if len(game_sessions) > game_config["max_sessions"]:
+            _evict_sessions()
+
+        if already_exists:
             logger.info(f"⚠️  세션 이미 존재: {game_id}")
             return jsonify({
                 "success": True,
                 "game_id": game_id,
-                "websocket_namespace": f"/game/{game_id}",
+                "websocket_namespace": GAME_NAMESPACE,
+                "room": game_id,
                 "status": "already_exists"
             })
 
-        # 세션 등록
-        game_sessions[game_id] = {
-            "session_id": session_id,
-            "active": True,
-            "connection_count": 0
-        }
-
-        namespace = f"/game/{game_id}"
-
-        # 동적으로 네임스페이스 등록
-        socketio.on_namespace(GameNamespace(namespace, game_id))
-
-        logger.info(f"✅ WebSocket 네임스페이스 등록 완료: {namespace}")
+        logger.info(f"✅ 게임 세션 등록 완료: {GAME_NAMESPACE} (룸: {game_id})")
 
         return jsonify({
             "success": True,
             "game_id": game_id,
             "session_id": session_id,
-            "websocket_namespace": namespace
+            "websocket_namespace": GAME_NAMESPACE,
+            "room": game_id
         })
 
     except Exception as e:
@@ -412,50 +536,40 @@ def get_game_context(game_id):
 
 @app.route('/api/history/<game_id>')
 def get_chat_history(game_id):
-    """채팅 히스토리 조회 - ChromaDB에서 원문 전체 조회"""
-    try:
-        from memory.vector_memory import vector_memory_manager
+    """채팅 히스토리 조회 - ChromaDB에서 원문 조회 (오래된 순, limit/offset 페이지네이션)
 
-        # 벡터 스토어 초기화 (없으면 생성)
-        if game_id not in vector_memory_manager.vector_stores:
-            vector_memory_manager._initialize_game_vector_store(game_id)
-
-        vector_store = vector_memory_manager.vector_stores.get(game_id)
-
-        if not vector_store:
-            return jsonify({
-                "success": True,
-                "game_id": game_id,
-                "history": [],
-                "total": 0
-            })
+    Query:
+        limit: 조회할 대화 수 (생략 시 전체)
+        offset: 건너뛸 대화 수 (기본 0)
+    """
+    try:
+        limit = request.args.get('limit', type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        if limit is not None and limit < 0:
+            limit = None
 
-        # 대화 타입만 필터링하여 전체 조회
+        # 대화 문서 페이지 조회 (순번 ID 범위 조회, 벡터 스토어가 없으면 생성)
         try:
-            results = vector_store.get(
-                where={"type": "conversation"}
-            )
+            rows, total = vector_memory_manager.get_conversation_page(game_id, limit=limit, offset=offset)
 
             history = []
-            if results and 'documents' in results:
-                for idx, (doc, metadata) in enumerate(zip(results['documents'], results['metadatas'])):
-                    history.append({
-                        "content": doc,  # 원문 텍스트
-                        "role": metadata.get('role', 'unknown'),  # user 또는 assistant
-                        "timestamp": metadata.get('timestamp', ''),
-                        "sequence_number": metadata.get('sequence_number', idx),
-                        "image_url": metadata.get('image_url'),  # 이미지 URL (있으면)
-                        "game_id": metadata.get('game_id', game_id)
-                    })
-
-            # timestamp 또는 sequence_number로 정렬 (오래된 것 → 최신 순)
-            history.sort(key=lambda x: (x.get('timestamp', ''), x.get('sequence_number', 0)))
+            for sequence, doc, metadata in rows:
+                history.append({
+                    "content": doc,  # 원문 텍스트
+                    "role": metadata.get('role', 'unknown'),  # user 또는 assistant
+                    "timestamp": metadata.get('timestamp', ''),
+                    "sequence_number": sequence,
+                    "image_url": metadata.get('image_url'),  # 이미지 URL (있으면)
+                    "game_id": metadata.get('game_id', game_id)
+                })
 
             return jsonify({
                 "success": True,
                 "game_id": game_id,
                 "history": history,
-                "total": len(history),
+                "total": total,
+                "limit": limit,
+                "offset": offset,
                 "source": "chromadb_original_text"
             })
 
@@ -476,34 +590,46 @@ def get_chat_history(game_id):
             "error": str(e)
         }), 500
 
-# 게임별 WebSocket 네임스페이스 클래스
+# 게임 WebSocket 네임스페이스 클래스
 class GameNamespace(Namespace):
-    """게임별 WebSocket 네임스페이스 - AI 모델 실행"""
+    """게임 WebSocket 네임스페이스 - AI 모델 실행
+
+    모든 게임이 하나의 '/game' 네임스페이스를 공유하고, 게임별 전송은 game_id 룸으로 구분합니다.
+    클라이언트는 연결 시 auth({game_id}) 또는 쿼리 문자열(?game_id=)로 게임 ID를 전달합니다.
+    """
+
+    def on_connect(self, auth=None):
+        """클라이언트 연결 - 등록된 게임 세션의 룸에 참가"""
+        game_id = (auth or {}).get('game_id') or request.args.get('game_id')
+        game_id = str(game_id) if game_id is not None else None
 
-    def __init__(self, namespace, game_id):
-        super().__init__(namespace)
-        self.game_id = game_id
+        with _sessions_lock:
+            registered = game_id in game_sessions
+        if not registered:
+            logger.warning(f"⚠️  등록되지 않은 게임 세션 연결 거부: {game_id} ({request.sid})")
+            return False
 
-    def on_connect(self):
-        """클라이언트 연결"""
-        logger.info(f"🔌 [{self.game_id}] 클라이언트 연결: {request.sid}")
+        logger.info(f"🔌 [{game_id}] 클라이언트 연결: {request.sid}")
 
-        if self.game_id in game_sessions:
-            game_sessions[self.game_id]["connection_count"] += 1
+        session['game_id'] = game_id
+        join_room(game_id)
+        _touch_session(game_id, 1)
 
         self.emit('status', {
-            'message': f'게임 세션 {self.game_id}에 연결되었습니다.'
-        })
+            'message': f'게임 세션 {game_id}에 연결되었습니다.'
+        }, to=request.sid)
 
     def on_disconnect(self):
         """클라이언트 연결 해제"""
-        logger.info(f"❌ [{self.game_id}] 클라이언트 연결 해제: {request.sid}")
+        game_id = session.get('game_id')
+        logger.info(f"❌ [{game_id}] 클라이언트 연결 해제: {request.sid}")
 
-        if self.game_id in game_sessions:
-            game_sessions[self.game_id]["connection_count"] -= 1
+        if game_id is not None:
+            _touch_session(game_id, -1)
 
     def on_message(self, data):
         """메시지 수신 - GameMaster AI 모델 실행"""
+        game_id = session.get('game_id')
         try:
             # 문자열 또는 딕셔너리 처리
             if isinstance(data, dict):
@@ -511,24 +637,23 @@ class GameNamespace(Namespace):
             else:
                 message = str(data)
 
-            logger.info(f"💬 [{self.game_id}] 메시지 수신: {message}")
+            logger.info(f"💬 [{game_id}] 메시지 수신: {message}")
+            _touch_session(game_id)
 
             # GameMaster AI 처리
-            logger.info(f"🤖 [{self.game_id}] AI 모델 실행 중...")
-            result = gamemaster.process_game_request(self.game_id, message)
+            logger.info(f"🤖 [{game_id}] AI 모델 실행 중...")
+            # 이 그린 스레드에서 실행 - Ollama/게임 API 호출은 패치된 소켓으로 허브에 양보하고,
+            # 임베딩 모델 추론만 tpool 네이티브 스레드로 넘김 (아래 set_compute_executor)
+            result = gamemaster.process_game_request(game_id, message)
 
-            # LLM 생성 결과 전체 로깅 (디버깅용)
-            logger.info(f"\n{'='*60}")
-            logger.info(f"🔍 [{self.game_id}] LLM 생성 결과 (전체):")
-            logger.info(f"{'='*60}")
-            import json
-            logger.info(json.dumps(result, indent=2, ensure_ascii=False))
-            logger.info(f"{'='*60}\n")
+            # LLM 생성 결과 전체 로깅 (디버깅용 - DEBUG 레벨에서만 직렬화)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"🔍 [{game_id}] LLM 생성 결과 (전체):\n{json_utils.dumps_pretty(result)}")
 
             # AI 응답 전송
             response = {
                 "success": result.get("success", True),
-                "game_id": self.game_id,
+                "game_id": game_id,
                 "message": result.get("message", ""),
                 "response": result.get("message", ""),
                 "options": result.get("options", []),
@@ -538,22 +663,28 @@ class GameNamespace(Namespace):
             }
 
             # 클라이언트로 전송하는 데이터도 로깅
-            logger.info(f"📤 [{self.game_id}] 클라이언트로 전송:")
-            logger.info(json.dumps(response, indent=2, ensure_ascii=False))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📤 [{game_id}] 클라이언트로 전송:\n{json_utils.dumps_pretty(response)}")
 
-            self.emit('game_response', response)
-            logger.info(f"✅ [{self.game_id}] AI 응답 전송 완료")
+            self.emit('game_response', response, to=game_id)
+            logger.info(
+                f"✅ [{game_id}] AI 응답 전송 완료 "
+                f"(메시지 {len(response['message'])}자, 선택지 {len(response['options'] or [])}개)"
+            )
 
             # 이미지 생성이 필요한 경우 비동기로 생성
             if result.get("need_image", False):
                 image_info = result.get("image_info")
                 if image_info and image_info.get("prompt"):
-                    logger.info(f"🎨 [{self.game_id}] 이미지 생성 요청: {image_info['prompt']}")
-                    generate_image_async(self.game_id, image_info["prompt"])
+                    logger.info(f"🎨 [{game_id}] 이미지 생성 요청: {image_info['prompt']}")
+                    generate_image_async(game_id, image_info["prompt"])
 
         except Exception as e:
-            logger.error(f"⚠️  [{self.game_id}] 메시지 처리 실패: {e}")
-            self.emit('error', {'message': str(e)})
+            logger.error(f"⚠️  [{game_id}] 메시지 처리 실패: {e}")
+            self.emit('error', {'message': str(e)}, to=request.sid)
+
+
+socketio.on_namespace(GameNamespace(GAME_NAMESPACE))
 
 
 # 기본 네임스페이스 핸들러 (잘못된 연결 처리)
@@ -562,7 +693,7 @@ def handle_connect():
     """기본 네임스페이스 연결 - 에러 안내"""
     logger.warning(f"⚠️  기본 네임스페이스 연결: {request.sid}")
     emit('error', {
-        'message': '게임 세션 네임스페이스로 연결해주세요. 예: /game/{game_id}'
+        'message': "게임 네임스페이스로 연결해주세요. 예: io('/game', { auth: { game_id } })"
     })
 
 @socketio.on('disconnect')
@@ -581,6 +712,10 @@ if __name__ == '__main__':
     logger.info(f"🔗 Ollama URL: {config['ollama']['base_url']}")
     logger.info(f"🤖 Model: {config['ollama']['model']}")
 
+    # 임베딩 모델을 미리 로드해 첫 요청의 지연 제거
+    vector_memory_manager.warm_up()
+    logger.info("🔥 임베딩 모델 워밍업 완료")
+
     socketio.run(
         app,
         host='0.0.0.0',
@@ -4,58 +4,139 @@ ComfyUI API 매니저
 ComfyUI 서버와의 통신을 담당하는 클래스입니다.
 """
 
+import os
+import functools
 import requests
-import json
-import websocket
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect as ws_connect
 import uuid
 import threading
 import time
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Callable
 from datetime import datetime
-import io
-import base64
-from PIL import Image
+
+
+@functools.lru_cache(maxsize=4)
+def _load_workflow_cached(path: str, mtime: float) -> bytes:
+    """워크플로우 JSON 파일을 읽어 바이트로 캐시 (경로+수정 시각이 같으면 디스크를 다시 읽지 않음)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # 파싱 가능한지 확인한 뒤 정규화된 바이트로 보관
+    return orjson.dumps(orjson.loads(raw))
+
+
+# 워크플로우 JSON 파일 최대 크기 (손상된 파일로 인한 과도한 메모리 사용 방지)
+MAX_WORKFLOW_FILE_BYTES = 5 * 1024 * 1024
+
+# 이미지를 디스크에 기록할 때 한 번에 읽는 크기
+IMAGE_COPY_CHUNK_BYTES = 64 * 1024
+# 한 작업의 이미지를 동시에 다운로드하는 최대 개수
+IMAGE_DOWNLOAD_CONCURRENCY = 8
+
+# ComfyUI WebSocket 바이너리 프레임 형식
+PREVIEW_IMAGE_EVENT = 1
+PREVIEW_IMAGE_FORMATS = {1: 'jpeg', 2: 'png'}
+
 
 class ComfyUIManager:
     """ComfyUI API 연동 매니저"""
     
-    def __init__(self, server_url: str = "http://13.209.173.228:8188", timeout: int = 300):
+    def __init__(self, server_url: str = "http://13.209.173.228:8188", timeout: int = 300,
+                 max_image_bytes: int = 10 * 1024 * 1024):
         """
         ComfyUIManager 초기화
         
         Args:
             server_url: ComfyUI 서버 URL
             timeout: 요청 타임아웃 (초)
+            max_image_bytes: 다운로드할 이미지 최대 크기 (바이트, 초과 시 읽기 전에 거부)
         """
         self.server_url = server_url.rstrip('/')
         self.timeout = timeout
+        self.max_image_bytes = max_image_bytes
         self.logger = logging.getLogger("ComfyUIManager")
+
+        # HTTP 커넥션 재사용 (keep-alive) - 멱등 요청(GET 등)만 짧게 재시도
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        )
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.http.headers.update({"Connection": "keep-alive"})
+
+        # 한 작업의 여러 이미지 동시 다운로드용 스레드 풀 (N개 이미지를 RTT 한 번 수준으로)
+        self._download_pool = ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_CONCURRENCY,
+                                                 thread_name_prefix="comfy-dl")
         
         # WebSocket 연결
         self.ws = None
         self.ws_thread = None
         self.connected = False
+        self._open_event = threading.Event()
         
         # 작업 추적
+        # (WebSocket 스레드와 요청 스레드가 함께 접근하므로 _jobs_lock 안에서 변경)
         self.pending_jobs = {}
-        self.completed_jobs = {}
+        # 완료된 작업은 최근 max_completed개만 보관 (오래된 것부터 제거)
+        self.completed_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_completed = 128
+        self._jobs_lock = threading.Lock()
+
+        # 이 매니저의 WebSocket 클라이언트 ID (같은 ID로 큐에 넣은 작업의 이벤트만 수신)
+        self.client_id = str(uuid.uuid4())
+        scheme, _, host = self.server_url.partition('://')
+        self._ws_url = f"{'wss' if scheme == 'https' else 'ws'}://{host}/ws?clientId={self.client_id}"
+
+        # prompt_id별 완료 이벤트 (wait_for_outputs에서 대기)
+        self.job_events: Dict[str, threading.Event] = {}
+        # WebSocket이 끊겨 있을 때 히스토리 확인 간격 (초)
+        self.poll_interval = 2.0
+        # WebSocket 연결이 끊길 때마다 증가 (대기 중 끊김 감지용)
+        self._ws_generation = 0
+
+        # 서버 가용성 확인 결과 캐시 (만료 시각, 결과) - WebSocket이 끊겨 있을 때만 HTTP로 확인
+        self.availability_ttl = 2.0
+        self._avail_cache = (0.0, False)
         
         # 콜백 함수들
         self.on_progress = None
         self.on_complete = None
         self.on_error = None
+        self.on_preview = None
+
+        # 진행률 이벤트 묶음 전달 (샘플러 스텝마다 오는 이벤트를 progress_flush_interval초 단위로 모아 콜백 1회 호출)
+        self.progress_flush_interval = 0.05
+        self._progress_buffer: Dict[str, List[Dict[str, Any]]] = {}
+        self._progress_timer: Optional[threading.Timer] = None
+        self._progress_lock = threading.Lock()
+
+        # WebSocket 메시지 타입별 핸들러
+        self._ws_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {
+            'progress': self._on_progress_msg,
+            'executing': self._on_executing_msg,
+            'executed': self._on_executed_msg,
+            'execution_error': self._on_execution_error_msg,
+        }
         
         # 기본 워크플로우 로드
-        self.default_workflow = self._load_default_workflow()
-        
-        # 서버 연결 확인
-        self._check_server_connection()
+        # (요청마다 깊은 복사 대신 역직렬화로 새 워크플로우를 만들기 위한 JSON 템플릿, 프로세스 전체에서 공유)
+        self._workflow_template_json = self._load_default_workflow()
+        self.default_workflow = orjson.loads(self._workflow_template_json)
+
+        # 서버 연결 확인은 생성 시 하지 않음 (필요할 때 is_available()로 확인, 실패는 각 요청에서 처리)
     
-    def _load_default_workflow(self) -> Dict[str, Any]:
-        """lora.json에서 LoRA 워크플로우를 로드합니다."""
+    def _load_default_workflow(self) -> bytes:
+        """lora.json에서 LoRA 워크플로우 JSON을 로드합니다 (같은 파일은 한 번만 읽고 파싱)."""
         try:
-            import os
             # 현재 파일과 같은 디렉토리에서 lora.json 찾기
             current_dir = os.path.dirname(os.path.abspath(__file__))
             lora_json_path = os.path.join(current_dir, "lora.json")
@@ -63,10 +144,12 @@ class ComfyUIManager:
             self.logger.info(f"lora.json 검색 경로: {lora_json_path}")
 
             if os.path.exists(lora_json_path):
-                with open(lora_json_path, 'r', encoding='utf-8') as f:
-                    workflow = json.load(f)
+                file_size = os.path.getsize(lora_json_path)
+                if file_size > MAX_WORKFLOW_FILE_BYTES:
+                    raise ValueError(f"lora.json 파일이 너무 큽니다: {file_size} bytes (최대 {MAX_WORKFLOW_FILE_BYTES})")
+                workflow_json = _load_workflow_cached(lora_json_path, os.path.getmtime(lora_json_path))
                 self.logger.info("✅ lora.json에서 LoRA 워크플로우 로드 완료")
-                return workflow
+                return workflow_json
             else:
                 self.logger.error(f"❌ lora.json 파일을 찾을 수 없습니다: {lora_json_path}")
                 raise FileNotFoundError(f"lora.json 파일을 찾을 수 없습니다: {lora_json_path}")
@@ -75,6 +158,13 @@ class ComfyUIManager:
             self.logger.error(f"lora.json 로드 실패: {e}")
             raise e  # lora.json 로드 실패시 예외 발생
     
+    def build_workflow(self, prompt: str) -> Dict[str, Any]:
+        """기본 워크플로우의 새 사본에 프롬프트(노드 6번)를 설정해 반환합니다."""
+        workflow = orjson.loads(self._workflow_template_json)
+        if "6" in workflow:
+            workflow["6"]["inputs"]["text"] = prompt
+        return workflow
+
     def _get_fallback_workflow(self) -> Dict[str, Any]:
         """기본 폴백 워크플로우를 반환합니다."""
         return {
@@ -140,7 +230,7 @@ class ComfyUIManager:
     def _check_server_connection(self) -> bool:
         """ComfyUI 서버 연결을 확인합니다."""
         try:
-            response = requests.get(f"{self.server_url}/system_stats", timeout=5)
+            response = self.http.get(f"{self.server_url}/system_stats", timeout=5)
             if response.status_code == 200:
                 self.logger.info("ComfyUI 서버 연결 성공")
                 return True
@@ -151,52 +241,94 @@ class ComfyUIManager:
             self.logger.error(f"ComfyUI 서버 연결 실패: {e}")
             return False
     
-    def is_available(self) -> bool:
-        """ComfyUI 서버 사용 가능 여부 확인"""
-        return self._check_server_connection()
+    def is_available(self, fresh: bool = False) -> bool:
+        """ComfyUI 서버 사용 가능 여부 확인
+
+        WebSocket이 연결되어 있으면 바로 True를 반환하고, 아니면 HTTP 확인 결과를
+        availability_ttl 초 동안 재사용합니다. fresh=True이면 항상 서버에 다시 확인합니다.
+        """
+        if not fresh:
+            if self.connected:
+                return True
+
+            expiry, available = self._avail_cache
+            if time.monotonic() < expiry:
+                return available
+
+        available = self._check_server_connection()
+        self._avail_cache = (time.monotonic() + self.availability_ttl, available)
+        return available
     
     def connect_websocket(self):
         """WebSocket 연결을 시작합니다."""
         if self.connected:
             return
         
+        self._open_event.clear()
         try:
-            ws_url = self.server_url.replace('http://', 'ws://').replace('https://', 'wss://') + '/ws'
-            self.ws = websocket.WebSocketApp(
-                ws_url,
-                on_open=self._on_ws_open,
-                on_message=self._on_ws_message,
-                on_error=self._on_ws_error,
-                on_close=self._on_ws_close
-            )
-            
             # 별도 스레드에서 WebSocket 실행
-            self.ws_thread = threading.Thread(target=self.ws.run_forever)
+            self.ws_thread = threading.Thread(target=self._run_websocket, args=(self._ws_url,))
             self.ws_thread.daemon = True
             self.ws_thread.start()
             
-            # 연결 대기
-            for _ in range(10):  # 5초 대기
-                if self.connected:
-                    break
-                time.sleep(0.5)
+            # 연결 대기 (최대 5초, 연결되는 즉시 반환)
+            self._open_event.wait(timeout=5.0)
                 
         except Exception as e:
             self.logger.error(f"WebSocket 연결 실패: {e}")
     
+    def _run_websocket(self, ws_url: str):
+        """WebSocket 수신 루프 - permessage-deflate 압축을 협상해 진행률/출력 메시지를 압축 전송받음"""
+        try:
+            # 미리보기 바이너리 프레임도 이미지이므로 프레임 크기를 이미지 최대 크기로 제한
+            with ws_connect(ws_url, compression="deflate", open_timeout=5, max_size=self.max_image_bytes) as ws:
+                self.ws = ws
+                self._on_ws_open(ws)
+                for message in ws:
+                    self._on_ws_message(ws, message)
+        except ConnectionClosed as e:
+            if e.rcvd is not None:
+                self.logger.info(f"ComfyUI WebSocket 종료 코드: {e.rcvd.code}")
+        except Exception as e:
+            self._on_ws_error(self.ws, e)
+        finally:
+            ws, self.ws = self.ws, None
+            self._on_ws_close(ws, None, None)
+
     def _on_ws_open(self, ws):
         """WebSocket 연결 시"""
         self.connected = True
+        self._open_event.set()
         self.logger.info("ComfyUI WebSocket 연결됨")
     
     def _on_ws_message(self, ws, message):
-        """WebSocket 메시지 수신"""
+        """WebSocket 메시지 수신 (바이너리 프레임은 JSON 파싱 없이 미리보기 처리로 전달)"""
+        if isinstance(message, (bytes, bytearray)):
+            self._on_binary_msg(message)
+            return
+
+        # 진행 중인 작업이 없으면 처리할 메시지가 없으므로 파싱 생략 (status 브로드캐스트 등)
+        if not self.pending_jobs:
+            return
+
         try:
-            data = json.loads(message)
-            self._handle_ws_message(data)
-        except json.JSONDecodeError:
+            data = orjson.loads(message)
+        except orjson.JSONDecodeError:
             self.logger.error(f"WebSocket 메시지 파싱 실패: {message}")
+            return
+        self._handle_ws_message(data)
     
+    def _on_binary_msg(self, message: bytes):
+        """바이너리 프레임 처리 - [이벤트 타입 4바이트][이미지 포맷 4바이트][이미지 바이트]"""
+        if not self.on_preview or len(message) < 8:
+            return
+
+        event_type = int.from_bytes(message[0:4], 'big')
+        if event_type == PREVIEW_IMAGE_EVENT:
+            image_format = PREVIEW_IMAGE_FORMATS.get(int.from_bytes(message[4:8], 'big'), 'unknown')
+            # 복사 없이 이미지 부분만 전달
+            self.on_preview(image_format, memoryview(message)[8:])
+
     def _on_ws_error(self, ws, error):
         """WebSocket 오류"""
         self.logger.error(f"WebSocket 오류: {error}")
@@ -204,112 +336,232 @@ class ComfyUIManager:
     def _on_ws_close(self, ws, close_status_code, close_msg):
         """WebSocket 연결 해제"""
         self.connected = False
+        self._ws_generation += 1
         self.logger.info("ComfyUI WebSocket 연결 해제")
     
     def _handle_ws_message(self, data: Dict[str, Any]):
-        """WebSocket 메시지 처리"""
-        msg_type = data.get('type')
-        
-        if msg_type == 'status':
-            # 상태 업데이트
-            pass
-        elif msg_type == 'progress':
-            # 진행률 업데이트
-            prompt_id = data.get('data', {}).get('prompt_id')
-            if prompt_id and self.on_progress:
-                self.on_progress(prompt_id, data.get('data', {}))
-        elif msg_type == 'executing':
-            # 실행 상태 업데이트
-            prompt_id = data.get('data', {}).get('prompt_id')
-            if prompt_id in self.pending_jobs:
-                node = data.get('data', {}).get('node')
-                if node is None:  # 완료됨
-                    self._handle_job_completion(prompt_id)
-        elif msg_type == 'executed':
-            # 노드 실행 완료
-            pass
-    
-    def _handle_job_completion(self, prompt_id: str):
-        """작업 완료 처리"""
-        if prompt_id not in self.pending_jobs:
+        """WebSocket 메시지 처리 - 메시지 타입별 핸들러로 분기 (status 등 처리하지 않는 타입은 무시)"""
+        handler = self._ws_handlers.get(data.get('type'))
+        if handler:
+            handler(data.get('data') or {})
+
+    def _on_progress_msg(self, data: Dict[str, Any]):
+        """진행률 업데이트 - 버퍼에 모아두고 타이머가 묶음으로 전달"""
+        prompt_id = data.get('prompt_id')
+        if not self.on_progress or prompt_id not in self.pending_jobs:
             return
-        
+
+        with self._progress_lock:
+            self._progress_buffer.setdefault(prompt_id, []).append(data)
+            if self._progress_timer is None:
+                self._progress_timer = threading.Timer(self.progress_flush_interval, self._flush_progress)
+                self._progress_timer.daemon = True
+                self._progress_timer.start()
+
+    def _flush_progress(self):
+        """모인 진행률 이벤트를 작업별로 한 번씩 콜백에 전달"""
+        with self._progress_lock:
+            buffer, self._progress_buffer = self._progress_buffer, {}
+            if self._progress_timer is not None:
+                self._progress_timer.cancel()
+                self._progress_timer = None
+
+        if self.on_progress:
+            for prompt_id, batch in buffer.items():
+                self.on_progress(prompt_id, batch)
+
+    def _on_executing_msg(self, data: Dict[str, Any]):
+        """실행 상태 업데이트 - node가 None이면 작업 완료"""
+        if data.get('node') is None:
+            self._handle_job_completion(data.get('prompt_id'))
+
+    def _on_executed_msg(self, data: Dict[str, Any]):
+        """노드 실행 완료 - 출력(이미지 정보) 수집"""
+        with self._jobs_lock:
+            job_info = self.pending_jobs.get(data.get('prompt_id'))
+            if job_info is not None:
+                job_info['outputs'][data.get('node')] = data.get('output') or {}
+
+    def _on_execution_error_msg(self, data: Dict[str, Any]):
+        """실행 실패"""
+        self._handle_job_error(data.get('prompt_id'), data.get('exception_message', 'execution_error'))
+
+    def _store_completed(self, prompt_id: str, job_info: Dict[str, Any]):
+        """완료/실패한 작업 보관 (_jobs_lock 안에서 호출) - 큰 워크플로우 본문은 버리고 개수 제한"""
+        job_info.pop('workflow', None)
+        self.completed_jobs[prompt_id] = job_info
+        self.completed_jobs.move_to_end(prompt_id)
+        while len(self.completed_jobs) > self.max_completed:
+            self.completed_jobs.popitem(last=False)
+
+    def _handle_job_completion(self, prompt_id: str):
+        """작업 완료 처리 - WebSocket으로 수집한 출력과 함께 완료 상태로 이동 (이 매니저의 작업이 아니면 무시)"""
+        with self._jobs_lock:
+            job_info = self.pending_jobs.pop(prompt_id, None)
+            if job_info is None:
+                return
+            job_info['status'] = 'completed'
+            job_info['completed_at'] = datetime.now()
+            self._store_completed(prompt_id, job_info)
+
+        # 완료 콜백 전에 남은 진행률 이벤트 전달
+        self._flush_progress()
+
         try:
-            # 결과 이미지 가져오기
-            history = self.get_history(prompt_id)
-            if history and prompt_id in history:
-                outputs = history[prompt_id].get('outputs', {})
-                
-                # 이미지 다운로드
-                images = []
-                for node_id, output in outputs.items():
-                    if 'images' in output:
-                        for img_info in output['images']:
-                            img_data = self.get_image(
-                                img_info['filename'], 
-                                img_info['subfolder'], 
-                                img_info['type']
-                            )
-                            if img_data:
-                                images.append({
-                                    'filename': img_info['filename'],
-                                    'data': img_data
-                                })
-                
-                # 완료 상태로 이동
-                job_info = self.pending_jobs.pop(prompt_id)
-                job_info['status'] = 'completed'
-                job_info['completed_at'] = datetime.now()
-                job_info['images'] = images
-                self.completed_jobs[prompt_id] = job_info
-                
-                # 콜백 실행
-                if self.on_complete:
-                    self.on_complete(prompt_id, job_info)
-                    
-                self.logger.info(f"작업 완료: {prompt_id}, 이미지 {len(images)}개 생성")
-                
+            job_info['images'] = [
+                img_info
+                for output in job_info['outputs'].values()
+                for img_info in output.get('images', [])
+            ]
+
+            # 콜백 실행
+            if self.on_complete:
+                self.on_complete(prompt_id, job_info)
+
+            self.logger.info(f"작업 완료: {prompt_id}, 이미지 {len(job_info['images'])}개 생성")
+
         except Exception as e:
             self.logger.error(f"작업 완료 처리 실패 ({prompt_id}): {e}")
             if self.on_error:
                 self.on_error(prompt_id, str(e))
-    
-    def queue_prompt(self, workflow: Dict[str, Any]) -> Optional[str]:
-        """워크플로우를 큐에 추가합니다."""
+        finally:
+            event = self.job_events.get(prompt_id)
+            if event:
+                event.set()
+
+    def _handle_job_error(self, prompt_id: str, error: str):
+        """작업 실패 처리 (이 매니저의 작업이 아니면 무시)"""
+        with self._jobs_lock:
+            job_info = self.pending_jobs.pop(prompt_id, None)
+            if job_info is None:
+                return
+            job_info['status'] = 'error'
+            job_info['error'] = error
+            self._store_completed(prompt_id, job_info)
+        self.logger.error(f"작업 실패 ({prompt_id}): {error}")
+
+        if self.on_error:
+            self.on_error(prompt_id, error)
+
+        event = self.job_events.get(prompt_id)
+        if event:
+            event.set()
+
+    def wait_for_outputs(self, prompt_id: str, timeout: int = None) -> Optional[Dict[str, Any]]:
+        """작업 완료를 기다린 뒤 노드별 출력 반환 (실패/시간 초과 시 None)
+
+        시작할 때 히스토리를 한 번 확인해 WebSocket 이벤트보다 먼저 끝난 작업도 바로 반환합니다.
+        WebSocket이 연결되어 있는 동안은 완료 이벤트를 기다리고, 연결이 끊겨 있거나 대기 중
+        끊겼다 다시 연결되면 poll_interval초마다 히스토리로 확인합니다.
+        """
+        if not timeout:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout
+
+        event = self.job_events.get(prompt_id)
+        check_history = True
         try:
-            prompt_id = str(uuid.uuid4())
-            payload = {
-                "prompt": workflow,
-                "client_id": prompt_id
+            while True:
+                job_info = self.completed_jobs.get(prompt_id)
+                if job_info:
+                    return job_info['outputs'] if job_info['status'] == 'completed' else None
+
+                if check_history:
+                    outputs = self.get_outputs(prompt_id)
+                    if outputs is not None:
+                        self._complete_from_history(prompt_id, outputs)
+                        return outputs
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning(f"작업 대기 시간 초과: {prompt_id}")
+                    return None
+
+                generation = self._ws_generation
+                connected = self.connected and event is not None
+                if event is not None:
+                    event.wait(min(remaining, self.poll_interval))
+                else:
+                    time.sleep(min(remaining, self.poll_interval))
+
+                # 연결이 없었거나 대기 중 연결이 끊겼던 경우에만 히스토리 확인 (그 사이 이벤트를 놓쳤을 수 있음)
+                check_history = not connected or not self.connected or generation != self._ws_generation
+        finally:
+            self.job_events.pop(prompt_id, None)
+
+    def _complete_from_history(self, prompt_id: str, outputs: Dict[str, Any]):
+        """히스토리로 완료를 확인한 작업을 완료 상태로 이동 (WebSocket 이벤트를 놓친 경우)"""
+        with self._jobs_lock:
+            job_info = self.pending_jobs.pop(prompt_id, None)
+            if job_info is None:
+                return
+            job_info['status'] = 'completed'
+            job_info['completed_at'] = datetime.now()
+            job_info['outputs'] = outputs
+            self._store_completed(prompt_id, job_info)
+
+    def _forget_job(self, prompt_id: str):
+        """큐 추가에 실패한 작업의 추적 정보 제거"""
+        self.job_events.pop(prompt_id, None)
+        with self._jobs_lock:
+            self.pending_jobs.pop(prompt_id, None)
+
+    def queue_prompt(self, workflow: Dict[str, Any]) -> Optional[str]:
+        """워크플로우를 큐에 추가합니다.
+
+        응답보다 먼저 도착하는 WebSocket 이벤트를 놓치지 않도록 prompt_id를 직접 만들어
+        요청에 담고, 전송 전에 작업을 먼저 등록합니다.
+        """
+        prompt_id = str(uuid.uuid4())
+        payload = {
+            "prompt": workflow,
+            "client_id": self.client_id,
+            "prompt_id": prompt_id
+        }
+
+        self.job_events[prompt_id] = threading.Event()
+        with self._jobs_lock:
+            self.pending_jobs[prompt_id] = {
+                'prompt_id': prompt_id,
+                'workflow': workflow,
+                'status': 'queued',
+                'created_at': datetime.now(),
+                'outputs': {},
+                'images': []
             }
-            
-            response = requests.post(
+
+        try:
+            # 큰 워크플로우도 빠르게 직렬화하도록 orjson으로 본문을 만들어 그대로 전송
+            response = self.http.post(
                 f"{self.server_url}/prompt",
-                json=payload,
+                data=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 actual_prompt_id = result.get('prompt_id', prompt_id)
-                
-                # 작업 추적 정보 저장
-                self.pending_jobs[actual_prompt_id] = {
-                    'prompt_id': actual_prompt_id,
-                    'workflow': workflow,
-                    'status': 'queued',
-                    'created_at': datetime.now(),
-                    'images': []
-                }
+
+                if actual_prompt_id != prompt_id:
+                    # prompt_id 지정을 지원하지 않는 서버 - 서버가 정한 ID로 다시 등록
+                    with self._jobs_lock:
+                        job_info = self.pending_jobs.pop(prompt_id, None)
+                        if job_info is not None:
+                            job_info['prompt_id'] = actual_prompt_id
+                            self.pending_jobs[actual_prompt_id] = job_info
+                    self.job_events[actual_prompt_id] = self.job_events.pop(prompt_id, threading.Event())
                 
                 self.logger.info(f"워크플로우 큐에 추가: {actual_prompt_id}")
                 return actual_prompt_id
             else:
                 self.logger.error(f"워크플로우 큐 추가 실패: {response.status_code} - {response.text}")
+                self._forget_job(prompt_id)
                 return None
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             self.logger.error(f"워크플로우 큐 추가 요청 실패: {e}")
+            self._forget_job(prompt_id)
             return None
     
     def get_history(self, prompt_id: str = None) -> Optional[Dict]:
@@ -319,19 +571,45 @@ class ComfyUIManager:
             if prompt_id:
                 url += f"/{prompt_id}"
             
-            response = requests.get(url, timeout=self.timeout)
+            response = self.http.get(url, timeout=self.timeout)
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 self.logger.error(f"히스토리 조회 실패: {response.status_code}")
                 return None
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             self.logger.error(f"히스토리 조회 요청 실패: {e}")
             return None
     
+    def get_outputs(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """히스토리에서 작업의 노드별 출력만 추출합니다 (워크플로우/상태 등 나머지 필드는 바로 버림)."""
+        history = self.get_history(prompt_id)
+        entry = history.get(prompt_id) if history else None
+        if not entry:
+            return None
+        return entry.get('outputs', {})
+
     def get_image(self, filename: str, subfolder: str = "", folder_type: str = "output") -> Optional[bytes]:
-        """이미지를 다운로드합니다."""
+        """이미지를 메모리로 다운로드합니다 (저장용은 open_image_stream으로 디스크에 바로 기록)."""
+        response = self.open_image_stream(filename, subfolder, folder_type)
+        if response is None:
+            return None
+        try:
+            # Content-Length가 없거나 압축 전송이면 실제 크기를 알 수 없으므로 제한+1 바이트까지만 읽어 확인
+            data = response.raw.read(self.max_image_bytes + 1)
+            if len(data) > self.max_image_bytes:
+                self.logger.error(f"이미지 크기 제한 초과 (최대 {self.max_image_bytes} bytes)")
+                return None
+            return data
+        except Exception as e:
+            self.logger.error(f"이미지 다운로드 요청 실패: {e}")
+            return None
+        finally:
+            response.close()
+
+    def open_image_stream(self, filename: str, subfolder: str = "", folder_type: str = "output") -> Optional[requests.Response]:
+        """이미지 다운로드 스트림을 엽니다 (본문을 메모리에 올리지 않음, 호출자가 닫아야 함)"""
         try:
             params = {
                 "filename": filename,
@@ -339,65 +617,90 @@ class ComfyUIManager:
             }
             if subfolder:
                 params["subfolder"] = subfolder
-            
-            response = requests.get(
+
+            response = self.http.get(
                 f"{self.server_url}/view",
                 params=params,
-                timeout=self.timeout
+                timeout=self.timeout,
+                stream=True
             )
-            
+
             if response.status_code == 200:
-                return response.content
+                size = int(response.headers.get('Content-Length') or 0)
+                if size > self.max_image_bytes:
+                    self.logger.error(f"이미지 크기 제한 초과: {size} bytes (최대 {self.max_image_bytes})")
+                    response.close()
+                    return None
+                response.raw.decode_content = True
+                return response
             else:
                 self.logger.error(f"이미지 다운로드 실패: {response.status_code}")
+                response.close()
                 return None
-                
+
         except requests.exceptions.RequestException as e:
             self.logger.error(f"이미지 다운로드 요청 실패: {e}")
             return None
-    
+
+    def save_image(self, filename: str, subfolder: str, folder_type: str, save_path: str) -> bool:
+        """이미지를 디스크에 바로 저장합니다 (max_image_bytes를 넘으면 중단하고 파일 삭제)."""
+        response = self.open_image_stream(filename, subfolder, folder_type)
+        if response is None:
+            return False
+
+        # Content-Length가 없거나(chunked) 압축 전송이면 헤더 검사를 통과하므로 기록하면서 크기 확인
+        written = 0
+        try:
+            with response, open(save_path, 'wb') as f:
+                for chunk in iter(lambda: response.raw.read(IMAGE_COPY_CHUNK_BYTES), b''):
+                    written += len(chunk)
+                    if written > self.max_image_bytes:
+                        raise ValueError(f"이미지 크기 제한 초과 (최대 {self.max_image_bytes} bytes)")
+                    f.write(chunk)
+            return True
+        except Exception as e:
+            self.logger.error(f"이미지 저장 실패 ({filename}): {e}")
+            try:
+                os.remove(save_path)
+            except OSError:
+                pass
+            return False
+
+    def save_images(self, image_infos: List[Dict[str, Any]], save_paths: List[str]) -> List[bool]:
+        """작업 결과 이미지 여러 개를 동시에 디스크에 저장합니다 (입력 순서 유지, 항목별 성공 여부)."""
+        if not image_infos:
+            return []
+        return list(self._download_pool.map(
+            lambda info, path: self.save_image(info['filename'], info.get('subfolder', ''),
+                                               info.get('type', 'output'), path),
+            image_infos, save_paths
+        ))
+
     def get_job_status(self, prompt_id: str) -> Dict[str, Any]:
         """작업 상태를 조회합니다."""
-        if prompt_id in self.completed_jobs:
-            return self.completed_jobs[prompt_id]
-        elif prompt_id in self.pending_jobs:
-            return self.pending_jobs[prompt_id]
-        else:
-            return {"status": "not_found"}
+        with self._jobs_lock:
+            job_info = self.completed_jobs.get(prompt_id) or self.pending_jobs.get(prompt_id)
+        return job_info if job_info is not None else {"status": "not_found"}
     
     def wait_for_completion(self, prompt_id: str, timeout: int = None) -> bool:
-        """작업 완료까지 대기합니다."""
-        if not timeout:
-            timeout = self.timeout
-        
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            if prompt_id in self.completed_jobs:
-                return True
-            elif prompt_id not in self.pending_jobs:
-                return False  # 작업이 사라짐 (오류)
-            
-            time.sleep(1)
-        
-        self.logger.warning(f"작업 대기 시간 초과: {prompt_id}")
-        return False
+        """작업 완료까지 대기합니다 (wait_for_outputs와 같은 이벤트/히스토리 확인 방식)."""
+        return self.wait_for_outputs(prompt_id, timeout) is not None
     
     def get_queue_info(self) -> Optional[Dict]:
         """큐 정보를 가져옵니다."""
         try:
-            response = requests.get(f"{self.server_url}/queue", timeout=5)
+            response = self.http.get(f"{self.server_url}/queue", timeout=5)
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 return None
-        except requests.exceptions.RequestException:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError):
             return None
     
     def clear_queue(self) -> bool:
         """큐를 비웁니다."""
         try:
-            response = requests.post(f"{self.server_url}/queue", json={"clear": True}, timeout=5)
+            response = self.http.post(f"{self.server_url}/queue", json={"clear": True}, timeout=5)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -405,7 +708,7 @@ class ComfyUIManager:
     def interrupt_current(self) -> bool:
         """현재 실행 중인 작업을 중단합니다."""
         try:
-            response = requests.post(f"{self.server_url}/interrupt", timeout=5)
+            response = self.http.post(f"{self.server_url}/interrupt", timeout=5)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -413,19 +716,25 @@ class ComfyUIManager:
     def get_system_stats(self) -> Optional[Dict]:
         """시스템 통계를 가져옵니다."""
         try:
-            response = requests.get(f"{self.server_url}/system_stats", timeout=5)
+            response = self.http.get(f"{self.server_url}/system_stats", timeout=5)
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             else:
                 return None
-        except requests.exceptions.RequestException:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError):
             return None
     
-    def set_callbacks(self, on_progress: Callable = None, on_complete: Callable = None, on_error: Callable = None):
-        """콜백 함수들을 설정합니다."""
+    def set_callbacks(self, on_progress: Callable = None, on_complete: Callable = None, on_error: Callable = None,
+                      on_preview: Callable = None):
+        """콜백 함수들을 설정합니다.
+
+        on_progress(prompt_id, batch)는 짧은 시간 동안 모인 진행률 이벤트 목록(batch)을 한 번에 받습니다.
+        on_preview(image_format, data)는 바이너리 미리보기 프레임의 이미지 부분(memoryview)을 받습니다.
+        """
         self.on_progress = on_progress
         self.on_complete = on_complete
         self.on_error = on_error
+        self.on_preview = on_preview
     
     def disconnect(self):
         """연결을 해제합니다."""
@@ -434,6 +743,10 @@ class ComfyUIManager:
             self.ws.close()
         if self.ws_thread and self.ws_thread.is_alive():
             self.ws_thread.join(timeout=5)
+        if getattr(self, "http", None):
+            self.http.close()
+        if getattr(self, "_download_pool", None):
+            self._download_pool.shutdown(wait=False)
     
     def __del__(self):
         """소멸자"""
@@ -2,7 +2,9 @@
 LangChain TRPG 시스템 설정
 """
 import os
-from typing import Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 # External API 설정
 EXTERNAL_API_CONFIG = {
@@ -14,7 +16,11 @@ OLLAMA_CONFIG = {
     "base_url": os.getenv("OLLAMA_URL", "http://13.209.173.228:11434"),
     "model": os.getenv("OLLAMA_MODEL", "gpt-oss:120b"),
     "temperature": 0.7,
-    "timeout": 120
+    "timeout": 120,
+    # 요청 사이 모델을 메모리에 유지해 같은 게임의 프롬프트 접두부 KV 캐시를 재사용
+    "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+    # 동시에 진행하는 생성 요청 수 (서버의 OLLAMA_NUM_PARALLEL과 맞춤)
+    "max_in_flight": int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
 }
 
 # MySQL 데이터베이스 설정 (기존 설정과 일치)
@@ -32,7 +38,13 @@ MONGODB_CONFIG = {
     "port": int(os.getenv("MONGO_PORT", "27017")),
     "database": os.getenv("MONGO_DB", "trpg_nosql"),
     "username": os.getenv("MONGO_USER", ""),
-    "password": os.getenv("MONGO_PASSWORD", "")
+    "password": os.getenv("MONGO_PASSWORD", ""),
+    # 커넥션 풀 설정 (동시 세션이 몰릴 때 매번 새로 연결하지 않도록 최소 연결 유지)
+    "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+    "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+    "max_idle_time_ms": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+    # 와이어 프로토콜 압축 (zstd/snappy는 zstandard/python-snappy 패키지 설치 시 "zstd,zlib"처럼 지정)
+    "compressors": os.getenv("MONGO_COMPRESSORS", "zlib")
 }
 
 # ChromaDB 설정
@@ -46,7 +58,8 @@ MEMORY_CONFIG = {
     "max_token_limit": 4000,  # 대화 히스토리 최대 토큰
     "summary_threshold": 3000,  # 요약 시작 토큰 수
     "conversation_window": 20,  # 최근 N개 대화 유지
-    "auto_summary": True
+    # 오래된 대화를 LLM으로 요약해 LangChain 메모리에서 잘라냄 (켜면 토큰 계산에 GPT-2 토크나이저 필요)
+    "auto_summary": os.getenv("MEMORY_AUTO_SUMMARY", "false").lower() == "true"
 }
 
 # 게임 설정
@@ -54,7 +67,13 @@ GAME_CONFIG = {
     "default_scenario": "medieval_fantasy",
     "max_characters_per_game": 6,
     "auto_save_interval": 300,  # 5분마다 자동 저장
-    "session_timeout": 3600  # 1시간 세션 타임아웃
+    "session_timeout": 3600,  # 1시간 세션 타임아웃
+    # 메모리에 유지할 최대 게임 세션 수 (초과 시 연결이 없는 가장 오래된 세션부터 해제)
+    "max_sessions": int(os.getenv("MAX_GAME_SESSIONS", "1024")),
+    # 연결이 없는 세션을 해제하기까지의 유휴 시간 (초)
+    "session_idle_ttl": int(os.getenv("SESSION_IDLE_TTL", "1800")),
+    # 캐릭터 사망 시 최근 대화를 LLM으로 요약할지 여부 (기본: GM 응답으로 바로 구성)
+    "death_summary_llm": os.getenv("DEATH_SUMMARY_LLM", "false").lower() == "true"
 }
 
 # 프롬프트 설정
@@ -67,10 +86,38 @@ PROMPT_CONFIG = {
 # 벡터 메모리 설정
 VECTOR_MEMORY_CONFIG = {
     "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
+    # 임베딩 디바이스: "auto"(CUDA 있으면 GPU) / "cpu" / "cuda" / "cuda:1" 등
+    "embedding_device": os.getenv("EMBEDDING_DEVICE", "auto"),
+    "encode_batch_size": 64,  # 임베딩 모델 내부 배치 크기
+    # CPU 임베딩 모델 양자화: "none" 또는 "int8"(Linear 레이어 동적 양자화)
+    # int8 벡터는 기존 FP32로 저장된 임베딩과 약간 달라지므로 새 저장소이거나 재임베딩한 경우에만 사용
+    "embedding_quantization": os.getenv("EMBEDDING_QUANTIZATION", "none"),
     "storage_directory": "./vector_stores",
     "chunk_size": 500,
     "chunk_overlap": 50,
-    "retrieval_k": 5  # 검색할 문서 수
+    "retrieval_k": 5,  # 검색할 문서 수
+    "add_batch_size": 200,  # Chroma에 한 번에 추가할 최대 문서 수 (큰 임포트를 나눠 쓰기)
+    "embed_batch_size": 256,  # 임베딩 모델 한 번 호출에 넣을 최대 텍스트 수
+    "query_cache_size": 512,  # 검색어 임베딩 캐시 항목 수
+    "embedding_cache_size": 1024,  # 같은 텍스트 재임베딩 방지용 캐시 항목 수 (게임 간 공통 문서 재사용)
+    # 대화가 아닌 문서(시나리오/이벤트/위치 등)는 기존 문서와 코사인 유사도가 이 값 이상이면 추가하지 않음
+    "dedup_similarity_threshold": 0.95,
+    # 게임별 컬렉션 생성 시 적용되는 HNSW 인덱스 파라미터 (기존 컬렉션은 search_ef만 조정)
+    "hnsw": {
+        # 거리 공간은 새 컬렉션에만 적용 - 이전에 만든 컬렉션은 l2로 남으며, 바꾸려면 컬렉션을 지우고 재임베딩해야 함
+        "space": "cosine",
+        "M": 16,
+        "construction_ef": 100,
+        "search_ef": 64,
+        "max_search_ef": 256,
+        # 추가된 벡터를 brute-force 버퍼에 모았다가 HNSW 그래프에 한 번에 넣는 단위 / 디스크 동기화 단위
+        "batch_size": 100,
+        "sync_threshold": 1000,
+        # 이 개수 이상을 한 번에 추가하면 그동안 batch_size/sync_threshold를 키워 그래프 갱신을 한 번으로 미룸
+        "bulk_threshold": 50,
+        "max_bulk_batch_size": 5000,
+        "num_threads": os.cpu_count() or 1
+    }
 }
 
 # 이미지 저장 설정
@@ -78,7 +125,13 @@ IMAGE_STORAGE_CONFIG = {
     "storage_directory": os.getenv("IMAGE_STORAGE_PATH", "./static/images"),
     "base_url": os.getenv("IMAGE_BASE_URL", "http://3.35.188.224:5001/images"),
     "max_file_size_mb": 10,
-    "allowed_formats": ["png", "jpg", "jpeg", "webp"]
+    "allowed_formats": ["png", "jpg", "jpeg", "webp"],
+    # 리버스 프록시(nginx) 앞단 서빙: 설정 시 X-Accel-Redirect 헤더만 반환하고 파일 전송은 프록시가 sendfile로 처리
+    "accel_redirect_prefix": os.getenv("IMAGE_ACCEL_REDIRECT_PREFIX", ""),
+    # X-Sendfile을 지원하는 서버(Apache mod_xsendfile 등) 뒤에서 실행할 때 사용
+    "use_x_sendfile": os.getenv("IMAGE_USE_X_SENDFILE", "false").lower() == "true",
+    # 생성 이미지는 파일명이 고유하고 변경되지 않으므로 길게 캐시
+    "cache_max_age": int(os.getenv("IMAGE_CACHE_MAX_AGE", "86400"))
 }
 
 # ComfyUI 서버 설정
@@ -88,22 +141,25 @@ COMFYUI_CONFIG = {
     "workflow_file": "lora.json"
 }
 
-def get_config(section: str = None) -> Dict[str, Any]:
-    """설정 정보 반환"""
-    configs = {
-        "external_api": EXTERNAL_API_CONFIG,
-        "ollama": OLLAMA_CONFIG,
-        "database": DATABASE_CONFIG,
-        "mongodb": MONGODB_CONFIG,
-        "chroma": CHROMA_CONFIG,
-        "memory": MEMORY_CONFIG,
-        "game": GAME_CONFIG,
-        "prompt": PROMPT_CONFIG,
-        "vector_memory": VECTOR_MEMORY_CONFIG,
-        "image_storage": IMAGE_STORAGE_CONFIG,
-        "comfyui": COMFYUI_CONFIG
-    }
+# 섹션 이름 → 설정 (읽기 전용 뷰 - get_config 결과를 캐시하므로 실수로 변경되지 않도록 보호)
+_CONFIG_SECTIONS = MappingProxyType({
+    "external_api": MappingProxyType(EXTERNAL_API_CONFIG),
+    "ollama": MappingProxyType(OLLAMA_CONFIG),
+    "database": MappingProxyType(DATABASE_CONFIG),
+    "mongodb": MappingProxyType(MONGODB_CONFIG),
+    "chroma": MappingProxyType(CHROMA_CONFIG),
+    "memory": MappingProxyType(MEMORY_CONFIG),
+    "game": MappingProxyType(GAME_CONFIG),
+    "prompt": MappingProxyType(PROMPT_CONFIG),
+    "vector_memory": MappingProxyType(VECTOR_MEMORY_CONFIG),
+    "image_storage": MappingProxyType(IMAGE_STORAGE_CONFIG),
+    "comfyui": MappingProxyType(COMFYUI_CONFIG)
+})
+
 
+@lru_cache(maxsize=32)
+def get_config(section: str = None) -> Mapping[str, Any]:
+    """설정 정보 반환 (읽기 전용, 호출마다 새 딕셔너리를 만들지 않음)"""
     if section:
-        return configs.get(section, {})
-    return configs
\ No newline at end of file
+        return _CONFIG_SECTIONS.get(section, MappingProxyType({}))
+    return _CONFIG_SECTIONS
@@ -4,14 +4,86 @@ MongoDB 기반 TRPG 데이터 관리 시스템
 """
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
 from pymongo.errors import ConnectionFailure, OperationFailure
-from bson import ObjectId
 
 from config.settings import get_config
 
+# 벡터화 대상 컬렉션: (컬렉션, 문서 타입, 키 필드, 이름 필드, [(라벨, 필드, 배열 여부), ...])
+_VECTORIZATION_SOURCES = [
+    ("scenarios", "scenario", "scenario_type", "title", [
+        ("시나리오", "title", False),
+        ("설명", "description", False),
+        ("배경", "background", False),
+        ("핵심 요소", "key_elements", True),
+    ]),
+    ("character_templates", "character_template", "character_type", "name", [
+        ("캐릭터 유형", "name", False),
+        ("설명", "description", False),
+        ("특성", "traits", True),
+        ("성격", "personality", False),
+    ]),
+    ("locations", "location", "location_key", "name", [
+        ("위치", "name", False),
+        ("설명", "description", False),
+        ("분위기", "atmosphere", False),
+        ("특징", "features", True),
+    ]),
+    ("event_templates", "event_template", "event_type", "name", [
+        ("이벤트", "name", False),
+        ("설명", "description", False),
+        ("발생 조건", "trigger_condition", False),
+        ("예시", "examples", True),
+    ]),
+]
+
+
+def _vectorization_stages(doc_type: str, key_field: str, name_field: str, lines: list) -> List[Dict[str, Any]]:
+    """문서를 {content, metadata} 형태로 서버에서 변환하는 $project 단계 생성"""
+    parts = []
+    for label, field, is_array in lines:
+        if is_array:
+            # ", ".join(...)과 같은 결과
+            value = {"$reduce": {
+                "input": {"$ifNull": [f"${field}", []]},
+                "initialValue": "",
+                "in": {"$cond": [
+                    {"$eq": ["$$value", ""]},
+                    "$$this",
+                    {"$concat": ["$$value", ", ", "$$this"]}
+                ]}
+            }}
+        else:
+            value = {"$ifNull": [f"${field}", ""]}
+        if parts:
+            parts.append("\n")
+        parts.extend([f"{label}: ", value])
+
+    return [{"$project": {
+        "_id": 0,
+        "content": {"$concat": parts},
+        "metadata": {
+            "type": {"$literal": doc_type},
+            key_field: f"${key_field}",
+            name_field: f"${name_field}",
+            "id": {"$toString": "$_id"}
+        }
+    }}]
+
+
+# 조회 결과에 포함할 필드 (_id는 제외해 ObjectId 변환 불필요)
+_CHAT_HISTORY_PROJECTION = {"_id": 0, "sequence_number": 1, "user_input": 1, "ai_response": 1, "timestamp": 1}
+_STORY_EVENT_PROJECTION = {
+    "_id": 0, "event_type": 1, "event_description": 1, "importance": 1,
+    "location": 1, "characters_involved": 1, "timestamp": 1
+}
+
+
 class MongoManager:
     """MongoDB 연결 및 기본 관리"""
 
@@ -27,7 +99,16 @@ class MongoManager:
         """MongoDB 연결"""
         try:
             connection_string = f"mongodb://{self.config['host']}:{self.config['port']}/"
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
+            self.client = MongoClient(
+                connection_string,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=self.config['max_pool_size'],
+                minPoolSize=self.config['min_pool_size'],
+                maxIdleTimeMS=self.config['max_idle_time_ms'],
+                compressors=self.config['compressors'],
+                retryWrites=True,
+                w=1
+            )
 
             # 연결 테스트
             self.client.admin.command('ping')
@@ -46,12 +127,17 @@ class MongoManager:
 
             # 대화 히스토리 인덱스
             self.db.chat_history.create_index([("game_id", ASCENDING), ("sequence_number", ASCENDING)], unique=True)
+            # 최신순 조회(sort sequence_number DESC + limit)가 인덱스를 그대로 따라가도록 같은 방향의 인덱스
+            self.db.chat_history.create_index([("game_id", ASCENDING), ("sequence_number", DESCENDING)])
             self.db.chat_history.create_index([("game_id", ASCENDING), ("timestamp", DESCENDING)])
-            self.db.chat_history.create_index("game_id")
+            # game_id 단독 인덱스는 위 복합 인덱스들의 접두사로 대체되므로 기존 배포에서 제거
+            self._drop_index_if_exists(self.db.chat_history, "game_id_1")
 
-            # 스토리 이벤트 인덱스
-            self.db.story_events.create_index([("game_id", ASCENDING), ("timestamp", DESCENDING)])
-            self.db.story_events.create_index([("game_id", ASCENDING), ("importance", ASCENDING)])
+            # 스토리 이벤트 인덱스 (Equality → Sort → Range 순서의 단일 인덱스)
+            self.db.story_events.create_index([("game_id", ASCENDING), ("timestamp", DESCENDING), ("importance", ASCENDING)])
+            # 위 인덱스로 대체된 기존 인덱스 정리
+            self._drop_index_if_exists(self.db.story_events, "game_id_1_timestamp_-1")
+            self._drop_index_if_exists(self.db.story_events, "game_id_1_importance_1")
 
             # 템플릿 인덱스
             self.db.scenarios.create_index("scenario_type", unique=True)
@@ -63,6 +149,12 @@ class MongoManager:
         except OperationFailure as e:
             self.logger.error(f"Error creating indexes: {e}")
 
+    def _drop_index_if_exists(self, collection, index_name: str):
+        """기존 배포에 남아 있는 인덱스 삭제 (없으면 무시)"""
+        if index_name in collection.index_information():
+            collection.drop_index(index_name)
+            self.logger.info(f"Dropped index {collection.name}.{index_name}")
+
     def get_collection(self, collection_name: str):
         """컬렉션 반환"""
         return self.db[collection_name]
@@ -76,122 +168,86 @@ class MongoManager:
 class ScenarioDataManager:
     """MongoDB 기반 시나리오 및 게임 데이터 관리"""
 
-    def __init__(self):
-        self.mongo = MongoManager()
+    # 템플릿 캐시 유효 시간 (초) - 기본 데이터는 한 번 삽입된 뒤 거의 바뀌지 않음
+    TEMPLATE_CACHE_TTL = 300
+
+    def __init__(self, mongo: Optional[MongoManager] = None):
+        # 여러 매니저가 같은 MongoClient(커넥션 풀)를 쓰도록 기존 MongoManager를 넘겨받을 수 있음
+        self.mongo = mongo or MongoManager()
         self.logger = logging.getLogger(__name__)
-        self._initialize_default_data()
+        # (컬렉션, 키) -> (만료 시각, 문서)
+        self._template_cache: Dict[tuple, tuple] = {}
+        # 서로 다른 컬렉션에 대한 독립 쿼리를 동시에 보내기 위한 풀 (처음 사용할 때 생성)
+        self._query_pool: Optional[ThreadPoolExecutor] = None
+
+    def _cached_find_one(self, collection_name: str, field: str, value: str,
+                         default: str = None) -> Optional[Dict[str, Any]]:
+        """TTL 캐시를 거친 find_one (없는 문서도 None으로 캐시)
+
+        default가 주어지면 요청한 키와 기본 키를 $in 쿼리 한 번으로 함께 조회해
+        요청한 문서가 없을 때 기본 문서를 반환합니다.
+        """
+        cache_key = (collection_name, value)
+        now = time.monotonic()
+        cached = self._template_cache.get(cache_key)
+
+        if cached and cached[0] > now:
+            doc = cached[1]
+        else:
+            collection = self.mongo.get_collection(collection_name)
+            if default is None or default == value:
+                doc = collection.find_one({field: value}, projection={"_id": 0})
+            else:
+                # 키 필드는 고유 인덱스라 최대 2개 - 요청한 키를 우선
+                candidates = list(collection.find({field: {"$in": [value, default]}}, projection={"_id": 0}).limit(2))
+                candidates.sort(key=lambda d: d[field] != value)
+                doc = candidates[0] if candidates else None
+            self._template_cache[cache_key] = (now + self.TEMPLATE_CACHE_TTL, doc)
+
+        # 호출자가 결과를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return dict(doc) if doc else None
+
+    def _get_query_pool(self) -> ThreadPoolExecutor:
+        """컬렉션별 독립 쿼리용 스레드 풀 반환"""
+        if self._query_pool is None:
+            self._query_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mongo-query")
+        return self._query_pool
+
+    def invalidate_cache(self):
+        """템플릿/시나리오/위치 캐시 비우기 (기본 데이터를 쓰는 쪽에서 호출)"""
+        self._template_cache.clear()
 
     def get_scenario_by_type(self, scenario_type: str) -> Dict[str, Any]:
         """시나리오 타입별 데이터 반환"""
-        collection = self.mongo.get_collection("scenarios")
-        scenario = collection.find_one({"scenario_type": scenario_type})
-
-        if scenario:
-            scenario["_id"] = str(scenario["_id"])  # ObjectId를 문자열로 변환
-            return scenario
-
-        # 기본 시나리오 반환
-        return self.get_scenario_by_type("medieval_fantasy")
+        # 없으면 기본 시나리오 반환
+        return self._cached_find_one("scenarios", "scenario_type", scenario_type, default="medieval_fantasy")
 
     def get_character_template(self, character_type: str) -> Dict[str, Any]:
         """캐릭터 템플릿 반환"""
-        collection = self.mongo.get_collection("character_templates")
-        template = collection.find_one({"character_type": character_type})
-
-        if template:
-            template["_id"] = str(template["_id"])
-            return template
-
-        # 기본 템플릿 반환
-        return self.get_character_template("adventurer")
+        # 없으면 기본 템플릿 반환
+        return self._cached_find_one("character_templates", "character_type", character_type, default="adventurer")
 
     def get_location_info(self, location_key: str) -> Optional[Dict[str, Any]]:
         """위치 정보 반환"""
-        collection = self.mongo.get_collection("locations")
-        location = collection.find_one({"location_key": location_key.lower()})
-
-        if location:
-            location["_id"] = str(location["_id"])
-            return location
-
-        return None
+        return self._cached_find_one("locations", "location_key", location_key.lower())
 
     def get_event_template(self, event_type: str) -> Dict[str, Any]:
         """이벤트 템플릿 반환"""
-        collection = self.mongo.get_collection("event_templates")
-        template = collection.find_one({"event_type": event_type})
+        # 없으면 기본 템플릿 반환
+        return self._cached_find_one("event_templates", "event_type", event_type, default="random_encounter")
 
-        if template:
-            template["_id"] = str(template["_id"])
-            return template
+    def get_all_data_for_vectorization(self) -> List[Dict[str, Any]]:
+        """벡터화를 위한 모든 데이터 반환 (4개 컬렉션을 $unionWith 집계 한 번으로 조회)"""
+        pipeline = _vectorization_stages(*_VECTORIZATION_SOURCES[0][1:])
+        for collection_name, *spec in _VECTORIZATION_SOURCES[1:]:
+            pipeline.append({"$unionWith": {"coll": collection_name, "pipeline": _vectorization_stages(*spec)}})
 
-        # 기본 템플릿 반환
-        return self.get_event_template("random_encounter")
+        cursor = self.mongo.get_collection(_VECTORIZATION_SOURCES[0][0]).aggregate(pipeline, batchSize=500)
+        return list(cursor)
 
-    def get_all_data_for_vectorization(self) -> List[Dict[str, Any]]:
-        """벡터화를 위한 모든 데이터 반환"""
-        data_list = []
-
-        # 시나리오 데이터
-        scenarios = self.mongo.get_collection("scenarios").find()
-        for scenario in scenarios:
-            key_elements = ", ".join(scenario.get("key_elements", []))
-            data_list.append({
-                "content": f"시나리오: {scenario['title']}\n설명: {scenario['description']}\n배경: {scenario['background']}\n핵심 요소: {key_elements}",
-                "metadata": {
-                    "type": "scenario",
-                    "scenario_type": scenario["scenario_type"],
-                    "title": scenario["title"],
-                    "id": str(scenario["_id"])
-                }
-            })
-
-        # 캐릭터 템플릿
-        templates = self.mongo.get_collection("character_templates").find()
-        for template in templates:
-            traits = ", ".join(template.get("traits", []))
-            data_list.append({
-                "content": f"캐릭터 유형: {template['name']}\n설명: {template['description']}\n특성: {traits}\n성격: {template.get('personality', '')}",
-                "metadata": {
-                    "type": "character_template",
-                    "character_type": template["character_type"],
-                    "name": template["name"],
-                    "id": str(template["_id"])
-                }
-            })
-
-        # 위치 정보
-        locations = self.mongo.get_collection("locations").find()
-        for location in locations:
-            features = ", ".join(location.get("features", []))
-            data_list.append({
-                "content": f"위치: {location['name']}\n설명: {location['description']}\n분위기: {location.get('atmosphere', '')}\n특징: {features}",
-                "metadata": {
-                    "type": "location",
-                    "location_key": location["location_key"],
-                    "name": location["name"],
-                    "id": str(location["_id"])
-                }
-            })
-
-        # 이벤트 템플릿
-        events = self.mongo.get_collection("event_templates").find()
-        for event in events:
-            examples = ", ".join(event.get("examples", []))
-            data_list.append({
-                "content": f"이벤트: {event['name']}\n설명: {event['description']}\n발생 조건: {event.get('trigger_condition', '')}\n예시: {examples}",
-                "metadata": {
-                    "type": "event_template",
-                    "event_type": event["event_type"],
-                    "name": event["name"],
-                    "id": str(event["_id"])
-                }
-            })
-
-        return data_list
-
-    def save_game_session(self, game_id: str, scenario_type: str, current_location: str, game_state: Dict[str, Any]):
-        """게임 세션 저장"""
+    def save_game_session(self, game_id: str, scenario_type: str, current_location: str,
+                          game_state: Dict[str, Any]) -> Dict[str, Any]:
+        """게임 세션 저장 후 저장된 세션 문서 반환 (별도의 get_game_session 조회 불필요)"""
         collection = self.mongo.get_collection("game_sessions")
 
         session_data = {
@@ -202,68 +258,79 @@ class ScenarioDataManager:
             "updated_at": datetime.now(timezone.utc)
         }
 
-        collection.update_one(
+        return collection.find_one_and_update(
             {"game_id": game_id},
-            {"$set": session_data, "$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
-            upsert=True
+            {"$set": session_data, "$setOnInsert": {"created_at": session_data["updated_at"]}},
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
 
     def get_game_session(self, game_id: str) -> Optional[Dict[str, Any]]:
         """게임 세션 조회"""
         collection = self.mongo.get_collection("game_sessions")
-        session = collection.find_one({"game_id": game_id})
-
-        if session:
-            session["_id"] = str(session["_id"])
-
-        return session
-
-    def add_chat_message(self, game_id: str, user_input: str, ai_response: str, metadata: Dict[str, Any] = None):
-        """채팅 메시지 추가 (시퀀스 넘버 자동 부여)"""
-        collection = self.mongo.get_collection("chat_history")
+        return collection.find_one({"game_id": game_id}, projection={"_id": 0})
+
+    def _next_chat_sequence(self, game_id: str) -> int:
+        """게임별 다음 시퀀스 넘버 발급 (counters 컬렉션의 원자적 $inc, 평상시 1회 왕복)"""
+        counters = self.mongo.get_collection("counters")
+        counter = counters.find_one_and_update(
+            {"_id": game_id},
+            {"$inc": {"seq": 1}},
+            projection={"seq": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if counter:
+            return counter["seq"]
 
-        # 현재 게임의 최대 시퀀스 넘버 조회
-        max_seq_doc = collection.find_one(
+        # 카운터가 없는 게임: 기존 대화의 최대 시퀀스에서 시작하도록 한 번만 초기화
+        # ($max라 동시에 초기화해도 값이 뒤로 가지 않음)
+        max_seq_doc = self.mongo.get_collection("chat_history").find_one(
             {"game_id": game_id},
+            projection={"_id": 0, "sequence_number": 1},
             sort=[("sequence_number", DESCENDING)]
         )
+        start = max_seq_doc["sequence_number"] if max_seq_doc else 0
+        counters.update_one({"_id": game_id}, {"$max": {"seq": start}}, upsert=True)
+        counter = counters.find_one_and_update(
+            {"_id": game_id},
+            {"$inc": {"seq": 1}},
+            projection={"seq": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
 
-        next_sequence = (max_seq_doc["sequence_number"] + 1) if max_seq_doc else 1
+    def add_chat_message(self, game_id: str, user_input: str, ai_response: str, metadata: Dict[str, Any] = None):
+        """채팅 메시지 추가 (시퀀스 넘버 자동 부여)"""
+        collection = self.mongo.get_collection("chat_history")
 
         message_data = {
             "game_id": game_id,
-            "sequence_number": next_sequence,
+            "sequence_number": self._next_chat_sequence(game_id),
             "user_input": user_input,
             "ai_response": ai_response,
             "metadata": metadata or {},
             "timestamp": datetime.now(timezone.utc)
         }
 
-        try:
-            result = collection.insert_one(message_data)
-            return str(result.inserted_id)
-        except Exception as e:
-            # 동시성으로 인한 중복 시퀀스 에러시 재시도
-            if "duplicate key" in str(e).lower():
-                self.logger.warning(f"Sequence conflict for game {game_id}, retrying...")
-                return self.add_chat_message(game_id, user_input, ai_response, metadata)
-            raise
+        # (game_id, sequence_number) 고유 인덱스는 안전장치로 유지 - 카운터로 발급하므로 충돌하지 않음
+        result = collection.insert_one(message_data)
+        return str(result.inserted_id)
 
     def get_chat_history(self, game_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         """채팅 히스토리 조회 (시퀀스 순서로 정렬)"""
         collection = self.mongo.get_collection("chat_history")
 
-        # 시퀀스 넘버 기준으로 최신 N개 조회
+        # 시퀀스 넘버 기준으로 최신 N개 조회 (metadata 등 표시에 쓰지 않는 필드는 전송하지 않음,
+        # limit 크기의 배치 하나로 끝나도록 batch_size 지정)
         messages = list(collection.find(
-            {"game_id": game_id}
-        ).sort("sequence_number", DESCENDING).limit(limit))
-
-        # ObjectId를 문자열로 변환하고 시퀀스 순서로 정렬
-        for message in messages:
-            message["_id"] = str(message["_id"])
+            {"game_id": game_id},
+            projection=_CHAT_HISTORY_PROJECTION
+        ).sort("sequence_number", DESCENDING).limit(limit).batch_size(limit))
 
         # 시퀀스 순서대로 정렬 (오래된 것부터)
-        return sorted(messages, key=lambda x: x["sequence_number"])
+        messages.reverse()
+        return messages
 
     def add_story_event(self, game_id: str, event_type: str, event_description: str,
                        importance: str = "normal", location: str = None, characters_involved: List[str] = None):
@@ -291,21 +358,22 @@ class ScenarioDataManager:
         if importance:
             query["importance"] = importance
 
-        events = list(collection.find(query).sort("timestamp", DESCENDING).limit(limit))
-
-        for event in events:
-            event["_id"] = str(event["_id"])
-
-        return events
+        # limit 크기의 배치 하나로 끝나도록 batch_size 지정
+        return list(collection.find(query, projection=_STORY_EVENT_PROJECTION)
+                    .sort("timestamp", DESCENDING).limit(limit).batch_size(limit))
 
     def reset_game_data(self, game_id: str):
-        """게임 데이터 리셋"""
+        """게임 데이터 리셋 (컬렉션별 삭제를 동시에 실행)"""
         collections = ["game_sessions", "chat_history", "story_events"]
 
-        for collection_name in collections:
-            collection = self.mongo.get_collection(collection_name)
-            result = collection.delete_many({"game_id": game_id})
-            self.logger.info(f"Deleted {result.deleted_count} documents from {collection_name} for game {game_id}")
+        def delete(collection_name: str) -> int:
+            return self.mongo.get_collection(collection_name).delete_many({"game_id": game_id}).deleted_count
+
+        for collection_name, deleted_count in zip(collections, self._get_query_pool().map(delete, collections)):
+            self.logger.info(f"Deleted {deleted_count} documents from {collection_name} for game {game_id}")
+
+        # 대화가 모두 지워졌으므로 시퀀스 카운터도 처음부터 다시 시작
+        self.mongo.get_collection("counters").delete_one({"_id": game_id})
 
     def get_memory_stats(self, game_id: str) -> Dict[str, Any]:
         """메모리 통계 반환"""
@@ -317,36 +385,49 @@ class ScenarioDataManager:
             "has_session": False
         }
 
-        # 채팅 메시지 수
-        chat_collection = self.mongo.get_collection("chat_history")
-        stats["chat_messages"] = chat_collection.count_documents({"game_id": game_id})
-
-        # 스토리 이벤트 수
-        events_collection = self.mongo.get_collection("story_events")
-        stats["story_events"] = events_collection.count_documents({"game_id": game_id})
-
-        # 세션 존재 여부
-        session_collection = self.mongo.get_collection("game_sessions")
-        stats["has_session"] = session_collection.count_documents({"game_id": game_id}) > 0
+        # 채팅 메시지 수, 스토리 이벤트 수, 세션 존재 여부 - 컬렉션이 달라 동시에 조회
+        chat_count, event_count, session_count = self._get_query_pool().map(
+            lambda name: self.mongo.get_collection(name).count_documents({"game_id": game_id}),
+            ("chat_history", "story_events", "game_sessions")
+        )
+        stats["chat_messages"] = chat_count
+        stats["story_events"] = event_count
+        stats["has_session"] = session_count > 0
 
         stats["exists"] = stats["chat_messages"] > 0 or stats["story_events"] > 0 or stats["has_session"]
 
         return stats
 
-    def _initialize_default_data(self):
-        """기본 데이터 초기화"""
-        # 시나리오 데이터가 없으면 기본 데이터 삽입
-        scenarios_collection = self.mongo.get_collection("scenarios")
-        if scenarios_collection.count_documents({}) == 0:
-            self._insert_default_scenarios()
-            self._insert_default_character_templates()
-            self._insert_default_locations()
-            self._insert_default_event_templates()
+    def seed_default_data(self):
+        """기본 데이터 초기화 (배포 시 seed_defaults 스크립트에서 실행)
+
+        키 기준 upsert라 여러 번 실행해도 안전하며, 4개 컬렉션을 동시에 처리합니다.
+        """
+        pool = self._get_query_pool()
+        futures = [
+            pool.submit(insert)
+            for insert in (
+                self._insert_default_scenarios,
+                self._insert_default_character_templates,
+                self._insert_default_locations,
+                self._insert_default_event_templates
+            )
+        ]
+        for future in futures:
+            future.result()
+        self.invalidate_cache()
+
+    def _upsert_defaults(self, collection_name: str, key_field: str, documents: List[Dict[str, Any]]) -> int:
+        """키 필드 기준으로 없는 기본 문서만 삽입 (bulk_write 한 번, 기존 문서는 건드리지 않음)"""
+        operations = [
+            UpdateOne({key_field: doc[key_field]}, {"$setOnInsert": doc}, upsert=True)
+            for doc in documents
+        ]
+        result = self.mongo.get_collection(collection_name).bulk_write(operations, ordered=False)
+        return result.upserted_count
 
     def _insert_default_scenarios(self):
         """기본 시나리오 삽입"""
-        collection = self.mongo.get_collection("scenarios")
-
         scenarios = [
             {
                 "scenario_type": "medieval_fantasy",
@@ -380,13 +461,12 @@ class ScenarioDataManager:
             }
         ]
 
-        collection.insert_many(scenarios)
-        self.logger.info("Default scenarios inserted")
+        inserted = self._upsert_defaults("scenarios", "scenario_type", scenarios)
+        if inserted:
+            self.logger.info(f"Default scenarios inserted: {inserted}")
 
     def _insert_default_character_templates(self):
         """기본 캐릭터 템플릿 삽입"""
-        collection = self.mongo.get_collection("character_templates")
-
         templates = [
             {
                 "character_type": "adventurer",
@@ -417,13 +497,12 @@ class ScenarioDataManager:
             }
         ]
 
-        collection.insert_many(templates)
-        self.logger.info("Default character templates inserted")
+        inserted = self._upsert_defaults("character_templates", "character_type", templates)
+        if inserted:
+            self.logger.info(f"Default character templates inserted: {inserted}")
 
     def _insert_default_locations(self):
         """기본 위치 정보 삽입"""
-        collection = self.mongo.get_collection("locations")
-
         locations = [
             {
                 "location_key": "마을_여관",
@@ -454,13 +533,12 @@ class ScenarioDataManager:
             }
         ]
 
-        collection.insert_many(locations)
-        self.logger.info("Default locations inserted")
+        inserted = self._upsert_defaults("locations", "location_key", locations)
+        if inserted:
+            self.logger.info(f"Default locations inserted: {inserted}")
 
     def _insert_default_event_templates(self):
         """기본 이벤트 템플릿 삽입"""
-        collection = self.mongo.get_collection("event_templates")
-
         events = [
             {
                 "event_type": "random_encounter",
@@ -491,8 +569,20 @@ class ScenarioDataManager:
             }
         ]
 
-        collection.insert_many(events)
-        self.logger.info("Default event templates inserted")
+        inserted = self._upsert_defaults("event_templates", "event_type", events)
+        if inserted:
+            self.logger.info(f"Default event templates inserted: {inserted}")
+
+# 전역 시나리오 데이터 매니저 인스턴스 (import 시점이 아니라 처음 사용할 때 연결)
+_scenario_data_manager: Optional[ScenarioDataManager] = None
+_scenario_data_manager_lock = threading.Lock()
+
 
-# 전역 시나리오 데이터 매니저 인스턴스
-scenario_data_manager = ScenarioDataManager()
\ No newline at end of file
+def get_scenario_data_manager() -> ScenarioDataManager:
+    """전역 ScenarioDataManager 반환 (첫 호출 시 MongoDB 연결)"""
+    global _scenario_data_manager
+    if _scenario_data_manager is None:
+        with _scenario_data_manager_lock:
+            if _scenario_data_manager is None:
+                _scenario_data_manager = ScenarioDataManager()
+    return _scenario_data_manager
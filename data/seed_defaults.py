@@ -0,0 +1,24 @@
+"""
+MongoDB 기본 데이터 시드 스크립트
+시나리오/캐릭터 템플릿/위치/이벤트 템플릿 기본 문서를 삽입 (배포 시 1회 실행)
+
+사용법: python -m data.seed_defaults
+"""
+
+import logging
+
+from data.mongo_manager import ScenarioDataManager
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    manager = ScenarioDataManager()
+    try:
+        manager.seed_default_data()
+        print("✅ 기본 데이터 시드 완료")
+    finally:
+        manager.mongo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+orjson 기반 JSON 직렬화 유틸리티
+
+Flask 응답(jsonify)과 Socket.IO 패킷 인코딩을 표준 json 대신 orjson으로 처리합니다.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(obj: Any) -> Any:
+    """orjson이 기본으로 지원하지 않는 타입 변환 (datetime/UUID/dataclass는 orjson이 직접 처리)"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, **kwargs) -> str:
+    """JSON 문자열로 직렬화 (표준 json.dumps 호환 시그니처 - separators 등 추가 인자는 무시)"""
+    return orjson.dumps(obj, default=_default).decode()
+
+
+def loads(s: Any, **kwargs) -> Any:
+    """JSON 문자열/바이트 역직렬화"""
+    return orjson.loads(s)
+
+
+def dumps_pretty(obj: Any) -> str:
+    """디버그 로그용 들여쓰기 직렬화"""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_INDENT_2).decode()
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON 프로바이더 - jsonify/request.get_json을 orjson으로 처리"""
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps(obj)
+
+    def loads(self, s: Any, **kwargs) -> Any:
+        return loads(s)
@@ -3,19 +3,51 @@ TRPG 게임별 메모리 관리 시스템
 LangChain의 메모리 시스템을 게임 세션별로 관리
 """
 
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
 from typing import Dict, List, Any, Optional
 from langchain.memory import ConversationSummaryBufferMemory
 from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, get_buffer_string
 from langchain_community.llms import Ollama as OllamaLLM
 
 from config.settings import get_config
 
+# 게임별로 보관하는 최근 메시지 수 (get_recent_messages용 링 버퍼 크기)
+RECENT_MESSAGE_LIMIT = 200
+
+
+@dataclass(slots=True)
+class GameMemory:
+    """게임별 LangChain 메모리와 메시지 수 카운터, 최근 메시지 링 버퍼
+
+    chat_memory 메시지 목록 변경은 모두 lock 안에서 합니다 (요약 워커와 add_message가 함께 접근).
+    """
+    memory: ConversationSummaryBufferMemory
+    human_count: int = 0
+    ai_count: int = 0
+    recent: deque = field(default_factory=lambda: deque(maxlen=RECENT_MESSAGE_LIMIT))
+    # 자동 요약을 켠 경우에만 유지: chat_memory 메시지별 토큰 수(같은 순서)와 그 합
+    # (메시지마다 한 번만 세므로 턴마다 전체 히스토리를 다시 세지 않음)
+    token_counts: deque = field(default_factory=deque)
+    tokens: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
 class TRPGMemoryManager:
     """TRPG 게임별 메모리 관리자"""
 
-    def __init__(self):
-        self.game_memories: Dict[str, ConversationSummaryBufferMemory] = {}
+    def __init__(self, max_games: int = None):
+        # 게임 수 상한을 넘으면 가장 오래 사용하지 않은 게임부터 제거 (LRU)
+        self.game_memories: "OrderedDict[str, GameMemory]" = OrderedDict()
+        self.max_games = max_games or get_config("game")["max_sessions"]
+        self._lock = threading.RLock()
+        # 요약(LLM 호출)은 요청 경로 밖의 단일 워커에서 처리, 게임당 대기 작업은 하나만 유지
+        self._summary_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        self._pending_summaries: set = set()
         self.ollama_config = get_config("ollama")
         self.memory_config = get_config("memory")
 
@@ -23,16 +55,28 @@ class TRPGMemoryManager:
         import logging
         self.logger = logging.getLogger(__name__)
 
-        # Ollama LLM 초기화 (요약용)
-        self.llm = OllamaLLM(
-            base_url=self.ollama_config["base_url"],
-            model=self.ollama_config["model"],
-            temperature=0.3  # 요약은 더 일관되게
-        )
+        # 요약용 Ollama LLM은 첫 메모리를 만들 때 생성 (import 시점 부하 제거)
+        self._llm: Optional[OllamaLLM] = None
+
+    @property
+    def llm(self) -> OllamaLLM:
+        """요약용 Ollama LLM (지연 생성)"""
+        if self._llm is None:
+            self._llm = OllamaLLM(
+                base_url=self.ollama_config["base_url"],
+                model=self.ollama_config["model"],
+                temperature=0.3  # 요약은 더 일관되게
+            )
+        return self._llm
+
+    def _get_entry(self, game_id: str) -> GameMemory:
+        """게임별 메모리 항목 가져오기 (없으면 생성)"""
+        with self._lock:
+            entry = self.game_memories.get(game_id)
+            if entry is not None:
+                self.game_memories.move_to_end(game_id)
+                return entry
 
-    def get_memory(self, game_id: str) -> ConversationSummaryBufferMemory:
-        """게임별 메모리 가져오기"""
-        if game_id not in self.game_memories:
             # 새 메모리 생성
             memory = ConversationSummaryBufferMemory(
                 llm=self.llm,
@@ -40,21 +84,102 @@ class TRPGMemoryManager:
                 return_messages=True,
                 memory_key="chat_history"
             )
-            self.game_memories[game_id] = memory
+            entry = self.game_memories[game_id] = GameMemory(memory)
+            while len(self.game_memories) > self.max_games:
+                evicted_id, _ = self.game_memories.popitem(last=False)
+                self.logger.info(f"LangChain 메모리 LRU 제거: {evicted_id}")
+            return entry
 
-        return self.game_memories[game_id]
+    def get_memory(self, game_id: str) -> ConversationSummaryBufferMemory:
+        """게임별 메모리 가져오기"""
+        return self._get_entry(game_id).memory
 
     def add_message(self, game_id: str, human_input: str, ai_response: str, metadata: Dict[str, Any] = None):
         """대화 메시지 추가"""
         # LangChain 메모리에 추가
-        memory = self.get_memory(game_id)
-        memory.chat_memory.add_user_message(human_input)
-        memory.chat_memory.add_ai_message(ai_response)
+        entry = self._get_entry(game_id)
+        human_message = HumanMessage(content=human_input)
+        ai_message = AIMessage(content=ai_response)
+
+        # 자동 요약이 켜져 있으면 새 메시지의 토큰 수만 락 밖에서 계산
+        auto_summary = self.memory_config["auto_summary"]
+        if auto_summary:
+            counts = (self._count_tokens(entry.memory, human_message), self._count_tokens(entry.memory, ai_message))
+
+        over_limit = False
+        with entry.lock:
+            entry.memory.chat_memory.add_message(human_message)
+            entry.memory.chat_memory.add_message(ai_message)
+            entry.recent.append(human_message)
+            entry.recent.append(ai_message)
+            entry.human_count += 1
+            entry.ai_count += 1
+            if auto_summary:
+                entry.token_counts.extend(counts)
+                entry.tokens += sum(counts)
+                over_limit = entry.tokens > entry.memory.max_token_limit
+
+        # max_token_limit를 넘었을 때만 백그라운드에서 요약 (요약 후에는 다시 넘을 때까지 예약하지 않음)
+        if over_limit:
+            self._schedule_summary(game_id, entry)
+
+    @staticmethod
+    def _count_tokens(memory: ConversationSummaryBufferMemory, message: BaseMessage) -> int:
+        """메시지 하나의 토큰 수 (prune()과 같은 방식으로 역할 접두어 포함)"""
+        return memory.llm.get_num_tokens(get_buffer_string([message]))
+
+    def _schedule_summary(self, game_id: str, entry: GameMemory):
+        """요약 작업 예약 (이미 대기 중이면 생략)"""
+        with self._lock:
+            if game_id in self._pending_summaries:
+                return
+            self._pending_summaries.add(game_id)
+        self._summary_pool.submit(self._summarize, game_id, entry)
+
+    def _summarize(self, game_id: str, entry: GameMemory):
+        """max_token_limit를 넘는 오래된 메시지를 moving_summary_buffer로 요약
+
+        ConversationSummaryBufferMemory.prune()과 같은 규칙이지만, 메시지별로 미리 센 토큰 수를 쓰고
+        LLM 요약은 메시지 스냅샷으로 락 밖에서 하며 결과 반영(앞부분 제거 + 요약 교체)만 락 안에서 합니다.
+        """
+        memory = entry.memory
+        try:
+            with entry.lock:
+                buffer = list(memory.chat_memory.messages)
+                counts = list(entry.token_counts)
+                tokens = entry.tokens
+                previous_summary = memory.moving_summary_buffer
+
+            limit = memory.max_token_limit
+            pruned = 0
+            while tokens > limit and pruned < len(buffer):
+                tokens -= counts[pruned]
+                pruned += 1
+            if not pruned:
+                return
+
+            summary = memory.predict_new_summary(buffer[:pruned], previous_summary)
+
+            with entry.lock:
+                messages = memory.chat_memory.messages
+                # 요약하는 동안에는 뒤에 추가만 되므로 앞부분이 그대로일 때만 반영 (초기화된 경우 버림)
+                if len(messages) < pruned or any(a is not b for a, b in zip(messages, buffer[:pruned])):
+                    return
+                del messages[:pruned]
+                for _ in range(pruned):
+                    entry.tokens -= entry.token_counts.popleft()
+                memory.moving_summary_buffer = summary
+        except Exception as e:
+            self.logger.warning(f"대화 요약 실패 (game {game_id}): {e}")
+        finally:
+            with self._lock:
+                self._pending_summaries.discard(game_id)
 
     def get_chat_history(self, game_id: str) -> List[BaseMessage]:
-        """채팅 히스토리 반환"""
-        memory = self.get_memory(game_id)
-        return memory.chat_memory.messages
+        """채팅 히스토리 반환 (요약 워커가 앞부분을 잘라낼 수 있으므로 복사본)"""
+        entry = self._get_entry(game_id)
+        with entry.lock:
+            return list(entry.memory.chat_memory.messages)
 
     def get_summary(self, game_id: str) -> str:
         """현재까지의 대화 요약 반환"""
@@ -65,32 +190,49 @@ class TRPGMemoryManager:
 
     def clear_memory(self, game_id: str):
         """특정 게임의 메모리 초기화"""
-        if game_id in self.game_memories:
-            self.game_memories[game_id].clear()
+        with self._lock:
+            entry = self.game_memories.get(game_id)
+        if entry:
+            with entry.lock:
+                entry.memory.clear()
+                entry.recent.clear()
+                entry.human_count = 0
+                entry.ai_count = 0
+                entry.token_counts.clear()
+                entry.tokens = 0
 
     def reset_game_memory(self, game_id: str):
         """게임 메모리 완전 리셋 (새 게임 시작 시)"""
-        if game_id in self.game_memories:
-            del self.game_memories[game_id]
+        with self._lock:
+            self.game_memories.pop(game_id, None)
 
     def get_recent_messages(self, game_id: str, n: int = 10) -> List[BaseMessage]:
-        """최근 N개 메시지만 반환"""
-        messages = self.get_chat_history(game_id)
-        return messages[-n:] if len(messages) > n else messages
+        """최근 N개 메시지만 반환 (링 버퍼 뒤쪽에서 N개만 꺼냄, 요약으로 잘린 메시지도 포함)"""
+        entry = self._get_entry(game_id)
+        with entry.lock:
+            tail = list(islice(reversed(entry.recent), n))
+        tail.reverse()
+        return tail
 
     def get_memory_stats(self, game_id: str) -> Dict[str, Any]:
         """메모리 상태 정보 반환"""
-        if game_id not in self.game_memories:
+        entry = self.game_memories.get(game_id)
+        if entry is None:
             return {"exists": False}
 
-        memory = self.game_memories[game_id]
-        messages = memory.chat_memory.messages
+        memory = entry.memory
+        with entry.lock:
+            human_count, ai_count = entry.human_count, entry.ai_count
+            buffered = len(memory.chat_memory.messages)
 
+        # 메시지 수는 모두 카운터 기준 (요약으로 잘린 메시지 포함, clear_memory 이후 누적)
+        # buffered_messages는 요약되지 않고 LangChain 메모리에 원문으로 남아 있는 메시지 수
         return {
             "exists": True,
-            "total_messages": len(messages),
-            "human_messages": len([m for m in messages if isinstance(m, HumanMessage)]),
-            "ai_messages": len([m for m in messages if isinstance(m, AIMessage)]),
+            "total_messages": human_count + ai_count,
+            "human_messages": human_count,
+            "ai_messages": ai_count,
+            "buffered_messages": buffered,
             "has_summary": bool(getattr(memory, 'moving_summary_buffer', None)),
             "summary_length": len(getattr(memory, 'moving_summary_buffer', ''))
         }
@@ -98,24 +240,41 @@ class TRPGMemoryManager:
 class SessionContextManager:
     """세션별 컨텍스트 관리 (캐릭터 정보, 게임 상태 등)"""
 
-    def __init__(self):
-        self.session_contexts: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, max_sessions: int = None):
+        # 세션 수 상한을 넘으면 가장 오래 사용하지 않은 게임부터 제거 (LRU)
+        self.session_contexts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_sessions = max_sessions or get_config("game")["max_sessions"]
+        self._lock = threading.RLock()
+
+    def _get_or_create(self, game_id: str) -> Dict[str, Any]:
+        """게임 컨텍스트 반환 (없으면 생성, 락을 잡은 상태에서 호출)"""
+        context = self.session_contexts.get(game_id)
+        if context is None:
+            context = self.session_contexts[game_id] = {}
+            while len(self.session_contexts) > self.max_sessions:
+                self.session_contexts.popitem(last=False)
+        else:
+            self.session_contexts.move_to_end(game_id)
+        return context
 
     def set_context(self, game_id: str, key: str, value: Any):
         """컨텍스트 정보 설정"""
         # 메모리에 저장
-        if game_id not in self.session_contexts:
-            self.session_contexts[game_id] = {}
-        self.session_contexts[game_id][key] = value
+        with self._lock:
+            self._get_or_create(game_id)[key] = value
 
     def get_context(self, game_id: str, key: str = None) -> Any:
         """컨텍스트 정보 가져오기"""
-        if game_id not in self.session_contexts:
-            self.session_contexts[game_id] = {}
+        with self._lock:
+            context = self._get_or_create(game_id)
+            if key:
+                return context.get(key)
+            return context
 
-        if key:
-            return self.session_contexts[game_id].get(key)
-        return self.session_contexts[game_id]
+    def clear_context(self, game_id: str):
+        """게임 컨텍스트 제거"""
+        with self._lock:
+            self.session_contexts.pop(game_id, None)
 
     def update_character_info(self, game_id: str, character_data: Dict[str, Any]):
         """캐릭터 정보 업데이트"""
@@ -136,22 +295,22 @@ class SessionContextManager:
         # 시나리오 정보
         scenario = context.get("scenario", {})
         if scenario:
-            scenario_text = "\n".join([f"  - {k}: {v}" for k, v in scenario.items()])
+            scenario_text = "\n".join(f"  - {k}: {v}" for k, v in scenario.items())
             context_parts.append(f"=== 시나리오 정보 ===\n{scenario_text}")
 
         # 게임 상태
         game_state = context.get("game_state", {})
         if game_state:
-            state_text = "\n".join([f"  - {k}: {v}" for k, v in game_state.items()])
+            state_text = "\n".join(f"  - {k}: {v}" for k, v in game_state.items())
             context_parts.append(f"=== 게임 상태 ===\n{state_text}")
 
         # 캐릭터 정보
         characters = context.get("characters", {})
         if characters:
             if isinstance(characters, list):
-                char_text = "\n".join([f"  - {c.get('name', '이름없음')}: {c.get('description', '')}" for c in characters])
+                char_text = "\n".join(f"  - {c.get('name', '이름없음')}: {c.get('description', '')}" for c in characters)
             elif isinstance(characters, dict):
-                char_text = "\n".join([f"  - {k}: {v}" for k, v in characters.items()])
+                char_text = "\n".join(f"  - {k}: {v}" for k, v in characters.items())
             else:
                 char_text = f"  - {characters}"
             context_parts.append(f"=== 캐릭터 정보 ===\n{char_text}")
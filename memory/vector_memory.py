@@ -4,10 +4,17 @@ VectorStore 기반 시나리오 및 컨텍스트 메모리 관리
 """
 
 import os
+import queue
+import uuid
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
 from langchain.memory import VectorStoreRetrieverMemory
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
@@ -16,31 +23,47 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from config.settings import get_config
 # MongoDB 의존성 제거 - 외부 API를 통해 데이터 가져올 예정
-# from data.mongo_manager import scenario_data_manager
+# from data.mongo_manager import get_scenario_data_manager
 
 class VectorMemoryManager:
     """벡터 스토어 기반 메모리 관리자"""
 
+    # 백그라운드 기록 스레드가 한 번에 꺼내 처리하는 최대 항목 수
+    WRITE_BATCH_SIZE = 128
+    # 게임별 Chroma 컬렉션 이름 접두사
+    COLLECTION_PREFIX = "game_"
+
     def __init__(self):
         self.config = get_config("vector_memory")
         self.chroma_config = get_config("chroma")
         self.logger = logging.getLogger(__name__)
 
-        # 임베딩 모델 초기화
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=self.config["embedding_model"],
-            model_kwargs={'device': 'cpu'}
-        )
+        # 매 요청 경로에서 쓰는 설정값은 속성으로 한 번만 읽어 둠
+        self._retrieval_k = int(self.config["retrieval_k"])
+        self._chunk_size = int(self.config["chunk_size"])
+        self._add_batch_size = int(self.config["add_batch_size"])
+        self._embed_batch_size = int(self.config["embed_batch_size"])
+        self._embedding_cache_size = int(self.config["embedding_cache_size"])
+        self._query_cache_size = int(self.config["query_cache_size"])
+        self._dedup_threshold = float(self.config["dedup_similarity_threshold"])
+
+        # 임베딩 모델은 처음 사용할 때(또는 warm_up 호출 시) 한 번만 로드
+        self.embedding_device = self._resolve_embedding_device()
+        self._embeddings: Optional[HuggingFaceEmbeddings] = None
+        self._embeddings_lock = threading.Lock()
+        # 모델 추론(순수 CPU/GPU 연산) 실행기 - None이면 호출한 스레드에서 실행
+        self._compute_executor: Optional[Callable[..., Any]] = None
 
         # 텍스트 분할기
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.config["chunk_size"],
+            chunk_size=self._chunk_size,
             chunk_overlap=self.config["chunk_overlap"]
         )
 
         # 게임별 벡터 스토어 저장소
         self.vector_stores: Dict[str, Chroma] = {}
         self.retrievers: Dict[str, VectorStoreRetrieverMemory] = {}
+        self._init_lock = threading.Lock()
 
         # Chroma 지속성 디렉토리
         self.persist_directory = self.chroma_config["persist_directory"]
@@ -49,27 +72,150 @@ class VectorMemoryManager:
         # 기본 시나리오 데이터 준비
         self.base_scenarios = None
 
+        # 텍스트 -> 임베딩 LRU 캐시 (여러 게임에 같은 문서를 넣을 때 다시 계산하지 않음)
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        # 검색어 -> 쿼리 임베딩 LRU 캐시 (같은 질문 반복 시 재계산 방지)
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+        # add_scenario_data 백그라운드 기록 큐 (게임별 대기 건수로 read-your-writes 보장)
+        self._write_queue: "queue.Queue[Tuple[str, str, Optional[Dict[str, Any]]]]" = queue.Queue()
+        self._write_pending: Dict[str, int] = {}
+        self._write_cond = threading.Condition()
+        self._writer_thread: Optional[threading.Thread] = None
+
+        # 게임별 다음 대화 문서 순번 (대화 문서 ID = "{game_id}:{순번 12자리}")과 저장된 대화 문서 수
+        # 순번은 추가 전에 예약하고 문서 수는 추가가 성공한 뒤에만 늘리므로,
+        # 추가 중이거나 추가 실패/삭제로 순번에 빈 자리가 있으면 두 값이 다름
+        self._conversation_seq: Dict[str, int] = {}
+        self._conversation_total: Dict[str, int] = {}
+        # 순번 ID 도입 이전의 대화 문서(임의 UUID ID)가 있는 게임
+        self._legacy_conversation_ids: Dict[str, bool] = {}
+        self._seq_lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> HuggingFaceEmbeddings:
+        """공유 임베딩 모델 (첫 접근 시 로드 및 워밍업)"""
+        if self._embeddings is None:
+            with self._embeddings_lock:
+                if self._embeddings is None:
+                    self._embeddings = self._load_embeddings()
+        return self._embeddings
+
+    def set_compute_executor(self, executor: Optional[Callable[..., Any]]):
+        """임베딩 모델 추론을 실행할 함수 지정 (예: eventlet tpool.execute - executor(fn, *args) 형태)
+
+        잠금이나 큐를 쓰지 않는 모델 호출에만 사용하므로 네이티브 스레드로 넘겨도 안전합니다.
+        """
+        self._compute_executor = executor
+
+    def _compute(self, fn: Callable[..., Any], *args) -> Any:
+        """모델 추론 실행 (실행기가 지정되어 있으면 실행기로)"""
+        if self._compute_executor is None:
+            return fn(*args)
+        return self._compute_executor(fn, *args)
+
+    def warm_up(self):
+        """임베딩 모델을 미리 로드 (서버 시작 시 호출하면 첫 요청의 지연 제거)"""
+        return self.embeddings
+
+    def _load_embeddings(self) -> HuggingFaceEmbeddings:
+        """임베딩 모델 로드 (CUDA가 있으면 GPU + FP16, 없으면 CPU) 후 더미 입력으로 워밍업"""
+        start = time.time()
+        model_kwargs = {'device': self.embedding_device}
+        if self.embedding_device.startswith("cuda"):
+            import torch
+            model_kwargs['model_kwargs'] = {'torch_dtype': torch.float16}
+        embeddings = HuggingFaceEmbeddings(
+            model_name=self.config["embedding_model"],
+            model_kwargs=model_kwargs,
+            encode_kwargs={'batch_size': self.config["encode_batch_size"]}
+        )
+        # 동적 양자화는 CPU 전용
+        if self.embedding_device == "cpu" and self.config["embedding_quantization"] == "int8":
+            self._quantize_embeddings_int8(embeddings)
+
+        # 첫 추론의 커널 초기화 비용을 실제 요청 전에 치름
+        embeddings.embed_query("warmup")
+        self.logger.info(f"Embedding model loaded on {self.embedding_device} in {time.time() - start:.2f}s")
+        return embeddings
+
+    def _resolve_embedding_device(self) -> str:
+        """임베딩 디바이스 결정 ("auto"면 CUDA 사용 가능 여부로 선택)"""
+        device = self.config["embedding_device"]
+        if device != "auto":
+            return device
+        try:
+            import torch
+            return "cuda" if torch.cuda.is_available() else "cpu"
+        except ImportError:
+            return "cpu"
+
+    def _quantize_embeddings_int8(self, embeddings: HuggingFaceEmbeddings):
+        """임베딩 모델의 Linear 레이어를 INT8 동적 양자화 (CPU 추론 속도 향상, 실패 시 FP32 유지)"""
+        try:
+            import torch
+
+            torch.quantization.quantize_dynamic(
+                embeddings._client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+            self.logger.info("Embedding model quantized to INT8")
+        except Exception as e:
+            self.logger.warning(f"INT8 quantization failed, using FP32 embeddings: {e}")
+
     def get_vector_memory(self, game_id: str) -> VectorStoreRetrieverMemory:
-        """게임별 VectorStoreRetrieverMemory 반환"""
-        if game_id not in self.retrievers:
-            self._initialize_game_vector_store(game_id)
+        """게임별 VectorStoreRetrieverMemory 반환 (처음 요청될 때 생성)"""
+        retriever_memory = self.retrievers.get(game_id)
+        if retriever_memory is None:
+            retriever = self.get_vector_store(game_id).as_retriever(
+                search_kwargs={"k": self._retrieval_k}
+            )
+            retriever_memory = self.retrievers.setdefault(game_id, VectorStoreRetrieverMemory(
+                retriever=retriever,
+                memory_key="scenario_context",
+                input_key="user_input"
+            ))
 
-        return self.retrievers[game_id]
+        return retriever_memory
+
+    def get_vector_store(self, game_id: str) -> Chroma:
+        """게임별 벡터 스토어 반환 (이미 로드했으면 Chroma 객체 생성/count 조회 없이 바로 반환)"""
+        vector_store = self.vector_stores.get(game_id)
+        if vector_store is None:
+            self._initialize_game_vector_store(game_id)
+            vector_store = self.vector_stores[game_id]
+        return vector_store
 
     def _initialize_game_vector_store(self, game_id: str):
-        """게임별 벡터 스토어 초기화"""
-        collection_name = f"game_{game_id}"
+        """게임별 벡터 스토어 초기화 (이미 초기화된 게임이면 아무것도 하지 않음)"""
+        with self._init_lock:
+            if game_id not in self.vector_stores:
+                self._load_game_vector_store(game_id)
+
+    def _load_game_vector_store(self, game_id: str):
+        """Chroma 컬렉션 생성/로드 (_init_lock 안에서 호출)"""
+        collection_name = f"{self.COLLECTION_PREFIX}{game_id}"
 
         try:
             # Chroma 벡터 스토어 생성/로드
             vector_store = Chroma(
                 collection_name=collection_name,
                 embedding_function=self.embeddings,
-                persist_directory=self.persist_directory
+                persist_directory=self.persist_directory,
+                collection_metadata=self._hnsw_collection_metadata()
             )
 
             # 기존 데이터 확인
             existing_count = vector_store._collection.count()
+            self.configure_hnsw_params(vector_store, existing_count)
+
+            # 거리 공간은 컬렉션 생성 시에만 정해지므로 기존 컬렉션은 원래 공간(기본 l2)을 그대로 사용
+            space = (vector_store._collection.metadata or {}).get("hnsw:space", "l2")
+            if space != self.config["hnsw"]["space"]:
+                self.logger.warning(
+                    f"Vector store for game {game_id} uses '{space}' distance, not "
+                    f"'{self.config['hnsw']['space']}'; re-create the collection to migrate"
+                )
 
             if existing_count > 0:
                 self.logger.info(f"Loaded existing vector store for game {game_id} with {existing_count} documents")
@@ -79,21 +225,73 @@ class VectorMemoryManager:
 
             self.vector_stores[game_id] = vector_store
 
-            # VectorStoreRetrieverMemory 생성
-            retriever = vector_store.as_retriever(
-                search_kwargs={"k": self.config["retrieval_k"]}
-            )
-
-            self.retrievers[game_id] = VectorStoreRetrieverMemory(
-                retriever=retriever,
-                memory_key="scenario_context",
-                input_key="user_input"
-            )
-
         except Exception as e:
             self.logger.error(f"Failed to initialize vector store for {game_id}: {e}")
             raise
 
+    def _hnsw_collection_metadata(self) -> Dict[str, Any]:
+        """새 컬렉션 생성 시 사용할 HNSW 메타데이터"""
+        hnsw = self.config["hnsw"]
+        return {
+            "hnsw:space": hnsw["space"],
+            "hnsw:M": hnsw["M"],
+            "hnsw:construction_ef": hnsw["construction_ef"],
+            "hnsw:search_ef": hnsw["search_ef"],
+            "hnsw:num_threads": hnsw["num_threads"],
+            "hnsw:batch_size": hnsw["batch_size"],
+            "hnsw:sync_threshold": hnsw["sync_threshold"]
+        }
+
+    @contextmanager
+    def _deferred_index(self, vector_store: Chroma, pending: int):
+        """대량 추가 동안 HNSW 그래프 갱신/동기화를 미뤘다가 끝난 뒤 한 번에 반영
+
+        pending이 bulk_threshold 이상이면 batch_size/sync_threshold를 추가할 문서 수만큼 키우고,
+        끝나면 기본값으로 되돌립니다 (되돌릴 때 버퍼에 모인 벡터가 그래프에 한 번에 들어감).
+        """
+        hnsw = self.config["hnsw"]
+        if pending < hnsw["bulk_threshold"]:
+            yield
+            return
+
+        bulk_size = min(pending, hnsw["max_bulk_batch_size"])
+        try:
+            vector_store._collection.modify(configuration={"hnsw": {
+                "batch_size": max(bulk_size, hnsw["batch_size"]),
+                "sync_threshold": max(bulk_size, hnsw["sync_threshold"])
+            }})
+        except Exception as e:
+            self.logger.warning(f"Failed to defer HNSW index updates: {e}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            try:
+                vector_store._collection.modify(configuration={"hnsw": {
+                    "batch_size": hnsw["batch_size"],
+                    "sync_threshold": hnsw["sync_threshold"]
+                }})
+            except Exception as e:
+                self.logger.warning(f"Failed to restore HNSW index settings: {e}")
+
+    def configure_hnsw_params(self, vector_store: Chroma, vector_count: int):
+        """컬렉션 크기에 맞춰 ef_search 조정 (큰 컬렉션일수록 recall 유지를 위해 증가)"""
+        hnsw = self.config["hnsw"]
+        ef_search = hnsw["search_ef"]
+        if vector_count > 10000:
+            ef_search *= 4
+        elif vector_count > 1000:
+            ef_search *= 2
+        ef_search = min(ef_search, hnsw["max_search_ef"])
+
+        try:
+            vector_store._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+            self.logger.info(f"HNSW ef_search set to {ef_search} ({vector_count} vectors)")
+        except Exception as e:
+            self.logger.warning(f"Failed to configure HNSW params: {e}")
+
     def _add_base_scenarios_to_store(self, vector_store: Chroma, game_id: str):
         """기본 시나리오 데이터를 벡터 스토어에 추가 - MongoDB 제거됨"""
         # MongoDB 의존성 제거
@@ -101,39 +299,303 @@ class VectorMemoryManager:
         self.logger.info(f"Base scenario loading skipped (MongoDB removed) for game {game_id}")
 
     def add_scenario_data(self, game_id: str, content: str, metadata: Dict[str, Any] = None):
-        """시나리오 데이터 추가"""
-        if metadata is None:
-            metadata = {}
-
-        # type이 이미 설정되어 있으면 유지, 없으면 "scenario"로 설정
-        if "type" not in metadata:
-            metadata["type"] = "scenario"
-
-        metadata.update({
-            "game_id": game_id,
-            "timestamp": datetime.now().isoformat()
-        })
-
-        # 텍스트 분할
-        chunks = self._split_text(content)
+        """시나리오 데이터 추가 (큐에 넣고 즉시 반환, 임베딩/기록은 백그라운드 스레드에서 배치로 처리)"""
+        with self._write_cond:
+            self._write_pending[game_id] = self._write_pending.get(game_id, 0) + 1
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._write_loop, name="vector-writer", daemon=True)
+                self._writer_thread.start()
+        self._write_queue.put((game_id, content, metadata))
+
+    def _write_loop(self):
+        """기록 큐를 최대 WRITE_BATCH_SIZE개씩 꺼내 게임별 한 번의 배치로 저장"""
+        while True:
+            items = [self._write_queue.get()]
+            while len(items) < self.WRITE_BATCH_SIZE:
+                try:
+                    items.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            by_game: Dict[str, List[Tuple[str, Optional[Dict[str, Any]]]]] = {}
+            for game_id, content, metadata in items:
+                by_game.setdefault(game_id, []).append((content, metadata))
+
+            for game_id, batch in by_game.items():
+                try:
+                    self.add_scenario_batch(game_id, batch)
+                except Exception as e:
+                    self.logger.error(f"Background vector write failed for game {game_id}: {e}")
+                finally:
+                    with self._write_cond:
+                        remaining = self._write_pending.get(game_id, 0) - len(batch)
+                        if remaining > 0:
+                            self._write_pending[game_id] = remaining
+                        else:
+                            self._write_pending.pop(game_id, None)
+                        self._write_cond.notify_all()
+
+    def flush(self, game_id: str, timeout: Optional[float] = None) -> bool:
+        """게임의 대기 중인 백그라운드 기록이 끝날 때까지 대기 (완료되면 True)"""
+        with self._write_cond:
+            return self._write_cond.wait_for(lambda: not self._write_pending.get(game_id), timeout)
+
+    def add_scenario_batch(self, game_id: str, items: List[Tuple[str, Optional[Dict[str, Any]]]]):
+        """여러 시나리오 데이터를 한 번의 임베딩/Chroma 쓰기로 추가
+
+        같은 배치의 문서는 timestamp가 같으므로 순서 보존을 위해 sequence_number를 부여합니다.
+        """
+        timestamp = datetime.now().isoformat()
+
+        # 텍스트 분할 - chunk_size 이하의 짧은 텍스트(대부분의 대화)는 분할기를 거치지 않고,
+        # 긴 텍스트만 모아 create_documents 한 번으로 분할
+        chunk_size = self._chunk_size
+        long_sources = [i for i, (content, _) in enumerate(items) if len(content) > chunk_size]
+        split_chunks: Dict[int, List[str]] = {}
+        if long_sources:
+            split_docs = self.text_splitter.create_documents(
+                [items[i][0] for i in long_sources],
+                metadatas=[{"source_index": i} for i in long_sources]
+            )
+            for doc in split_docs:
+                split_chunks.setdefault(doc.metadata["source_index"], []).append(doc.page_content)
+
+        # 본문/메타데이터를 Document 객체 없이 평행 리스트로 바로 구성
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for sequence, (content, metadata) in enumerate(items):
+            if len(content) > chunk_size:
+                chunks = split_chunks.get(sequence, [])
+            else:
+                chunks = self._split_text(content)
+            if not chunks:
+                continue
+
+            # type이 이미 설정되어 있으면 유지, 없으면 "scenario"로 설정
+            base = {"type": "scenario", "sequence_number": sequence}
+            if metadata:
+                base.update(metadata)
+            base["game_id"] = game_id
+            base["timestamp"] = timestamp
+
+            # 청크가 하나면(대부분) 복사 없이 그대로 사용
+            if len(chunks) == 1:
+                base["chunk_id"] = 0
+                metadatas.append(base)
+            else:
+                metadatas.extend({**base, "chunk_id": i} for i in range(len(chunks)))
+            texts.extend(chunks)
 
-        # 문서 생성
-        documents = []
-        for i, chunk in enumerate(chunks):
-            doc_metadata = metadata.copy()
-            doc_metadata["chunk_id"] = i
-            documents.append(Document(page_content=chunk, metadata=doc_metadata))
+        if not texts:
+            return
 
         # 벡터 스토어에 추가
-        vector_store = self.vector_stores.get(game_id)
-        if vector_store is None:
-            self._initialize_game_vector_store(game_id)
-            vector_store = self.vector_stores[game_id]
-
-        vector_store.add_documents(documents)
-        # ChromaDB는 자동으로 지속성을 관리하므로 별도 저장 불필요
-
-        self.logger.info(f"Added {len(documents)} scenario chunks to game {game_id}")
+        vector_store = self.get_vector_store(game_id)
+
+        # 대화 문서는 순번 ID로 저장해 히스토리를 ID로 바로 페이지 조회
+        conversation_count = sum(1 for metadata in metadatas if metadata["type"] == "conversation")
+        next_seq = self._reserve_conversation_seq(game_id, conversation_count) if conversation_count else 0
+        ids = []
+        for metadata in metadatas:
+            if metadata["type"] == "conversation":
+                ids.append(self._conversation_id(game_id, next_seq))
+                next_seq += 1
+            else:
+                ids.append(str(uuid.uuid4()))
+
+        # 임베딩은 Chroma 래퍼 밖에서 큰 배치로 한 번에 계산한 뒤 컬렉션에 직접 전달
+        embeddings = self._embed_documents(texts)
+
+        # 거의 같은 내용의 비대화 문서는 건너뜀 (대화 문서는 히스토리이므로 항상 저장)
+        duplicates = self._find_duplicates(vector_store, metadatas, embeddings)
+        if duplicates:
+            keep = [i for i in range(len(texts)) if i not in duplicates]
+            ids = [ids[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            embeddings = [embeddings[i] for i in keep]
+            self.logger.info(f"Skipped {len(duplicates)} near-duplicate chunks for game {game_id}")
+
+        # 큰 임포트는 add_batch_size 단위로 나눠 추가 (ChromaDB는 자동으로 지속성을 관리하므로 별도 저장 불필요)
+        batch_size = self._add_batch_size
+        with self._deferred_index(vector_store, len(ids)):
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                vector_store._collection.add(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end]
+                )
+                added = sum(1 for metadata in metadatas[start:end] if metadata["type"] == "conversation")
+                if added:
+                    self._commit_conversation_count(game_id, added)
+
+        self.logger.info(f"Added {len(ids)} scenario chunks to game {game_id}")
+
+    def _find_duplicates(self, vector_store: Chroma, metadatas: List[Dict[str, Any]],
+                         embeddings: List[List[float]]) -> set:
+        """저장된 문서 또는 같은 배치의 앞선 문서와 거의 같은 비대화 문서의 인덱스 반환"""
+        candidates = [i for i, metadata in enumerate(metadatas) if metadata["type"] != "conversation"]
+        if not candidates:
+            return set()
+
+        threshold = self._dedup_threshold
+        vectors = np.asarray([embeddings[i] for i in candidates], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        # 저장된 비대화 문서 중 가장 가까운 하나와 비교 (후보 전체를 한 번의 쿼리로)
+        # 대화 문서가 최근접으로 잡히면 실제 중복 문서를 놓치므로 대화 문서는 제외
+        stored_similarity = np.zeros(len(candidates), dtype=np.float32)
+        try:
+            results = vector_store._collection.query(
+                query_embeddings=vectors.tolist(), n_results=1,
+                where={"type": {"$ne": "conversation"}}, include=["embeddings"]
+            )
+            nearest_embeddings = results.get("embeddings")
+            for row, nearest in enumerate(nearest_embeddings if nearest_embeddings is not None else []):
+                if nearest is not None and len(nearest):
+                    neighbor = np.asarray(nearest[0], dtype=np.float32)
+                    stored_similarity[row] = vectors[row] @ neighbor / (np.linalg.norm(neighbor) + 1e-12)
+        except Exception as e:
+            self.logger.warning(f"Duplicate check against vector store failed: {e}")
+
+        # 같은 배치 안의 중복은 앞선 문서만 남김
+        in_batch = vectors @ vectors.T
+        duplicates = set()
+        kept_rows = []
+        for row, index in enumerate(candidates):
+            if stored_similarity[row] >= threshold or any(in_batch[row, kept] >= threshold for kept in kept_rows):
+                duplicates.add(index)
+            else:
+                kept_rows.append(row)
+        return duplicates
+
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """문서 임베딩 계산 (캐시에 없는 텍스트만 embed_batch_size 단위로 나눠 모델 호출)"""
+        cache = self._embedding_cache
+        with self._embedding_cache_lock:
+            embeddings = [cache.get(text) for text in texts]
+            for text, embedding in zip(texts, embeddings):
+                if embedding is not None:
+                    cache.move_to_end(text)
+
+        # 중복 텍스트는 한 번만 계산
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if not missing:
+            return embeddings
+
+        batch_size = self._embed_batch_size
+        computed = {}
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            computed.update(zip(batch, self._compute(self.embeddings.embed_documents, batch)))
+
+        with self._embedding_cache_lock:
+            cache.update(computed)
+            while len(cache) > self._embedding_cache_size:
+                cache.popitem(last=False)
+
+        return [embedding if embedding is not None else computed[text] for text, embedding in zip(texts, embeddings)]
+
+    def _embed_query(self, query: str) -> List[float]:
+        """검색어 임베딩 (최근 검색어는 캐시에서 반환)"""
+        with self._embedding_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+                return embedding
+
+        embedding = self._compute(self.embeddings.embed_query, query)
+        with self._embedding_cache_lock:
+            self._query_cache[query] = embedding
+            while len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    @staticmethod
+    def _conversation_id(game_id: str, seq: int) -> str:
+        """대화 문서 ID - 0으로 채운 순번이라 문자열 순서가 저장 순서와 같음"""
+        return f"{game_id}:{seq:012d}"
+
+    def _load_conversation_seq(self, game_id: str):
+        """다음 대화 순번, 대화 문서 수, 레거시 ID 여부를 한 번만 조회해 캐시 (_seq_lock 안에서 호출)
+
+        다음 순번은 문서 수가 아니라 저장된 최대 순번 + 1 (빈 자리가 있어도 기존 ID와 겹치지 않음).
+        """
+        if game_id in self._conversation_seq:
+            return
+
+        collection = self.get_vector_store(game_id)._collection
+        ids = collection.get(where={"type": "conversation"}, include=[])["ids"]
+        max_seq = -1
+        legacy = False
+        for doc_id in ids:
+            seq = self._parse_conversation_seq(game_id, doc_id)
+            if seq is None:
+                legacy = True
+            elif seq > max_seq:
+                max_seq = seq
+        self._conversation_seq[game_id] = max_seq + 1
+        self._conversation_total[game_id] = len(ids)
+        self._legacy_conversation_ids[game_id] = legacy
+
+    @staticmethod
+    def _parse_conversation_seq(game_id: str, doc_id: str) -> Optional[int]:
+        """순번 대화 문서 ID에서 순번 추출 (순번 ID가 아니면 None)"""
+        prefix, sep, seq = doc_id.rpartition(":")
+        if not sep or prefix != game_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _reserve_conversation_seq(self, game_id: str, count: int) -> int:
+        """대화 문서 순번을 count개 예약하고 시작 순번 반환"""
+        with self._seq_lock:
+            self._load_conversation_seq(game_id)
+            start = self._conversation_seq[game_id]
+            self._conversation_seq[game_id] = start + count
+            return start
+
+    def _commit_conversation_count(self, game_id: str, count: int):
+        """추가에 성공한 대화 문서 수를 반영 (캐시가 해제되었으면 다음 조회 때 다시 셈)"""
+        with self._seq_lock:
+            if game_id in self._conversation_total:
+                self._conversation_total[game_id] += count
+
+    def get_conversation_page(self, game_id: str, limit: Optional[int] = None,
+                              offset: int = 0) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], int]:
+        """대화 문서를 오래된 순으로 페이지 조회 - ([(순번, 본문, 메타데이터)], 전체 대화 수)
+
+        순번 ID로 저장된 게임은 해당 범위의 ID만 조회하고(순번에 빈 자리가 있으면 ID 목록만 먼저 조회해 정렬),
+        레거시 ID가 섞인 게임은 전체 조회 후 정렬합니다.
+        """
+        collection = self.get_vector_store(game_id)._collection
+
+        with self._seq_lock:
+            self._load_conversation_seq(game_id)
+            next_seq = self._conversation_seq[game_id]
+            total = self._conversation_total[game_id]
+            legacy = self._legacy_conversation_ids[game_id]
+
+        end = total if limit is None else min(total, offset + limit)
+
+        if not legacy:
+            if offset >= end:
+                return [], total
+            if next_seq == total:
+                ids = [self._conversation_id(game_id, seq) for seq in range(offset, end)]
+            else:
+                # 0으로 채운 순번이라 문자열 정렬이 저장 순서와 같음
+                ids = sorted(collection.get(where={"type": "conversation"}, include=[])["ids"])[offset:end]
+            results = collection.get(ids=ids, include=["documents", "metadatas"])
+            rows = sorted(zip(results["ids"], results["documents"], results["metadatas"]))
+            return [(int(doc_id.rsplit(":", 1)[1]), doc, metadata or {}) for doc_id, doc, metadata in rows], total
+
+        results = collection.get(where={"type": "conversation"}, include=["documents", "metadatas"])
+        rows = [(doc, metadata or {}) for doc, metadata in zip(results["documents"], results["metadatas"])]
+        rows.sort(key=lambda row: (row[1].get("timestamp", ""), row[1].get("sequence_number", 0)))
+        page = rows[offset:] if limit is None else rows[offset:offset + limit]
+        return [(offset + idx, doc, metadata) for idx, (doc, metadata) in enumerate(page)], len(rows)
 
     def add_character_background(self, game_id: str, character_name: str, background: str):
         """캐릭터 배경 추가"""
@@ -161,20 +623,47 @@ class VectorMemoryManager:
 
     def search_relevant_context(self, game_id: str, query: str, k: int = None) -> List[Document]:
         """관련 컨텍스트 검색"""
-        if game_id not in self.vector_stores:
-            self._initialize_game_vector_store(game_id)
-
-        vector_store = self.vector_stores[game_id]
-        k = k or self.config["retrieval_k"]
+        self.flush(game_id)
+        collection = self.get_vector_store(game_id)._collection
+        k = k or self._retrieval_k
 
         try:
-            results = vector_store.similarity_search(query, k=k)
-            self.logger.info(f"Retrieved {len(results)} relevant documents for query: {query[:50]}...")
-            return results
+            results = collection.query(
+                query_embeddings=[self._embed_query(query)],
+                n_results=k,
+                include=["documents", "metadatas"]
+            )
+            documents = results["documents"][0] if results.get("documents") else []
+            metadatas = results["metadatas"][0] if results.get("metadatas") else []
+            docs = [Document(page_content=doc, metadata=metadata or {}) for doc, metadata in zip(documents, metadatas)]
+            self.logger.info(f"Retrieved {len(docs)} relevant documents for query: {query[:50]}...")
+            return docs
         except Exception as e:
             self.logger.error(f"Error searching vector store: {e}")
             return []
 
+    def query_with_metadata(self, game_id: str, query: str, k: int = None,
+                            where: Optional[Dict[str, Any]] = None) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """관련 컨텍스트 검색 - 문서 본문과 메타데이터를 한 번의 Chroma 쿼리로 반환"""
+        self.flush(game_id)
+        collection = self.get_vector_store(game_id)._collection
+        k = k or self._retrieval_k
+
+        try:
+            results = collection.query(
+                query_embeddings=[self._embed_query(query)],
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas"]
+            )
+            documents = results["documents"][0] if results.get("documents") else []
+            metadatas = results["metadatas"][0] if results.get("metadatas") else []
+            self.logger.info(f"Retrieved {len(documents)} relevant documents for query: {query[:50]}...")
+            return documents, [metadata or {} for metadata in metadatas]
+        except Exception as e:
+            self.logger.error(f"Error querying vector store: {e}")
+            return [], []
+
     def get_memory_stats(self, game_id: str) -> Dict[str, Any]:
         """벡터 메모리 통계 반환"""
         if game_id not in self.vector_stores:
@@ -191,21 +680,35 @@ class VectorMemoryManager:
         return {
             "exists": True,
             "total_documents": total_docs,
-            "collection_name": f"game_{game_id}",
+            "collection_name": f"{self.COLLECTION_PREFIX}{game_id}",
             "persist_directory": self.persist_directory
         }
 
+    def release(self, game_id: str):
+        """게임의 벡터 스토어 캐시만 해제 (ChromaDB 데이터는 유지, 다음 사용 시 다시 로드)"""
+        with self._seq_lock:
+            self._conversation_seq.pop(game_id, None)
+            self._conversation_total.pop(game_id, None)
+            self._legacy_conversation_ids.pop(game_id, None)
+        self.vector_stores.pop(game_id, None)
+        self.retrievers.pop(game_id, None)
+        self.logger.info(f"Released vector store cache for game {game_id}")
+
     def reset_vector_memory(self, game_id: str):
         """벡터 메모리 리셋"""
         try:
             # 메모리에서 제거
+            with self._seq_lock:
+                self._conversation_seq.pop(game_id, None)
+                self._conversation_total.pop(game_id, None)
+                self._legacy_conversation_ids.pop(game_id, None)
             if game_id in self.vector_stores:
                 del self.vector_stores[game_id]
             if game_id in self.retrievers:
                 del self.retrievers[game_id]
 
             # ChromaDB 컬렉션 삭제
-            collection_name = f"game_{game_id}"
+            collection_name = f"{self.COLLECTION_PREFIX}{game_id}"
             try:
                 import chromadb
                 client = chromadb.PersistentClient(path=self.persist_directory)
@@ -220,17 +723,20 @@ class VectorMemoryManager:
             self.logger.error(f"Error resetting vector memory for {game_id}: {e}")
 
     def _split_text(self, text: str) -> List[str]:
-        """텍스트 분할"""
+        """텍스트 분할 (chunk_size 이하의 짧은 텍스트는 분할기를 거치지 않음)"""
+        if len(text) <= self._chunk_size:
+            text = text.strip()
+            return [text] if text else []
         return self.text_splitter.split_text(text)
 
     def bulk_import_scenarios(self, game_id: str, scenarios: List[Dict[str, Any]]):
-        """시나리오 일괄 임포트"""
-        for scenario in scenarios:
-            content = scenario.get("content", "")
-            metadata = scenario.get("metadata", {})
-
-            if content:
-                self.add_scenario_data(game_id, content, metadata)
+        """시나리오 일괄 임포트 (시나리오마다 따로 쓰지 않고 한 번의 배치로 추가)"""
+        items = [
+            (scenario["content"], scenario.get("metadata", {}))
+            for scenario in scenarios
+            if scenario.get("content")
+        ]
+        self.add_scenario_batch(game_id, items)
 
         self.logger.info(f"Bulk imported {len(scenarios)} scenarios for game {game_id}")
 
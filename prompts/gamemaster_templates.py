@@ -93,6 +93,31 @@ GM 응답: {gm_response}
 간단하고 핵심적인 영어 프롬프트로 작성하세요."""
 )
 
+# 이미지 생성 판단 프롬프트 (GM 응답과 병렬 실행 - GM 응답 없이 판단)
+IMAGE_DECISION_TEMPLATE = PromptTemplate(
+    input_variables=["user_input", "current_situation"],
+    template="""플레이어 행동 이후 장면에 이미지 생성이 필요한지 판단하세요:
+
+플레이어 입력: {user_input}
+현재 상황: {current_situation}
+
+이미지 생성이 필요한 경우:
+- 새로운 장소나 환경 묘사
+- 중요한 캐릭터나 몬스터 등장
+- 전투나 액션 장면
+- 특별한 아이템이나 오브젝트 발견
+- 극적인 상황 변화
+
+응답 형식 (JSON):
+{{
+    "need_image": true/false,
+    "image_prompt": "이미지 생성용 영어 프롬프트 (10-15단어 이내)",
+    "reason": "이미지 생성/비생성 이유"
+}}
+
+반드시 JSON만 응답하고, 간단하고 핵심적인 영어 프롬프트로 작성하세요."""
+)
+
 # 캐릭터 상호작용 템플릿
 CHARACTER_INTERACTION_TEMPLATE = PromptTemplate(
     input_variables=["character_data", "user_action", "current_scene"],
@@ -171,6 +196,7 @@ def get_prompt_template(template_name: str) -> PromptTemplate:
     templates = {
         "gamemaster": GAMEMASTER_CHAT_PROMPT,
         "image_generation": IMAGE_GENERATION_TEMPLATE,
+        "image_decision": IMAGE_DECISION_TEMPLATE,
         "character_interaction": CHARACTER_INTERACTION_TEMPLATE,
         "scenario_progress": SCENARIO_PROGRESS_TEMPLATE,
         "combat": COMBAT_TEMPLATE
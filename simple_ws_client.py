@@ -1,66 +1,88 @@
 """
 간단한 WebSocket 클라이언트
-서버의 특정 게임 세션 네임스페이스에 연결
+서버의 게임 네임스페이스에 게임 세션 ID로 연결
 """
 
-import socketio
-import time
 import sys
+import threading
+
+try:
+    import socketio
+except ImportError:
+    print("❌ 필요한 패키지를 설치하세요:")
+    print("   pip install python-socketio[client]")
+    sys.exit(1)
 
 SERVER_URL = "http://localhost:5001"
+GAME_NAMESPACE = "/game"
 
 
 class GameWebSocketClient:
-    """게임 WebSocket 클라이언트"""
+    """게임 WebSocket 클라이언트
+
+    서버의 '/game' 네임스페이스에 game_id(auth)로 연결해 해당 게임 룸의 메시지를 주고받습니다.
+    """
+
+    # 메시지 전송 후 응답을 기다리는 최대 시간 (초)
+    RESPONSE_TIMEOUT = 60
 
     def __init__(self, server_url=SERVER_URL):
         self.server_url = server_url
-        self.sio = None
-        self.namespace = None
+        # 게임 ID는 연결 auth로 전달되므로 연결(클라이언트) 하나가 게임 하나를 담당 - 인스턴스끼리 공유하지 않음
+        self.sio = socketio.Client()
+        self.namespace = GAME_NAMESPACE
         self.game_id = None
         self.connected = False
+        self._response_event = threading.Event()
+        self._register_handlers()
 
-    def connect_to_game(self, game_id):
-        """게임 세션 ID로 WebSocket 연결"""
-        self.game_id = game_id
-        self.namespace = f"/game/{game_id}"
+    def _register_handlers(self):
+        """이벤트 핸들러 등록"""
+        namespace = self.namespace
 
-        print(f"🎮 게임 세션: {game_id}")
-        print(f"🔌 연결 시도: {self.server_url}{self.namespace}")
-
-        # SocketIO 클라이언트 생성
-        self.sio = socketio.Client()
-
-        # 이벤트 핸들러 등록
-        @self.sio.on('status', namespace=self.namespace)
         def on_status(data):
             print(f"📢 {data.get('message')}")
 
-        @self.sio.on('game_response', namespace=self.namespace)
         def on_game_response(data):
             print(f"\n{'='*50}")
-            print(f"📥 게임 응답:")
+            print(f"📥 게임 응답 ({data.get('game_id', self.game_id)}):")
             print(f"   {data.get('response')}")
             print(f"{'='*50}\n")
+            self._response_event.set()
 
-        @self.sio.on('error', namespace=self.namespace)
         def on_error(data):
             print(f"⚠️  에러: {data}")
+            self._response_event.set()
 
-        @self.sio.on('connect', namespace=self.namespace)
         def on_connect():
             self.connected = True
-            print(f"✅ 연결 성공!")
+            print(f"✅ 연결 성공! ({namespace}, 게임 {self.game_id})")
 
-        @self.sio.on('disconnect', namespace=self.namespace)
         def on_disconnect():
             self.connected = False
-            print(f"❌ 연결 종료")
+            self._response_event.set()
+            print(f"❌ 연결 종료 ({self.game_id})")
+
+        self.sio.on('status', on_status, namespace=namespace)
+        self.sio.on('game_response', on_game_response, namespace=namespace)
+        self.sio.on('error', on_error, namespace=namespace)
+        self.sio.on('connect', on_connect, namespace=namespace)
+        self.sio.on('disconnect', on_disconnect, namespace=namespace)
+
+    def connect_to_game(self, game_id):
+        """게임 세션 ID로 WebSocket 연결"""
+        self.game_id = game_id
+        print(f"🎮 게임 세션: {game_id}")
+        print(f"🔌 연결 시도: {self.server_url}{self.namespace}")
 
         try:
-            # WebSocket 연결
-            self.sio.connect(self.server_url, namespaces=[self.namespace])
-            time.sleep(0.5)
+            # 네임스페이스 연결이 끝날 때까지 connect가 대기
+            self.sio.connect(
+                self.server_url,
+                namespaces=[self.namespace],
+                auth={'game_id': game_id},
+                wait_timeout=5
+            )
             return True
 
         except Exception as e:
@@ -70,7 +92,7 @@ class GameWebSocketClient:
             print(f"   2. 세션이 생성되었나요?")
             print(f"      curl -X POST {self.server_url}/api/session/create \\")
             print(f"        -H 'Content-Type: application/json' \\")
-            print(f"        -d '{{\"game_id\": \"{game_id}\"}}'")
+            print(f"        -d '{{\"game_id\": \"{game_id}\", \"session_id\": \"...\"}}'")
             return False
 
     def send_message(self, message):
@@ -81,6 +103,7 @@ class GameWebSocketClient:
 
         try:
             print(f"💬 전송: {message}")
+            self._response_event.clear()
             self.sio.emit('message', {'message': message}, namespace=self.namespace)
             return True
         except Exception as e:
@@ -107,8 +130,9 @@ class GameWebSocketClient:
                 if user_input.lower() in ['quit', 'exit', '종료']:
                     break
 
-                self.send_message(user_input)
-                time.sleep(0.5)
+                # 고정 시간 대기 대신 응답(또는 에러/연결 종료) 이벤트가 오면 바로 다음 입력
+                if self.send_message(user_input):
+                    self._response_event.wait(self.RESPONSE_TIMEOUT)
 
         except KeyboardInterrupt:
             print("\n")
@@ -120,13 +144,6 @@ class GameWebSocketClient:
 
 
 if __name__ == "__main__":
-    try:
-        import socketio
-    except ImportError:
-        print("❌ 필요한 패키지를 설치하세요:")
-        print("   pip install python-socketio[client]")
-        sys.exit(1)
-
     print("=" * 50)
     print("🎮 WebSocket 클라이언트")
     print("=" * 50)
@@ -1,16 +1,24 @@
 """
 테스트용 WebSocket 클라이언트
 1. HTTP로 게임 세션 ID 등록
-2. 받은 네임스페이스로 WebSocket 연결
+2. 받은 네임스페이스에 게임 ID(auth)로 WebSocket 연결
 3. 메시지 송수신
 """
 
-import socketio
-import requests
-import time
 import sys
+import threading
+import time
+
+try:
+    import socketio
+    import requests
+except ImportError:
+    print("❌ 필요한 패키지를 설치하세요:")
+    print("   pip install python-socketio[client] requests")
+    sys.exit(1)
 
 SERVER_URL = "http://localhost:5001"
+RESPONSE_TIMEOUT = 5  # 메시지당 응답 대기 최대 시간 (초)
 
 
 def create_game_session(game_id):
@@ -46,6 +54,7 @@ def test_websocket_communication(namespace, game_id):
 
     # SocketIO 클라이언트 생성
     sio = socketio.Client()
+    response_received = threading.Event()
 
     # 이벤트 핸들러 등록
     @sio.on('status', namespace=namespace)
@@ -59,19 +68,20 @@ def test_websocket_communication(namespace, game_id):
         print(f"   에코: {data.get('echo')}")
         print(f"   응답: {data.get('response')}")
         print()
+        response_received.set()
 
     @sio.on('error', namespace=namespace)
     def on_error(data):
         print(f"⚠️  에러: {data}")
+        response_received.set()
 
     try:
         # WebSocket 연결
         print(f"   연결 중...")
-        sio.connect(SERVER_URL, namespaces=[namespace])
+        # connect는 네임스페이스 연결이 끝날 때까지 대기
+        sio.connect(SERVER_URL, namespaces=[namespace], auth={'game_id': game_id}, wait_timeout=5)
         print(f"✅ WebSocket 연결 성공!")
 
-        time.sleep(1)
-
         # 테스트 메시지 전송
         test_messages = [
             "안녕하세요",
@@ -81,13 +91,18 @@ def test_websocket_communication(namespace, game_id):
 
         for i, msg in enumerate(test_messages, 1):
             print(f"\n📤 메시지 전송 [{i}/{len(test_messages)}]: {msg}")
-            sio.emit('message', {'message': msg}, namespace=namespace)
-            time.sleep(2)  # 응답 대기
+            response_received.clear()
+            started = time.perf_counter()
+            # 서버 핸들러가 game_response를 보낸 뒤 ack가 오므로 둘 중 먼저 오는 쪽에서 진행
+            sio.emit('message', {'message': msg}, namespace=namespace,
+                     callback=lambda *args: response_received.set())
+            if response_received.wait(RESPONSE_TIMEOUT):
+                print(f"   ⏱️  응답 시간: {(time.perf_counter() - started) * 1000:.0f}ms")
+            else:
+                print(f"⚠️  {RESPONSE_TIMEOUT}초 안에 응답이 없습니다")
 
         print("\n✅ 모든 메시지 전송 완료")
 
-        # 잠시 대기 후 연결 종료
-        time.sleep(2)
         sio.disconnect()
         print("👋 연결 종료")
 
@@ -122,7 +137,6 @@ def main():
         return
 
     # 2단계: WebSocket 연결 및 통신
-    time.sleep(1)
     test_websocket_communication(namespace, game_id)
 
     print("\n" + "=" * 50)
@@ -131,12 +145,4 @@ def main():
 
 
 if __name__ == "__main__":
-    try:
-        import socketio
-        import requests
-    except ImportError:
-        print("❌ 필요한 패키지를 설치하세요:")
-        print("   pip install python-socketio[client] requests")
-        sys.exit(1)
-
     main()
@@ -1,53 +1,220 @@
 """
 테스트용 WebSocket 서버
-게임 세션 ID별로 WebSocket 네임스페이스 제공
+하나의 '/game' 네임스페이스에서 게임 세션 ID별 룸으로 메시지 전달
 세션 생성 시 자동으로 내부 클라이언트 연결
 """
 # 1. Eventlet을 임포트하고 monkey_patch()를 호출합니다.
 import eventlet
 eventlet.monkey_patch() # 표준 라이브러리를 비동기 버전으로 패치
 
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO, Namespace, emit
+from flask import Flask, Response, request, jsonify, session
+from flask_socketio import SocketIO, Namespace, join_room
+import atexit
 import logging
+from dataclasses import dataclass
+from typing import Optional
 import socketio as socketio_client
-# threading 대신 eventlet.greenthread를 사용하는 것이 더 안전하지만,
-# monkey_patch()를 하면 threading도 eventlet 환경에서 작동하게 됩니다.
+import json_utils
+# monkey_patch() 이후 threading.Lock은 그린 스레드용 락으로 동작합니다.
 import threading
 
 app = Flask(__name__)
 app.secret_key = 'test-secret-key'
+app.json = json_utils.OrjsonProvider(app)
 # Eventlet을 사용하도록 명시적으로 설정할 수도 있지만, monkey_patch를 하면 대부분 자동으로 인식됩니다.
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet') 
+# 기본('/') 네임스페이스 핸들러는 등록하지 않으므로 '/game' 외의 연결은 프로토콜 계층에서 거부됩니다.
+# Socket.IO 패킷 인코딩은 orjson 기반 json_utils 사용 (orjson 모듈을 직접 넘기면 separators 인자/bytes 반환이 맞지 않음)
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode='eventlet',
+    always_connect=False,
+    json=json_utils
+)
 
 # CORS 설정 (수동)
+# /socket.io/ 요청은 engineio 미들웨어가 Flask보다 먼저 처리하므로 여기까지 오지 않음
+_CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization'),
+    ('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS'),
+)
+
+
 @app.after_request
 def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    # 헬스 체크 응답은 미리 만든 헤더를 그대로 사용
+    if request.path == '/health':
+        return response
+    response.headers.extend(_CORS_HEADERS)
     return response
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+_LOG_BAR = '=' * 50
+
+# 모든 게임이 공유하는 WebSocket 네임스페이스 (게임별 구분은 game_id 룸)
+GAME_NAMESPACE = '/game'
+
+# 게임 세션 정보
+@dataclass(slots=True)
+class GameSession:
+    session_id: Optional[str]
+    active: bool = True
+    connection_count: int = 0
 
 # 게임 세션 저장소
+# (HTTP 요청/소켓 핸들러/외부 연결 스레드에서 함께 접근하므로 변경 시 _sessions_lock 사용)
 game_sessions = {}
-# 자동 연결된 내부 클라이언트들
-auto_clients = {}
+_sessions_lock = threading.Lock()
+
+# 외부 WebSocket 서버 - 게임마다 독립된 클라이언트 연결
+# (python-socketio 클라이언트는 연결된 뒤 네임스페이스를 추가/제거할 수 없어, 연결을 공유하면
+#  게임 하나가 시작/종료될 때마다 다른 게임의 연결까지 끊었다가 다시 맺어야 함)
+# python-socketio 클라이언트는 http:// 형식 사용 (자동으로 WebSocket으로 업그레이드)
+EXTERNAL_URL = "http://192.168.26.165:3000"
+# 게임 ID -> 외부 서버 클라이언트 (연결 시도 중인 클라이언트 포함)
+external_clients = {}
+_external_lock = threading.Lock()
+# 외부 서버 연결 작업용 그린 스레드 풀 (세션 생성이 몰려도 동시에 대기하는 작업 수를 제한)
+EXTERNAL_POOL_SIZE = 256
+_external_pool = eventlet.GreenPool(size=EXTERNAL_POOL_SIZE)
+
+
+def _change_connection_count(game_id, delta):
+    """세션 연결 수를 delta만큼 변경하고 남은 연결 수 반환 (없거나 닫힌 세션에 연결하면 None)"""
+    with _sessions_lock:
+        game_session = game_sessions.get(game_id)
+        if game_session is None or (delta > 0 and not game_session.active):
+            return None
+        game_session.connection_count += delta
+        return game_session.connection_count
+
+
+def _pop_closed_session(game_id):
+    """닫힌 세션에 남은 연결이 없으면 저장소에서 제거 (제거했으면 True)"""
+    with _sessions_lock:
+        game_session = game_sessions.get(game_id)
+        if game_session is None or game_session.active or game_session.connection_count > 0:
+            return False
+        del game_sessions[game_id]
+        return True
+
+
+def _reap_session(game_id):
+    """닫힌 세션 정리 - 세션 항목, 게임 룸, 외부 서버 네임스페이스 해제"""
+    if not _pop_closed_session(game_id):
+        return
+
+    socketio.close_room(game_id, namespace=GAME_NAMESPACE)
+    try:
+        disconnect_external(game_id)
+    except Exception as e:
+        logger.error(f"❌ [{game_id}] 외부 서버 연결 해제 실패: {e}")
+    logger.info("🧹 [%s] 세션 정리 완료", game_id)
+
+
+class ExternalGameNamespace(socketio_client.ClientNamespace):
+    """게임별 외부 클라이언트의 네임스페이스 핸들러 (게임당 객체 하나, 메서드는 공유)"""
+
+    def __init__(self, namespace, game_id):
+        super().__init__(namespace)
+        self.game_id = game_id
+
+    def on_connect(self):
+        logger.info("🌐 외부 서버 연결 완료: %s%s", EXTERNAL_URL, self.namespace)
+
+    def on_disconnect(self):
+        logger.info("🌐 외부 서버 연결 해제: %s", self.game_id)
+
+    def on_status(self, data):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[외부-%s] 📢 %s", self.game_id, data.get('message'))
+
+    def on_game_response(self, data):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[외부-%s] 📥 응답: %s", self.game_id, data.get('response'))
+        # 로컬 게임 룸으로 브로드캐스트
+        socketio.emit('game_response', data, namespace=GAME_NAMESPACE, to=self.game_id)
+
+
+def connect_external(game_id):
+    """게임 전용 클라이언트로 외부 서버의 게임 네임스페이스에 연결 (다른 게임 연결은 건드리지 않음)"""
+    external_namespace = f"/game/{game_id}"
+
+    with _external_lock:
+        if game_id in external_clients:
+            return
+        client = socketio_client.Client(reconnection=True)
+        client.register_namespace(ExternalGameNamespace(external_namespace, game_id))
+        external_clients[game_id] = client
+
+    # 네트워크 I/O는 락 밖에서 (다른 게임의 연결/해제를 막지 않음)
+    logger.info("🔌 외부 서버 연결 시도: %s%s", EXTERNAL_URL, external_namespace)
+    try:
+        client.connect(EXTERNAL_URL, namespaces=[external_namespace])
+    except Exception:
+        with _external_lock:
+            if external_clients.get(game_id) is client:
+                del external_clients[game_id]
+        raise
+
+    # 연결하는 동안 세션이 정리되었으면 (disconnect_external이 이미 뺐으면) 바로 닫음
+    with _external_lock:
+        stale = external_clients.get(game_id) is not client
+    if stale:
+        client.disconnect()
+        return
+
+    logger.info("✅ 외부 서버 연결 성공: %s", game_id)
+
+
+def disconnect_external(game_id):
+    """게임의 외부 서버 클라이언트 연결 해제"""
+    with _external_lock:
+        client = external_clients.pop(game_id, None)
+    if client is not None and client.connected:
+        client.disconnect()
+
+
+@atexit.register
+def _close_external_clients():
+    """서버 종료 시 모든 외부 서버 연결 해제"""
+    with _external_lock:
+        clients = list(external_clients.values())
+        external_clients.clear()
+    for client in clients:
+        if client.connected:
+            client.disconnect()
+
+
+def _validate_session_request(data):
+    """세션 생성 요청 본문 검증 - 문제가 있으면 에러 메시지 반환 (ID는 비어 있지 않기만 하면 형식 무관)"""
+    if not isinstance(data, dict):
+        return "JSON 객체 본문이 필요합니다"
+    if not data.get('game_id'):
+        return "game_id가 필요합니다"
+    if not data.get('session_id'):
+        return "session_id가 필요합니다"
+    return None
+
+
+# 헬스 체크 응답 (매 요청마다 직렬화하지 않도록 미리 만든 본문/헤더)
+HEALTH_BODY = b'{"status":"ok"}'
+HEALTH_HEADERS = [('Access-Control-Allow-Origin', '*')]
 
 
 @app.route('/health')
 def health():
     """헬스 체크"""
-    return jsonify({"status": "ok"})
+    return Response(HEALTH_BODY, mimetype='application/json', headers=HEALTH_HEADERS)
 
 
 @app.route('/api/session/create', methods=['POST'])
 def create_session():
     """
     외부에서 게임 ID와 세션 ID 받기
-    WebSocket 네임스페이스 생성 및 등록
+    게임 세션 등록 (클라이언트는 '/game' 네임스페이스에 game_id로 연결)
 
     Request:
     {
@@ -60,105 +227,60 @@ def create_session():
         "success": true,
         "game_id": "my-game-001",
         "session_id": "session-12345",
-        "websocket_namespace": "/game/my-game-001"
+        "websocket_namespace": "/game"
     }
     """
     try:
-        data = request.get_json()
-        game_id = data.get('game_id')
-        session_id = data.get('session_id')
-
-        if not game_id:
+        data = request.get_json(silent=True)
+        error = _validate_session_request(data)
+        if error:
             return jsonify({
                 "success": False,
-                "error": "game_id가 필요합니다"
+                "error": error
             }), 400
 
-        if not session_id:
-            return jsonify({
-                "success": False,
-                "error": "session_id가 필요합니다"
-            }), 400
+        # 숫자 ID 등도 받아서 문자열로 통일 (WebSocket auth의 game_id와 같은 형식)
+        game_id = str(data['game_id'])
+        session_id = str(data['session_id'])
+
+        logger.info(
+            "\n%s\n📡 외부에서 데이터 수신\n   게임 ID: %s\n   세션 ID: %s\n%s",
+            _LOG_BAR, game_id, session_id, _LOG_BAR
+        )
 
-        logger.info(f"\n{'='*50}")
-        logger.info(f"📡 외부에서 데이터 수신")
-        logger.info(f"   게임 ID: {game_id}")
-        logger.info(f"   세션 ID: {session_id}")
-        logger.info(f"{'='*50}")
+        # 이미 존재하는 세션인지 확인하고 없으면 등록 (확인과 등록을 한 번에)
+        with _sessions_lock:
+            created = game_id not in game_sessions
+            if created:
+                game_sessions[game_id] = GameSession(session_id=session_id)
 
-        # 이미 존재하는 세션인지 확인
-        if game_id in game_sessions:
-            logger.info(f"⚠️  세션 이미 존재: {game_id}")
+        if not created:
+            logger.info("⚠️  세션 이미 존재: %s", game_id)
             return jsonify({
                 "success": True,
                 "game_id": game_id,
-                "websocket_namespace": f"/game/{game_id}",
+                "websocket_namespace": GAME_NAMESPACE,
                 "status": "already_exists"
             })
 
-        # 세션 등록
-        game_sessions[game_id] = {
-            "session_id": session_id,
-            "active": True,
-            "connection_count": 0
-        }
-
-        namespace = f"/game/{game_id}"
-
-        # 동적으로 네임스페이스 등록
-        socketio.on_namespace(GameNamespace(namespace, game_id))
-
-        logger.info(f"✅ 로컬 WebSocket 네임스페이스 등록 완료: {game_id}")
-        logger.info(f"📡 로컬 대기 주소: ws://192.168.26.165:5001{namespace}")
+        logger.info("✅ 로컬 게임 세션 등록 완료: %s", game_id)
+        logger.info("📡 로컬 대기 주소: ws://192.168.26.165:5001%s?game_id=%s", GAME_NAMESPACE, game_id)
 
         # 외부 WebSocket 서버에 자동 연결
         def auto_connect_external():
             try:
-                import time
-                time.sleep(0.5)
-
-                # 외부 WebSocket 서버 연결
-                # python-socketio 클라이언트는 http:// 형식 사용 (자동으로 WebSocket으로 업그레이드)
-                external_url = "http://192.168.26.165:3000"
-                external_namespace = f"/game/{game_id}"
-
-                client = socketio_client.Client()
-
-                @client.on('connect', namespace=external_namespace)
-                def on_connect():
-                    logger.info(f"🌐 외부 서버 연결 완료: {external_url}{external_namespace}")
-
-                @client.on('disconnect', namespace=external_namespace)
-                def on_disconnect():
-                    logger.info(f"🌐 외부 서버 연결 해제: {game_id}")
-
-                @client.on('status', namespace=external_namespace)
-                def on_status(data):
-                    logger.info(f"[외부-{game_id}] 📢 {data.get('message')}")
-
-                @client.on('game_response', namespace=external_namespace)
-                def on_response(data):
-                    logger.info(f"[외부-{game_id}] 📥 응답: {data.get('response')}")
-                    # 로컬 네임스페이스로 브로드캐스트
-                    socketio.emit('game_response', data, namespace=namespace)
-
-                # 외부 서버 연결 (네임스페이스 포함)
-                logger.info(f"🔌 외부 서버 연결 시도: {external_url}{external_namespace}")
-                client.connect(external_url, namespaces=[external_namespace])
-                auto_clients[game_id] = client
-                logger.info(f"✅ 외부 서버 연결 성공: {game_id}")
-
+                connect_external(game_id)
             except Exception as e:
                 logger.error(f"❌ 외부 서버 연결 실패: {e}")
 
-        # 백그라운드에서 연결
-        threading.Thread(target=auto_connect_external, daemon=True).start()
+        # 공유 풀의 그린 스레드에서 연결 (connect가 완료될 때까지 해당 그린 스레드만 대기)
+        _external_pool.spawn_n(auto_connect_external)
 
         return jsonify({
             "success": True,
             "game_id": game_id,
             "session_id": session_id,
-            "websocket_namespace": namespace,
+            "websocket_namespace": GAME_NAMESPACE,
             "auto_client": "connecting"
         })
 
@@ -170,49 +292,102 @@ def create_session():
         }), 500
 
 
-# 기본 네임스페이스 핸들러 (잘못된 연결 처리)
-@socketio.on('connect')
-def handle_default_connect():
-    """기본 네임스페이스 연결 - 에러 안내"""
-    logger.warning(f"⚠️  잘못된 연결: {request.sid} - 게임별 네임스페이스를 사용하세요")
-    emit('error', {
-        'message': '게임 세션 네임스페이스로 연결해주세요. 예: /game/{game_id}'
+@app.route('/api/session/close', methods=['POST'])
+def close_session():
+    """
+    게임 세션 종료
+    세션을 닫힘으로 표시하고, 연결된 클라이언트가 모두 나가면 세션 항목과 외부 서버 연결을 정리
+
+    Request:
+    {
+        "game_id": "my-game-001"
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    game_id = data.get('game_id')
+
+    if not game_id:
+        return jsonify({
+            "success": False,
+            "error": "game_id가 필요합니다"
+        }), 400
+
+    with _sessions_lock:
+        game_session = game_sessions.get(game_id)
+        if game_session is not None:
+            game_session.active = False
+            connection_count = game_session.connection_count
+
+    if game_session is None:
+        return jsonify({
+            "success": False,
+            "error": f"존재하지 않는 게임 세션입니다: {game_id}"
+        }), 404
+
+    logger.info("🔒 [%s] 세션 종료 요청 (남은 연결: %d)", game_id, connection_count)
+    if connection_count == 0:
+        socketio.start_background_task(_reap_session, game_id)
+
+    return jsonify({
+        "success": True,
+        "game_id": game_id,
+        "connection_count": connection_count,
+        "status": "closing" if connection_count else "closed"
     })
-    return False  # 연결 거부
 
-@socketio.on('disconnect')
-def handle_default_disconnect():
-    """기본 네임스페이스 연결 해제"""
-    logger.info(f"❌ 기본 네임스페이스 연결 해제: {request.sid}")
+
+# on_message 응답의 고정 필드
+_RESPONSE_TEMPLATE = {"success": True, "game_id": None, "echo": None, "response": None}
 
 
 class GameNamespace(Namespace):
-    """게임별 WebSocket 네임스페이스"""
+    """게임 WebSocket 네임스페이스
 
-    def __init__(self, namespace, game_id):
-        super().__init__(namespace)
-        self.game_id = game_id
+    모든 게임이 하나의 '/game' 네임스페이스를 공유하고, 게임별 전송은 game_id 룸으로 구분합니다.
+    클라이언트는 연결 시 auth({game_id}) 또는 쿼리 문자열(?game_id=)로 게임 ID를 전달합니다.
+    """
 
-    def on_connect(self):
-        """클라이언트 연결"""
-        logger.info(f"🔌 [{self.game_id}] 클라이언트 연결: {request.sid}")
+    # 처리하는 이벤트 (그 외 이벤트는 핸들러 탐색 없이 바로 무시)
+    EVENTS = frozenset(('connect', 'disconnect', 'message'))
 
-        if self.game_id in game_sessions:
-            game_sessions[self.game_id]["connection_count"] += 1
+    def trigger_event(self, event, *args):
+        """이벤트 디스패치 - 처리하는 이벤트만 공개 Namespace 경로로 넘김 (요청/세션 컨텍스트 구성 포함)"""
+        if event not in self.EVENTS:
+            return
+        return super().trigger_event(event, *args)
+
+    def on_connect(self, auth=None):
+        """클라이언트 연결 - 등록된 게임 세션의 룸에 참가"""
+        game_id = (auth or {}).get('game_id') or request.args.get('game_id')
+        game_id = str(game_id) if game_id is not None else None
+
+        if _change_connection_count(game_id, 1) is None:
+            logger.warning("⚠️  등록되지 않은 게임 세션 연결 거부: %s (%s)", game_id, request.sid)
+            return False
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🔌 [%s] 클라이언트 연결: %s", game_id, request.sid)
+
+        session['game_id'] = game_id
+        join_room(game_id)
 
         self.emit('status', {
-            'message': f'게임 세션 {self.game_id}에 연결되었습니다.'
-        })
+            'message': f'게임 세션 {game_id}에 연결되었습니다.'
+        }, to=request.sid)
 
     def on_disconnect(self):
         """클라이언트 연결 해제"""
-        logger.info(f"❌ [{self.game_id}] 클라이언트 연결 해제: {request.sid}")
+        game_id = session.get('game_id')
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("❌ [%s] 클라이언트 연결 해제: %s", game_id, request.sid)
 
-        if self.game_id in game_sessions:
-            game_sessions[self.game_id]["connection_count"] -= 1
+        if game_id is not None and _change_connection_count(game_id, -1) == 0:
+            # 닫힌 세션의 마지막 연결이면 정리
+            socketio.start_background_task(_reap_session, game_id)
 
     def on_message(self, data):
         """메시지 수신"""
+        game_id = session.get('game_id')
         try:
             # 문자열 또는 딕셔너리 처리
             if isinstance(data, dict):
@@ -220,23 +395,28 @@ class GameNamespace(Namespace):
             else:
                 message = str(data)
 
-            logger.info(f"💬 [{self.game_id}] 메시지 수신: {message}")
+            # 메시지마다 호출되는 경로 - INFO가 꺼져 있으면 포맷팅 자체를 건너뜀
+            log_info = logger.isEnabledFor(logging.INFO)
+            if log_info:
+                logger.info("💬 [%s] 메시지 수신: %s", game_id, message)
 
-            # 테스트 응답 생성
-            response = {
-                "success": True,
-                "game_id": self.game_id,
-                "echo": message,
-                "response": f"[{self.game_id}] 받은 메시지: {message}"
-            }
+            # 테스트 응답 생성 (고정 필드는 템플릿에서 복사)
+            response = _RESPONSE_TEMPLATE.copy()
+            response["game_id"] = game_id
+            response["echo"] = message
+            response["response"] = f"[{game_id}] 받은 메시지: {message}"
 
-            # 응답 전송
-            self.emit('game_response', response)
-            logger.info(f"📤 [{self.game_id}] 응답 전송 완료")
+            # 응답 전송 (같은 게임 룸 전체)
+            self.emit('game_response', response, to=game_id)
+            if log_info:
+                logger.info("📤 [%s] 응답 전송 완료", game_id)
 
         except Exception as e:
-            logger.error(f"⚠️  [{self.game_id}] 메시지 처리 실패: {e}")
-            self.emit('error', {'message': str(e)})
+            logger.error(f"⚠️  [{game_id}] 메시지 처리 실패: {e}", exc_info=True)
+            self.emit('error', {'message': str(e)}, to=request.sid)
+
+
+socketio.on_namespace(GameNamespace(GAME_NAMESPACE))
 
 
 if __name__ == '__main__':
@@ -246,8 +426,9 @@ if __name__ == '__main__':
     print("\n사용 방법:")
     print("1. POST /api/session/create - 게임 세션 생성")
     print("   Body: {\"game_id\": \"my-game\"}")
-    print("2. WebSocket 연결: ws://localhost:5001/game/{game_id}")
+    print("2. WebSocket 연결: ws://localhost:5001/game?game_id={game_id}")
     print("3. 메시지 전송: emit('message', {'message': '안녕'})")
+    print("4. POST /api/session/close - 게임 세션 종료")
     print("=" * 50)
     print()
 
@@ -0,0 +1,72 @@
+"""
+VectorMemoryManager 대화 순번/문서 수 테스트
+Chroma 컬렉션과 임베딩 모델은 메모리 내 가짜 객체로 대체
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+vector_memory = pytest.importorskip("memory.vector_memory")
+
+GAME_ID = "g"
+
+
+class FakeCollection:
+    """add_scenario_batch/get_conversation_page가 쓰는 Chroma 컬렉션 메서드만 구현"""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail_add = False
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if self.fail_add:
+            raise RuntimeError("add failed")
+        for doc_id, doc, metadata in zip(ids, documents, metadatas):
+            self.docs[doc_id] = (doc, metadata)
+
+    def get(self, ids=None, where=None, include=None):
+        if ids is None:
+            ids = [doc_id for doc_id, (_, metadata) in self.docs.items() if metadata["type"] == where["type"]]
+        ids = [doc_id for doc_id in ids if doc_id in self.docs]
+        return {
+            "ids": ids,
+            "documents": [self.docs[doc_id][0] for doc_id in ids],
+            "metadatas": [self.docs[doc_id][1] for doc_id in ids],
+        }
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    manager = vector_memory.VectorMemoryManager()
+    collection = FakeCollection()
+    manager.vector_stores[GAME_ID] = SimpleNamespace(_collection=collection)
+    monkeypatch.setattr(manager, "_embed_documents", lambda texts: [[1.0, 0.0] for _ in texts])
+    return manager, collection
+
+
+def _add_turn(manager, content):
+    manager.add_scenario_batch(GAME_ID, [(content, {"type": "conversation"})])
+
+
+def test_failed_add_does_not_count_reserved_conversation(manager):
+    manager, collection = manager
+    _add_turn(manager, "첫 대화")
+    _add_turn(manager, "두 번째 대화")
+
+    collection.fail_add = True
+    with pytest.raises(RuntimeError):
+        _add_turn(manager, "저장 실패한 대화")
+
+    page, total = manager.get_conversation_page(GAME_ID)
+    assert total == 2
+    assert [seq for seq, _, _ in page] == [0, 1]
+
+    # 실패한 순번은 건너뛰고 다음 순번으로 저장되며, 빈 자리가 있어도 페이지가 어긋나지 않음
+    collection.fail_add = False
+    _add_turn(manager, "세 번째 대화")
+
+    page, total = manager.get_conversation_page(GAME_ID, limit=2, offset=1)
+    assert total == 3
+    assert [(seq, doc) for seq, doc, _ in page] == [(1, "두 번째 대화"), (3, "세 번째 대화")]
@@ -1,3 +1,5 @@
+import sys
+
 from database.db_manager import DatabaseManager
 import trpg_config as tc
 
@@ -7,19 +9,27 @@ try:
     # 연결 생성
     connection = db_manager.get_connection()
     if connection:
-        # 시나리오 템플릿 조회
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM scenario_templates WHERE is_active = TRUE")
-        templates = cursor.fetchall()
+        # 시나리오 템플릿 조회 (출력할 컬럼만, 설명은 DB에서 100자로 잘라서 받음)
+        # 바이너리 프로토콜 prepared statement로 실행하고, 결과는 한 행씩 읽음 (fetchall 없이)
+        # prepared + dictionary 조합은 커넥터 버전에 따라 지원되지 않으므로 행은 컬럼명으로 직접 딕셔너리화
+        cursor = connection.cursor(prepared=True)
+        cursor.execute(
+            "SELECT id, name, category, difficulty, LEFT(description, 100) AS description "
+            "FROM scenario_templates WHERE is_active = %s",
+            (True,)
+        )
+        columns = [column[0] for column in cursor.description]
 
-        print("저장된 시나리오 템플릿들:")
-        for template in templates:
-            print(f"- ID: {template['id']}")
-            print(f"  이름: {template['name']}")
-            print(f"  카테고리: {template['category']}")
-            print(f"  난이도: {template['difficulty']}")
-            print(f"  설명: {template['description'][:100]}...")
-            print("---")
+        # 템플릿별 출력 블록을 모아 한 번에 출력 (행마다 print 6번 대신 write 1번)
+        sys.stdout.write("저장된 시나리오 템플릿들:\n" + "".join(
+            f"- ID: {template['id']}\n"
+            f"  이름: {template['name']}\n"
+            f"  카테고리: {template['category']}\n"
+            f"  난이도: {template['difficulty']}\n"
+            f"  설명: {template['description']}...\n"
+            "---\n"
+            for template in (dict(zip(columns, row)) for row in cursor)
+        ))
 
         cursor.close()
         connection.close()
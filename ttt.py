@@ -3,8 +3,8 @@ import trpg_config as tc
 
 db_manager = DatabaseManager(tc.DB_CONFIG)
 
-# 기본 캐릭터 생성
-character_data = {
+# 기본 캐릭터 목록 (여러 명도 한 번에 생성)
+characters = [{
     'game_id': 'default-game-001',
     'character_name': '아리스',
     'nickname': '초보 모험가',
@@ -21,12 +21,13 @@ character_data = {
     'gold': 150,
     'status': 'alive',
     'location': '여관 로비'
-}
+}]
 
-# 캐릭터 생성 (DB에 INSERT)
+# 캐릭터 생성 (DB에 INSERT - 한 트랜잭션에서 executemany로 일괄 처리)
 connection = db_manager.get_connection()
 if connection:
     try:
+        connection.autocommit = False
         cursor = connection.cursor()
         query = """
         INSERT INTO characters
@@ -36,16 +37,18 @@ if connection:
                 %(intelligence)s, %(luck)s, %(hp)s, %(max_hp)s, %(mp)s, %(max_mp)s,
                 %(level)s, %(experience)s, %(gold)s, %(status)s, %(location)s)
         """
-        cursor.execute(query, character_data)
+        cursor.executemany(query, characters)
         connection.commit()
 
-        character_id = cursor.lastrowid
-        print(f"캐릭터 생성 완료! ID: {character_id}, 이름:{character_data['character_name']}")
+        names = ", ".join(character['character_name'] for character in characters)
+        print(f"캐릭터 {cursor.rowcount}명 생성 완료! 이름: {names}")
 
         cursor.close()
-        connection.close()
 
     except Exception as e:
+        connection.rollback()
         print(f"캐릭터 생성 실패: {e}")
-    else:
-        print("데이터베이스 연결 실패")
\ No newline at end of file
+    finally:
+        connection.close()
+else:
+    print("데이터베이스 연결 실패")